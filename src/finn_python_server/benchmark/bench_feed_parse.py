@@ -0,0 +1,174 @@
+"""
+뉴스 RSS 파싱 마이크로벤치마크: feedparser vs 증분 XML 파서, 그리고 실행 위치(inline / thread / process)
+
+1) 피드 하나당 파싱 시간 (앞쪽 30개 항목): feedparser(전체 파싱) vs 증분 파서(30개에서 중단)
+   두 파서의 결과(제목/링크/발행 시각/언론사)가 같은지도 함께 확인합니다.
+2) 피드 N개를 동시에 파싱할 때의 전체 시간과 이벤트 루프 최대 지연(1ms 주기 heartbeat 기준)
+
+피드 입력 (우선순위 순):
+- --payload-dir: 저장해 둔 Google News RSS 응답(*.xml) 디렉터리
+- --from-cache: 응답 캐시 디렉터리(FETCH_CACHE_DIR). 캐시에 저장된 RSS 응답을 그대로 사용
+- 둘 다 없으면 Google News RSS 형식의 합성 피드(피드당 100개 항목)를 생성
+
+실행: python bench_feed_parse.py [--payload-dir DIR | --from-cache DIR] [--feeds N] [--limit N]   (기본: 200개, 30개)
+"""
+import os, sys
+import argparse
+import asyncio
+import glob
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+base_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(base_dir, '..', 'cloud'))
+import fetch_cache
+import settings
+from news import feed_parser
+
+SOURCES = ['Reuters', 'Bloomberg', 'CNBC', 'MarketWatch', 'Yahoo Finance', 'The Motley Fool', 'Barron\'s',
+           'Investopedia', 'Seeking Alpha', 'Forbes']
+WORDS = ['shares', 'rise', 'fall', 'earnings', 'beat', 'miss', 'guidance', 'analysts', 'stock', 'record', 'quarter',
+         'revenue', 'outlook', 'investors', 'deal', 'chip', 'AI', 'demand', 'cuts', 'price', 'target', 'upgrade']
+
+
+def make_synthetic_feed(query, items=100, seed=0):
+    generator = random.Random(seed)
+    published = datetime(2025, 6, 2, 23, 0, tzinfo=None)
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+             '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>',
+             f'<generator>NFE/5.0</generator><title>"{escape(query)}" - Google News</title>',
+             '<link>https://news.google.com/search?hl=en-US&amp;gl=US&amp;ceid=US:en</link>',
+             '<language>en-US</language><webMaster>news-webmaster@google.com</webMaster>',
+             '<copyright>2025 Google Inc.</copyright><lastBuildDate>Tue, 03 Jun 2025 00:00:00 GMT</lastBuildDate>',
+             '<description>Google News</description>']
+    for i in range(items):
+        source = generator.choice(SOURCES)
+        title = f"{query} {' '.join(generator.choice(WORDS) for _ in range(generator.randint(5, 12)))} - {source}"
+        article_id = ''.join(generator.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(120))
+        link = f'https://news.google.com/rss/articles/{article_id}?oc=5'
+        published -= timedelta(minutes=generator.randint(1, 30))
+        description = f'<a href="{link}" target="_blank">{title}</a>&nbsp;&nbsp;<font color="#6f6f6f">{source}</font>'
+        parts.append(f'<item><title>{escape(title)}</title><link>{link}</link>'
+                     f'<guid isPermaLink="false">{article_id}</guid>'
+                     f'<pubDate>{format_datetime(published.replace(tzinfo=None), usegmt=False)[:-6]} GMT</pubDate>'
+                     f'<description>{escape(description)}</description>'
+                     f'<source url="https://www.{source.lower().replace(" ", "")}.com">{escape(source)}</source></item>')
+    parts.append('</channel></rss>')
+    return ''.join(parts)
+
+
+def load_payloads(args):
+    if args.payload_dir:
+        paths = sorted(glob.glob(os.path.join(args.payload_dir, '*.xml')))
+        payloads = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                payloads.append(f.read())
+        return payloads, f"{args.payload_dir} ({len(payloads)}개 파일)"
+    if args.from_cache:
+        payloads = []
+        for path in glob.glob(os.path.join(os.path.expanduser(args.from_cache), '*.cache')):
+            try:
+                with open(path, 'rb') as f:
+                    _, value = fetch_cache._decode(f.read())
+            except Exception:
+                continue
+            if isinstance(value, str) and '<rss' in value[:500]:
+                payloads.append(value)
+        return payloads, f"응답 캐시 {args.from_cache} ({len(payloads)}개 피드)"
+    payloads = [make_synthetic_feed(f'STOCK{i}', seed=i) for i in range(20)]
+    return payloads, "합성 Google News RSS (20종, 피드당 100개 항목)"
+
+
+def bench_single(payloads, limit, repeat=5):
+    """엔진별 피드 하나당 파싱 시간(ms, 중앙값)"""
+    results = {}
+    for engine in ('feedparser', 'incremental'):
+        samples = []
+        for _ in range(repeat):
+            for payload in payloads:
+                started = time.perf_counter()
+                feed_parser.parse_feed_entries(payload, limit, engine)
+                samples.append((time.perf_counter() - started) * 1000)
+        results[engine] = statistics.median(samples)
+    return results
+
+
+def check_same_entries(payloads, limit):
+    mismatches = 0
+    for payload in payloads:
+        if feed_parser.parse_feed_entries(payload, limit, 'feedparser') != \
+                feed_parser.parse_feed_entries(payload, limit, 'incremental'):
+            mismatches += 1
+    return mismatches
+
+
+async def _run_concurrent(feeds, limit, engine):
+    max_lag = 0.0
+    done = False
+
+    async def heartbeat():
+        nonlocal max_lag
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+
+    monitor = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(feed_parser.parse_feed_entries_async(feed, limit, engine) for feed in feeds))
+    elapsed = time.perf_counter() - started
+    done = True
+    await monitor
+    return elapsed, max_lag
+
+
+def bench_concurrent(payloads, feed_count, limit, engine, executor_kind):
+    settings.NEWS_PARSE_EXECUTOR = executor_kind
+    feed_parser._executor = None
+    feeds = [payloads[i % len(payloads)] for i in range(feed_count)]
+    # 풀 생성(프로세스 시작) 비용은 웜 컨테이너에서 한 번만 발생하므로 측정에서 제외
+    asyncio.run(_run_concurrent(feeds[:1], limit, engine))
+    elapsed, max_lag = asyncio.run(_run_concurrent(feeds, limit, engine))
+    executor = feed_parser._executor
+    if executor is not None:
+        executor.shutdown()
+    return elapsed, max_lag
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--payload-dir')
+    parser.add_argument('--from-cache')
+    parser.add_argument('--feeds', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=30)
+    args = parser.parse_args()
+
+    payloads, description = load_payloads(args)
+    if not payloads:
+        print("파싱할 피드가 없습니다.")
+        return
+    average_kb = sum(len(payload) for payload in payloads) / len(payloads) / 1024
+    print(f"입력: {description}, 평균 {average_kb:.1f} KB, 앞쪽 {args.limit}개 항목 사용\n")
+
+    single = bench_single(payloads, args.limit)
+    print("[피드 1개 파싱 시간 (중앙값)]")
+    for engine, milliseconds in single.items():
+        print(f"  {engine:<12} {milliseconds:8.2f} ms  (x{single['feedparser'] / milliseconds:.1f})")
+    print(f"  결과 불일치 피드: {check_same_entries(payloads, args.limit)}개\n")
+
+    print(f"[피드 {args.feeds}개 동시 파싱 (작업자 {settings.NEWS_PARSE_WORKERS}개)]")
+    print(f"  {'engine':<12} {'executor':<9} {'total':>9} {'max loop lag':>14}")
+    for engine in ('feedparser', 'incremental'):
+        for executor_kind in ('inline', 'thread', 'process'):
+            elapsed, max_lag = bench_concurrent(payloads, args.feeds, args.limit, engine, executor_kind)
+            print(f"  {engine:<12} {executor_kind:<9} {elapsed * 1000:7.0f}ms {max_lag * 1000:12.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
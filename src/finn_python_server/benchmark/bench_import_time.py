@@ -0,0 +1,105 @@
+"""
+콜드 스타트 import 시간 벤치마크: `python -X importtime` 결과를 경로별로 집계
+
+매 측정마다 새 인터프리터를 띄워(콜드 상태) 아래 경로에서 불러오는 모듈들의 누적 import 시간을 잰 뒤 중앙값을 출력합니다.
+- handler: func.py 로드와 Supabase 클라이언트 생성 (모든 실행에서 발생)
+- trading_day: 거래일에만 불러오는 모듈 (tiingo, stock_price_data -> pandas)
+- queue: 완료 메시지 전송 시 불러오는 모듈 (oci)
+
+--record 를 주면 func.yaml의 버전과 함께 결과를 JSON Lines 파일에 추가하여 릴리스별 추이를 비교할 수 있습니다.
+--top N 은 마지막 측정에서 누적 시간이 가장 긴 모듈 N개(최상위와 그 바로 아래 단계)를 함께 출력합니다.
+
+실행: python bench_import_time.py [--repeat N] [--top N] [--record 파일]   (기본: 5회, 상위 10개)
+"""
+import os, sys
+import argparse
+import json
+import re
+import statistics
+import subprocess
+from datetime import datetime
+
+base_dir = os.path.dirname(__file__)
+CLOUD_DIR = os.path.abspath(os.path.join(base_dir, '..', 'cloud'))
+
+# 경로 이름 -> 해당 경로에서 추가로 실행되는 import 문
+_HANDLER = ['import func', 'from supabase import create_client']
+PATHS = {
+    'handler': _HANDLER,
+    'trading_day': _HANDLER + ['from tiingo import TiingoClient', 'from stock import stock_price_data'],
+    'queue': _HANDLER + ['import oci'],
+}
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure(statements):
+    """새 인터프리터에서 statements를 실행하고 {모듈: (누적 us, 깊이)} 를 반환합니다. (최상위 모듈만 누적 합산에 사용)"""
+    code = 'import sys; sys.path.insert(0, %r)\n' % CLOUD_DIR + '\n'.join(statements)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=CLOUD_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import 실패: {result.stderr.strip().splitlines()[-1]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative), (len(indent) - 1) // 2)
+    return modules
+
+
+def top_level_total_ms(modules, exclude=()):
+    # 인터프리터 시작 시 불러오는 site 등은 함수 코드와 무관하므로 제외
+    return sum(cumulative for name, (cumulative, depth) in modules.items()
+               if depth == 0 and name not in exclude) / 1000
+
+
+def read_function_version():
+    path = os.path.join(CLOUD_DIR, 'func.yaml')
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('version:'):
+                    return line.split(':', 1)[1].strip()
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--record', help='결과를 추가할 JSON Lines 파일 경로')
+    args = parser.parse_args()
+
+    baseline_modules = set(measure([]))
+    results = {}
+    for path_name, statements in PATHS.items():
+        samples = []
+        for _ in range(args.repeat):
+            modules = measure(statements)
+            samples.append(top_level_total_ms(modules, exclude=baseline_modules))
+        results[path_name] = round(statistics.median(samples), 1)
+        print(f"{path_name:>12}: {results[path_name]:8.1f} ms (중앙값, {args.repeat}회, 최소 {min(samples):.1f} ms)")
+
+        top_modules = sorted(((cumulative, depth, name) for name, (cumulative, depth) in modules.items()
+                              if depth <= 1 and name not in baseline_modules), reverse=True)[:args.top]
+        for cumulative, depth, name in top_modules:
+            print(f"{'':>14}{'  ' * depth + name:<36}{cumulative / 1000:8.1f} ms")
+
+    if args.record:
+        record = {
+            'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'version': read_function_version(),
+            'python': sys.version.split()[0],
+            'median_ms': results,
+        }
+        with open(args.record, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"\n결과를 {args.record} 에 추가했습니다.")
+
+
+if __name__ == '__main__':
+    main()
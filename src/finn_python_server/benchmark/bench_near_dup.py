@@ -0,0 +1,72 @@
+"""
+유사 제목 중복 제거 벤치마크: 기존 50자 prefix 방식 vs MinHash + LSH 방식
+
+합성 헤드라인(원문 + 통신사 재작성본)을 만들어 제목 수별 소요 시간과
+재작성본 제거율(recall), 서로 다른 기사를 잘못 제거한 비율(false merge)을 비교합니다.
+
+실행: python bench_near_dup.py [제목 수 ...]   (기본: 1000 10000 100000)
+"""
+import os, sys
+import random
+import time
+
+base_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(base_dir, '..', 'cloud'))
+from news.news_data import _remove_duplicate_titles_by_prefix
+from news.near_dup import NearDuplicateDetector
+
+COMPANIES = ['Apple', 'Microsoft', 'Nvidia', 'Tesla', 'Amazon', 'Meta', 'Alphabet', 'Broadcom', 'Walmart', 'Visa']
+# 통신사 재작성에서 흔한 표현 치환
+REWRITES = [('shares', 'stock'), ('rise', 'rises'), ('fall', 'falls'), ('after', 'following'),
+            ('strong', 'robust'), ('says', 'said'), ('amid', 'as')]
+COMMON_WORDS = ['shares', 'rise', 'fall', 'after', 'strong', 'says', 'amid', 'on', 'the', 'in', 'for', 'to']
+
+
+def make_titles(count, duplicate_ratio=0.3, seed=7):
+    """(title, group_id) 리스트를 만듭니다. 같은 group_id는 같은 기사의 재작성본입니다."""
+    generator = random.Random(seed)
+    vocabulary = [''.join(generator.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(generator.randint(3, 9)))
+                  for _ in range(20000)]
+    rows = []
+    originals = []
+    while len(rows) < count:
+        if originals and generator.random() < duplicate_ratio:
+            title, group_id = generator.choice(originals)
+            for old, new in generator.sample(REWRITES, 3):
+                title = title.replace(f" {old} ", f" {new} ")
+        else:
+            group_id = len(originals)
+            words = [generator.choice(COMMON_WORDS) if generator.random() < 0.3 else generator.choice(vocabulary)
+                     for _ in range(generator.randint(7, 12))]
+            title = f"{generator.choice(COMPANIES)} {' '.join(words)}"
+            originals.append((title, group_id))
+        rows.append({"title": title, "group_id": group_id, "stock_id": group_id % 20})
+    return rows
+
+
+def evaluate(name, func, rows):
+    started_at = time.perf_counter()
+    kept = func(rows)
+    elapsed = time.perf_counter() - started_at
+
+    total_groups = len({row['group_id'] for row in rows})
+    kept_groups = len({row['group_id'] for row in kept})
+    duplicates = len(rows) - total_groups
+    removed_duplicates = len(rows) - len(kept) - (total_groups - kept_groups)
+    recall = removed_duplicates / duplicates if duplicates else 1.0
+    false_merge = (total_groups - kept_groups) / total_groups
+    print(f"  {name:<10} {elapsed:8.3f}s  kept={len(kept):>7}  recall={recall:6.1%}  false_merge={false_merge:6.2%}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        rows = make_titles(size)
+        print(f"[titles={size}]")
+        evaluate('prefix-50', lambda r: _remove_duplicate_titles_by_prefix(r, prefix_length=50), rows)
+        evaluate('minhash', NearDuplicateDetector(scope='global').remove_duplicates, rows)
+        evaluate('minhash/s', NearDuplicateDetector(scope='stock').remove_duplicates, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+파이프라인 종단 간 벤치마크: 로컬 가짜 서버(fake_services)를 상대로 handler 전체를 실행
+
+종목 수별로 stocks 테이블을 채운 뒤, 측정 대상 handler를 별도 프로세스에서 실행합니다.
+(가짜 서버의 메모리가 섞이지 않도록 하고, 프로세스별 최대 RSS를 측정하기 위함)
+거래일로 고정하여 주가/뉴스/큐 전송 경로를 모두 실행하며, OCI Queue 전송은 보낼 메시지를 만들어 전체 크기만 기록하는 대체 함수로 바꿉니다.
+
+출력 (종목 수 x 호출 순서):
+- 전체 시간, 초당 처리 종목 수, 저장 행 수 (stock_prices / news)
+- Tiingo 종목별 / RSS 요청별 지연 p50, p99 (handler 실행 지표 기준)
+- 최대 RSS, 가짜 서버가 받은 요청 수
+
+기본적으로 Tiingo 초당 요청 제한은 끄고(가짜 서버라 쿼터가 없음), 나머지 설정은 환경 변수를 그대로 따릅니다.
+--env KEY=VALUE 로 설정을 바꿔 가며 비교할 수 있습니다. (예: --env NEWS_PARSE_EXECUTOR=inline)
+--shards N 이면 샤드 실행을 만들고 N개의 작업자 호출을 차례로 실행합니다. (샤드별 시간, 완료 메시지가 마지막 샤드에서 한 번만 나가는지 확인)
+
+실행: python bench_pipeline.py [종목 수 ...] [--invocations N] [--rss-latency-ms N] [--rss-429-rate R] ...
+      (기본: 20 100 500 1000 5000, 호출 1회)
+"""
+import os, sys
+import argparse
+import asyncio
+import io
+import json
+import logging
+import resource
+import subprocess
+import time
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+CLOUD_DIR = os.path.join(base_dir, '..', 'cloud')
+
+_RESULT_PREFIX = 'BENCH_RESULT '
+
+
+# --- 측정 대상 프로세스 ---
+
+class _FakeContext:
+    """fdk 응답 생성에 필요한 최소한의 InvokeContext"""
+    def SetResponseHeaders(self, headers, status_code):
+        self.status_code = status_code
+
+
+def _shard_bodies(func, shard_count):
+    """샤드 실행을 하나 만들고 작업자 요청 본문 목록을 반환합니다."""
+    logger = logging.getLogger()
+    supabase = func.clients.get_supabase(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY'])
+    stock_count = len(supabase.table('stocks').select('id').execute().data)
+    run_id = func.sharding.create_run(supabase, shard_count, stock_count, False, logger)
+    return [json.dumps({'mode': 'worker', 'run_id': run_id, 'shard': shard, 'shard_count': shard_count,
+                        'is_closed_day': False}).encode() for shard in range(shard_count)]
+
+
+def run_child(invocations, shard_count):
+    sys.path.append(CLOUD_DIR)
+    logging.basicConfig(level=logging.WARNING)
+
+    from datetime import datetime as real_datetime
+    import func
+
+    class _TradingDay(real_datetime):
+        # 요일/휴장일 판단이 실행 날짜에 따라 달라지지 않도록 수요일 오전 7시(KST)로 고정
+        @classmethod
+        def now(cls, tz=None):
+            fixed = real_datetime(2025, 6, 4, 7, 0)
+            return tz.localize(fixed) if tz is not None and hasattr(tz, 'localize') else fixed
+
+    queue_messages = []
+
+    def send_completion_message(logger, run_summary=None, run_changes=None, run_id=None):
+        # 실제로 보낼 메시지를 만들어 전체 크기만 기록
+        messages = func.queue_manager.build_messages(run_changes or {}, run_summary=run_summary, run_id=run_id)
+        queue_messages.append(sum(len(message.encode('utf-8')) for message in messages))
+
+    func.datetime = _TradingDay
+    func.queue_manager.send_completion_message = send_completion_message
+
+    for invocation in range(invocations):
+        bodies = _shard_bodies(func, shard_count) if shard_count else [None]
+        for shard, request_body in enumerate(bodies):
+            _run_once(func, invocation, shard if shard_count else None, request_body, queue_messages)
+
+
+def _run_once(func, invocation, shard, request_body, queue_messages):
+    sent_before = len(queue_messages)
+    started = time.perf_counter()
+    response = asyncio.run(func.handler(_FakeContext(), io.BytesIO(request_body) if request_body else None))
+    elapsed = time.perf_counter() - started
+    body = json.loads(response.body())
+    result = {
+        'invocation': invocation + 1,
+        'shard': shard,
+        'status': response.status(),
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'queue_message_bytes': queue_messages[-1] if len(queue_messages) > sent_before else None,
+        'metrics': body.get('metrics'),
+        'message': body.get('message') if body.get('status') != 'Success' else None,
+    }
+    print(_RESULT_PREFIX + json.dumps(result, ensure_ascii=False), flush=True)
+
+
+# --- 실행/집계 ---
+
+def run_scenario(services, stock_count, invocations, shard_count, extra_env):
+    services.seed_stocks(stock_count)
+    env = dict(os.environ)
+    env.update({
+        'FETCH_CACHE_ENABLED': 'false',
+        'METRICS_SINKS': '',
+        'TIINGO_REQUESTS_PER_SECOND': '0',
+    })
+    env.update(services.env())
+    env.update(extra_env)
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--invocations', str(invocations),
+                                '--shards', str(shard_count)],
+                               env=env, capture_output=True, text=True)
+    results = [json.loads(line[len(_RESULT_PREFIX):]) for line in completed.stdout.splitlines()
+               if line.startswith(_RESULT_PREFIX)]
+    if completed.returncode != 0 or not results:
+        tail = '\n'.join(completed.stderr.strip().splitlines()[-15:])
+        raise RuntimeError(f"{stock_count}개 종목 실행 실패 (exit {completed.returncode}):\n{tail}")
+    return results, dict(services.request_counts)
+
+
+def _latency(metrics_summary, name, key):
+    value = (metrics_summary or {}).get('latency_ms', {}).get(name, {}).get(key)
+    return f"{value:.0f}" if value is not None else '-'
+
+
+def print_row(stock_count, result, request_counts):
+    summary = result['metrics'] or {}
+    counters = summary.get('counters', {})
+    throughput = stock_count / result['seconds'] if result['seconds'] else 0
+    print(f"{stock_count:>6} {result['invocation']:>4} {result['status']:>4} {result['seconds']:>8.2f} "
+          f"{throughput:>9.1f} {counters.get('rows_written.stock_prices', 0):>7} {counters.get('rows_written.news', 0):>8} "
+          f"{_latency(summary, 'tiingo_ticker', 'p50'):>6} {_latency(summary, 'tiingo_ticker', 'p99'):>6} "
+          f"{_latency(summary, 'rss_request', 'p50'):>6} {_latency(summary, 'rss_request', 'p99'):>6} "
+          f"{result['peak_rss_mb']:>8.1f}  "
+          + ' '.join(f"{name}={count}" for name, count in sorted(request_counts.items())))
+    if result.get('shard') is not None:
+        sent = f"{result['queue_message_bytes']} bytes" if result['queue_message_bytes'] else '-'
+        print(f"{'':>6} 샤드 {result['shard']}: 종목 {counters.get('tiingo_requests', 0)}개 (Tiingo 요청 기준), "
+              f"완료 메시지 {sent}")
+    if result.get('message'):
+        print(f"{'':>6} 오류: {result['message']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('stock_counts', nargs='*', type=int, default=[20, 100, 500, 1000, 5000])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--invocations', type=int, default=1, help='같은 프로세스에서 연속 호출할 횟수 (2회부터 웜 실행)')
+    parser.add_argument('--shards', type=int, default=0, help='샤드 작업자 수 (0이면 한 번의 호출로 전체 처리)')
+    parser.add_argument('--tiingo-latency-ms', type=float, default=50)
+    parser.add_argument('--rss-latency-ms', type=float, default=150)
+    parser.add_argument('--db-latency-ms', type=float, default=20)
+    parser.add_argument('--rss-error-rate', type=float, default=0.0)
+    parser.add_argument('--rss-429-rate', type=float, default=0.0)
+    parser.add_argument('--payload-dir', help='저장해 둔 Google News RSS 응답(*.xml) 디렉터리')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='측정 대상 프로세스에 줄 설정 (여러 번 지정 가능)')
+    parser.add_argument('--json', help='결과를 JSON Lines로 추가할 파일')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.invocations, args.shards)
+        return
+
+    from fake_services import FakeServices, FakeServiceConfig
+    config = FakeServiceConfig(tiingo_latency_ms=args.tiingo_latency_ms, rss_latency_ms=args.rss_latency_ms,
+                               db_latency_ms=args.db_latency_ms, rss_error_rate=args.rss_error_rate,
+                               rss_429_rate=args.rss_429_rate, payload_dir=args.payload_dir)
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    print(f"가짜 서버 지연(평균): Tiingo {args.tiingo_latency_ms}ms, RSS {args.rss_latency_ms}ms, DB {args.db_latency_ms}ms / "
+          f"RSS 오류 {args.rss_error_rate:.0%}, 429 {args.rss_429_rate:.0%}" + (f" / 설정 {extra_env}" if extra_env else ''))
+    print(f"{'stocks':>6} {'call':>4} {'code':>4} {'seconds':>8} {'stocks/s':>9} {'prices':>7} {'news':>8} "
+          f"{'tg p50':>6} {'tg p99':>6} {'rss50':>6} {'rss99':>6} {'rss(MB)':>8}  서버 요청 수")
+
+    with FakeServices(config) as services:
+        for stock_count in args.stock_counts:
+            results, request_counts = run_scenario(services, stock_count, args.invocations, args.shards, extra_env)
+            for result in results:
+                print_row(stock_count, result, request_counts)
+                if args.json:
+                    with open(args.json, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps({'stocks': stock_count, 'env': extra_env, 'server_requests': request_counts,
+                                            **result}, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
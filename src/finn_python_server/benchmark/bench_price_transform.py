@@ -0,0 +1,99 @@
+"""
+주가 가공 벤치마크: 종목별 pandas 가공(이전 방식) vs 단일 프레임 벡터 가공
+
+Tiingo get_dataframe 과 같은 형태의 합성 프레임을 만들어 종목 수별 CPU 시간과 최대 메모리(tracemalloc)를 비교합니다.
+두 방식 모두 저장 직전의 dict 레코드 생성까지 포함합니다. (벡터 방식은 청크 단위로 생성 후 버림)
+
+실행: python bench_price_transform.py [종목 수 ...] [--days N]   (기본: 20 500 5000, 2일)
+"""
+import os, sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(base_dir, '..', 'cloud'))
+from stock.stock_price_data import _transform_price_frames, _iter_price_records, _calculate_change_rate_for_close, kst_timezone
+
+TIINGO_COLUMNS = ['close', 'high', 'low', 'open', 'volume', 'adjClose', 'adjHigh', 'adjLow', 'adjOpen',
+                  'adjVolume', 'divCash', 'splitFactor']
+
+
+def make_raw_frames(ticker_count, days, seed=3):
+    generator = np.random.default_rng(seed)
+    index = pd.date_range('2025-01-02', periods=days, freq='B', tz='UTC', name='date')
+    frames = []
+    for _ in range(ticker_count):
+        values = generator.uniform(10, 500, size=(days, len(TIINGO_COLUMNS)))
+        frames.append(pd.DataFrame(values, index=index, columns=TIINGO_COLUMNS))
+    last_day_prices = {stock_id: float(generator.uniform(10, 500)) for stock_id in range(ticker_count)}
+    return frames, last_day_prices
+
+
+def legacy_transform(frames, id_to_last_day_prices):
+    """이전 _stock_price_data_from_tiingo 의 종목별 가공 로직"""
+    all_prices_to_insert = []
+    for stock_id, price_df in enumerate(frames):
+        price_df = price_df.copy()
+        price_df.reset_index(inplace=True)
+        price_df['stock_id'] = stock_id
+        if stock_id in id_to_last_day_prices:
+            price_df['change_rate'] = _calculate_change_rate_for_close(price_df['close'], id_to_last_day_prices[stock_id])
+        else:
+            price_df['change_rate'] = 0.00
+        price_df.rename(columns={'date': 'price_date', 'adjOpen': 'open_price',
+                                 'adjHigh': 'high_price', 'adjLow': 'low_price', 'close': 'close_price',
+                                 'adjClose': 'adj_close_price'}, inplace=True)
+        numeric_columns = ['change_rate', 'open_price', 'high_price', 'low_price', 'close_price', 'adj_close_price']
+        for col in numeric_columns:
+            price_df[col] = pd.to_numeric(price_df[col], errors='coerce').round(4)
+        price_df['price_date'] = pd.to_datetime(price_df['price_date']).dt.strftime('%Y-%m-%d')
+        price_df['created_at'] = datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')
+        required_columns = ['stock_id', 'price_date', 'open_price', 'high_price', 'low_price', 'close_price',
+                            'adj_close_price', 'change_rate', 'volume', 'created_at']
+        all_prices_to_insert.extend(price_df[required_columns].dropna().to_dict(orient='records'))
+    return len(all_prices_to_insert)
+
+
+def columnar_transform(frames, id_to_last_day_prices, chunk_size=2000):
+    raw_frames = []
+    for stock_id, price_df in enumerate(frames):
+        # _fetch_stock_prices 가 종목별로 하는 작업과 동일
+        price_df = price_df.reset_index().reindex(columns=['date', 'adjOpen', 'adjHigh', 'adjLow', 'close',
+                                                           'adjClose', 'volume'])
+        price_df['stock_id'] = stock_id
+        raw_frames.append(price_df)
+    price_df = _transform_price_frames(raw_frames, id_to_last_day_prices)
+    return sum(len(records) for records in _iter_price_records(price_df, chunk_size))
+
+
+def measure(name, func, frames, last_day_prices):
+    tracemalloc.start()
+    started_at = time.process_time()
+    rows = func(frames, last_day_prices)
+    cpu_seconds = time.process_time() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<9} cpu={cpu_seconds:8.3f}s  peak={peak / 1024 / 1024:8.1f}MB  rows={rows}")
+
+
+def main():
+    args = sys.argv[1:]
+    days = 2
+    if '--days' in args:
+        position = args.index('--days')
+        days = int(args[position + 1])
+        del args[position:position + 2]
+    sizes = [int(arg) for arg in args] or [20, 500, 5000]
+    for size in sizes:
+        frames, last_day_prices = make_raw_frames(size, days)
+        print(f"[tickers={size}, days={days}]")
+        measure('legacy', legacy_transform, frames, last_day_prices)
+        measure('columnar', columnar_transform, frames, last_day_prices)
+
+
+if __name__ == "__main__":
+    main()
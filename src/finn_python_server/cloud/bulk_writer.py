@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import exceptions
+import metrics
+import settings
+
+
+def bulk_write(supabase, table, rows, logger, on_conflict=None, ignore_duplicates=False, batch_size=None,
+               max_parallel=None, max_retries=None, backoff_seconds=None, on_written=None):
+    """
+    rows를 batch_size 단위로 나누어 Supabase(PostgREST)에 병렬로 저장합니다.
+    on_conflict가 주어지면 upsert, 아니면 insert를 사용합니다.
+    ignore_duplicates=True 이면 충돌하는 행은 갱신하지 않고 건너뜁니다. (ON CONFLICT DO NOTHING)
+    실패한 배치만 지수 백오프로 재시도하며, 재시도 후에도 실패한 배치가 있으면 SupabaseError를 발생시킵니다.
+    (이미 성공한 배치는 그대로 저장된 상태로 남습니다.)
+    on_written이 주어지면 배치가 성공할 때마다 실제로 저장된 행(응답 데이터) 목록으로 호출합니다.
+    (중복 무시 모드에서는 이미 있던 행이 빠지므로, 새로 저장된 행만 전달됩니다)
+
+    반환값: {"rows": 저장된 행 수, "batches": 배치 수, "seconds": 소요 시간, "rows_per_second": 초당 저장 행 수}
+    """
+    batch_size = batch_size or settings.DB_BATCH_SIZE
+    max_parallel = max_parallel or settings.DB_MAX_PARALLEL_BATCHES
+    max_retries = settings.DB_MAX_RETRIES if max_retries is None else max_retries
+    backoff_seconds = settings.DB_RETRY_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    started_at = time.monotonic()
+    written = 0
+    pending = list(range(len(batches)))
+    errors = {}
+
+    for attempt in range(max_retries + 1):
+        if attempt > 0:
+            wait_seconds = backoff_seconds * (2 ** (attempt - 1))
+            logger.warning(f"'{table}' 저장 실패 배치 {len(pending)}개를 {wait_seconds:.1f}초 후 재시도합니다. ({attempt}/{max_retries})")
+            metrics.incr('db_retries', len(pending))
+            time.sleep(wait_seconds)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(pending)))) as executor:
+            futures = {executor.submit(_write_batch, supabase, table, batches[index], on_conflict,
+                                       ignore_duplicates, on_written): index
+                       for index in pending}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    written += future.result()
+                    errors.pop(index, None)
+                except Exception as e:
+                    errors[index] = e
+                    failed.append(index)
+
+        pending = sorted(failed)
+        if not pending:
+            break
+
+    elapsed = time.monotonic() - started_at
+    rows_per_second = written / elapsed if elapsed > 0 else float(written)
+    metrics.add_time(f'db_write.{table}', elapsed)
+    metrics.incr('db_batches', len(batches))
+    metrics.incr(f'rows_written.{table}', written)
+    logger.info(f"'{table}' 저장: {written}/{len(rows)}개 레코드, {len(batches)}개 배치, "
+                f"{elapsed:.2f}초 ({rows_per_second:.1f} rows/s)")
+
+    if pending:
+        first_error = errors[pending[0]]
+        raise exceptions.SupabaseError(
+            f"'{table}' 저장 중 {len(pending)}/{len(batches)}개 배치 실패 (재시도 {max_retries}회 후): {first_error}"
+        ) from first_error
+
+    return {"rows": written, "batches": len(batches), "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows_per_second, 1)}
+
+
+def _write_batch(supabase, table, batch, on_conflict, ignore_duplicates, on_written=None):
+    query = supabase.table(table)
+    if on_conflict:
+        response = query.upsert(batch, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates).execute()
+    else:
+        response = query.insert(batch).execute()
+    # 중복 무시 모드에서는 모든 행이 이미 존재하면 응답이 비어 있는 것이 정상
+    if not response.data and not ignore_duplicates:
+        raise exceptions.SupabaseError(f"Supabase에 '{table}' 데이터 저장 실패 (응답 데이터 없음). RLS 정책 등을 확인하세요.")
+    if on_written is not None and response.data:
+        on_written(response.data)
+    return len(response.data or [])
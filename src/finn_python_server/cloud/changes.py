@@ -0,0 +1,83 @@
+import threading
+
+# 변경 종류 -> 저장된 행에서 날짜를 읽을 컬럼
+DATE_COLUMNS = {'prices': 'price_date', 'news': 'published_date'}
+
+
+class RunChanges:
+    """
+    한 번의 실행에서 새로 저장된 행을 종목별로 모읍니다. (완료 메시지로 예측 쪽에 전달)
+    종목별로 종류(prices/news)마다 행 수와 날짜 범위(YYYY-MM-DD)만 기억하므로 행 수와 관계없이 메모리가 작습니다.
+    """
+    def __init__(self):
+        self._stocks = {}
+        self._lock = threading.Lock()
+
+    def record_rows(self, kind, rows):
+        """저장된 행(dict) 목록을 반영합니다. 각 행에는 stock_id와 DATE_COLUMNS[kind] 컬럼이 있어야 합니다."""
+        date_column = DATE_COLUMNS[kind]
+        with self._lock:
+            for row in rows:
+                stock_id = row.get('stock_id')
+                if stock_id is None:
+                    continue
+                self._add(stock_id, kind, 1, str(row.get(date_column) or '')[:10] or None)
+
+    def merge(self, stocks):
+        """to_dict() 결과(다른 샤드의 변경 내역 등)를 합칩니다."""
+        with self._lock:
+            for stock_id, kinds in stocks.items():
+                for kind, entry in kinds.items():
+                    self._add(int(stock_id), kind, entry['rows'], entry['start_date'])
+                    self._add(int(stock_id), kind, 0, entry['end_date'])
+
+    def _add(self, stock_id, kind, rows, day):
+        entry = self._stocks.setdefault(stock_id, {}).setdefault(kind, {'rows': 0, 'start_date': None,
+                                                                        'end_date': None})
+        entry['rows'] += rows
+        if day:
+            if entry['start_date'] is None or day < entry['start_date']:
+                entry['start_date'] = day
+            if entry['end_date'] is None or day > entry['end_date']:
+                entry['end_date'] = day
+
+    def to_dict(self):
+        """{stock_id: {kind: {'rows', 'start_date', 'end_date'}}} (JSON 직렬화 가능, stock_id 순)"""
+        with self._lock:
+            return {stock_id: {kind: dict(entry) for kind, entry in kinds.items()}
+                    for stock_id, kinds in sorted(self._stocks.items())}
+
+    def totals(self):
+        """종류별 전체 행 수, 변경된 종목 수, 전체 날짜 범위"""
+        totals = {}
+        with self._lock:
+            for kinds in self._stocks.values():
+                for kind, entry in kinds.items():
+                    total = totals.setdefault(kind, {'rows': 0, 'stocks': 0, 'start_date': None, 'end_date': None})
+                    total['rows'] += entry['rows']
+                    total['stocks'] += 1
+                    for key, pick in (('start_date', min), ('end_date', max)):
+                        values = [value for value in (total[key], entry[key]) if value]
+                        total[key] = pick(values) if values else None
+        return totals
+
+
+# --- 현재 실행 ---
+# metrics와 같은 이유로 모듈 전역으로 현재 실행의 변경 내역을 공유함
+
+_current = RunChanges()
+
+
+def start_run():
+    """새 실행의 변경 기록을 시작합니다. (handler 시작 시 호출)"""
+    global _current
+    _current = RunChanges()
+    return _current
+
+
+def current():
+    return _current
+
+
+def record_rows(kind, rows):
+    _current.record_rows(kind, rows)
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+
+import settings
+
+
+class _Entry:
+    def __init__(self, client, key, on_close=None):
+        self.client = client
+        self.key = key
+        self.on_close = on_close
+        self.created_at = time.monotonic()
+
+
+class ClientRegistry:
+    """
+    외부 서비스 클라이언트를 이름별로 한 개씩 보관하는 레지스트리입니다.
+    모듈 전역으로 유지되어 웜 컨테이너의 다음 실행에서 TLS 연결/인증 설정을 재사용합니다.
+    - key(URL, API 키 등)가 바뀌거나, max_age_seconds가 지났거나, is_healthy가 False이면 새로 만듭니다.
+    - 요청이 실패한 클라이언트는 discard()로 버려 다음 사용 시 새로 만들게 합니다.
+    """
+    def __init__(self, max_age_seconds):
+        self.max_age_seconds = max_age_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, key, factory, is_healthy=None, on_close=None):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and not self._is_usable(entry, key, is_healthy):
+                self._close(self._entries.pop(name))
+                entry = None
+            if entry is None:
+                entry = _Entry(factory(), key, on_close)
+                self._entries[name] = entry
+            return entry.client
+
+    def _is_usable(self, entry, key, is_healthy):
+        if entry.key != key:
+            return False
+        if self.max_age_seconds and time.monotonic() - entry.created_at > self.max_age_seconds:
+            return False
+        try:
+            return is_healthy is None or is_healthy(entry.client)
+        except Exception:
+            return False
+
+    def discard(self, *names):
+        """지정한 클라이언트(이름이 없으면 전부)를 버립니다."""
+        with self._lock:
+            for name in names or list(self._entries):
+                entry = self._entries.pop(name, None)
+                if entry is not None:
+                    self._close(entry)
+
+    @staticmethod
+    def _close(entry):
+        if entry.on_close is None:
+            return
+        try:
+            entry.on_close(entry.client)
+        except Exception:
+            pass  # 이미 끊어진 연결을 닫다가 나는 오류는 무시
+
+
+_registry = ClientRegistry(max_age_seconds=settings.CLIENT_MAX_AGE_SECONDS)
+
+SUPABASE = 'supabase'
+TIINGO = 'tiingo'
+QUEUE = 'queue'
+FUNCTIONS = 'functions'
+SIGNER = 'oci_signer'
+HTTP_SESSION = 'http_session'
+
+
+def discard(*names):
+    _registry.discard(*names)
+
+
+# --- Supabase ---
+
+def get_supabase(url, api_key):
+    """
+    Supabase 클라이언트를 반환합니다. PostgREST 요청은 클라이언트가 가진 httpx(HTTP/2, keep-alive) 연결 풀로 전송되므로,
+    클라이언트를 재사용하면 웜 실행에서 TLS 핸드셰이크를 생략할 수 있습니다.
+    """
+    from supabase import create_client
+    return _registry.get(SUPABASE, (url, api_key), lambda: create_client(url, api_key),
+                         is_healthy=_supabase_is_healthy, on_close=_close_supabase)
+
+
+def _supabase_is_healthy(client):
+    session = getattr(client.postgrest, 'session', None)
+    return session is None or not session.is_closed
+
+
+def _close_supabase(client):
+    client.postgrest.session.close()
+
+
+# --- Tiingo ---
+
+def get_tiingo(api_key):
+    """TiingoClient를 반환합니다. requests 세션의 연결 풀을 동시 요청 수(TIINGO_MAX_WORKERS)에 맞춰 키웁니다."""
+    def create():
+        import requests
+        from tiingo import TiingoClient
+        client = TiingoClient({'session': True, 'api_key': api_key})
+        if settings.TIINGO_BASE_URL:
+            client._base_url = settings.TIINGO_BASE_URL.rstrip('/')
+        session = getattr(client, '_session', None)
+        if isinstance(session, requests.Session):
+            pool_size = max(settings.TIINGO_MAX_WORKERS, settings.HTTP_POOL_SIZE)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        return client
+
+    return _registry.get(TIINGO, api_key, create, on_close=_close_tiingo)
+
+
+def _close_tiingo(client):
+    session = getattr(client, '_session', None)
+    if hasattr(session, 'close'):
+        session.close()
+
+
+# --- OCI (Queue, Functions) ---
+
+def get_oci_signer():
+    """
+    리소스 주체 signer를 반환합니다. Queue/Functions 클라이언트가 함께 사용합니다.
+    토큰이 SIGNER_REFRESH_MARGIN_SECONDS 안에 만료되면 요청 도중 만료되지 않도록 미리 갱신합니다.
+    """
+    import oci
+    signer = _registry.get(SIGNER, None, oci.auth.signers.get_resource_principals_signer)
+    _refresh_signer_if_expiring(signer)
+    return signer
+
+
+def _refresh_signer_if_expiring(signer):
+    token = getattr(signer, 'security_token', None)
+    if token is None or not hasattr(signer, 'refresh_security_token'):
+        return
+    if not token.valid_with_jitter(settings.SIGNER_REFRESH_MARGIN_SECONDS):
+        signer.refresh_security_token()
+
+
+def get_queue_client(service_endpoint):
+    """리소스 주체 signer로 인증하는 QueueClient를 반환합니다."""
+    import oci
+    signer = get_oci_signer()
+    return _registry.get(QUEUE, (service_endpoint, id(signer)),
+                         lambda: oci.queue.QueueClient(config={}, signer=signer, service_endpoint=service_endpoint))
+
+
+def get_functions_invoke_client(service_endpoint):
+    """샤드 작업자 호출에 사용할 FunctionsInvokeClient를 반환합니다."""
+    import oci
+    signer = get_oci_signer()
+    return _registry.get(FUNCTIONS, (service_endpoint, id(signer)),
+                         lambda: oci.functions.FunctionsInvokeClient(config={}, signer=signer,
+                                                                     service_endpoint=service_endpoint))
+
+
+# --- aiohttp 세션 (뉴스 RSS) ---
+
+def get_http_session():
+    """
+    현재 이벤트 루프에서 사용할 aiohttp 세션을 반환합니다. (코루틴 안에서 호출)
+    세션은 이벤트 루프에 묶이므로 루프가 바뀌거나 세션이 닫혔으면 새로 만듭니다.
+    """
+    import aiohttp
+    loop = asyncio.get_running_loop()
+
+    def create():
+        connector = aiohttp.TCPConnector(limit=settings.HTTP_POOL_SIZE,
+                                         keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS)
+        return aiohttp.ClientSession(connector=connector)
+
+    return _registry.get(HTTP_SESSION, loop, create, is_healthy=lambda session: not session.closed,
+                         on_close=_close_http_session)
+
+
+def _close_http_session(session):
+    # 현재 루프에서 만든 세션이면 닫고, 다른(이미 끝난) 루프의 세션이면 참조만 버림
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if not session.closed and getattr(session, '_loop', None) is loop:
+        loop.create_task(session.close())
@@ -0,0 +1,183 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import pytz
+
+import settings
+from stock import trading_calendar
+
+kst_timezone = pytz.timezone('Asia/Seoul')
+# 저장 형식이 바뀌면 올려서 이전 형식의 파일을 읽지 않게 함 (키에 포함되므로 이전 파일은 미적중 후 LRU로 정리됨)
+_FORMAT_VERSION = 'json-v1'
+
+
+class FetchCache:
+    """
+    외부 API(Tiingo, Google News RSS) 응답을 디스크에 저장하는 캐시입니다.
+    - 키: (source, 종목 코드/검색어, 시작일, 종료일)
+    - 최근 recent_sessions개 미국 거래일보다 앞에서 끝나는(완료된) 기간은 만료 없이 보관하고, 그 이후에 끝나는 기간은
+      recent_ttl_seconds 동안만 사용합니다. (장 마감 직후의 일봉은 늦게 채워지거나 수정될 수 있어 바로 확정하지 않음)
+    - 값은 JSON(문자열은 그대로, DataFrame은 pandas table 스키마 형식)으로 바꿔 zlib으로 압축 저장합니다.
+      실행 환경의 라이브러리 버전과 관계없이 읽을 수 있고, 읽을 수 없는 파일은 미적중으로 취급합니다.
+    - 전체 크기가 max_bytes를 넘으면 오래 사용하지 않은 파일부터 삭제합니다.
+    """
+    def __init__(self, directory, max_bytes, recent_ttl_seconds, recent_sessions=None):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.recent_ttl_seconds = recent_ttl_seconds
+        self.recent_sessions = settings.FETCH_CACHE_RECENT_SESSIONS if recent_sessions is None else recent_sessions
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                                if entry.name.endswith('.cache'))
+
+    def _path(self, source, subject, start_date, end_date):
+        key = f"{_FORMAT_VERSION}|{source}|{subject}|{start_date}|{end_date}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def get(self, source, subject, start_date, end_date):
+        path = self._path(source, subject, start_date, end_date)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = _decode(f.read())
+            if expires_at is not None and expires_at < time.time():
+                value = None
+            else:
+                os.utime(path)  # 최근 사용 시각 갱신 (LRU 삭제 기준)
+        except FileNotFoundError:
+            value = None
+        except Exception:
+            # 손상되었거나 읽을 수 없는 형식의 캐시 파일은 없는 것으로 취급
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, source, subject, start_date, end_date, value):
+        is_completed = end_date < completed_before(self.recent_sessions)
+        expires_at = None if is_completed else time.time() + self.recent_ttl_seconds
+        data = _encode(expires_at, value)
+        path = self._path(source, subject, start_date, end_date)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self._total_bytes += len(data) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith('.cache')),
+                         key=lambda entry: entry.stat().st_mtime)
+        # 한 번 정리할 때 최대 크기의 90%까지 줄여 매 저장마다 정리가 일어나지 않게 함
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                continue
+
+    def log_stats(self, logger):
+        total = self.hits + self.misses
+        if total:
+            logger.info(f"응답 캐시 적중 {self.hits}/{total}회 (미적중 {self.misses}회)")
+
+
+def _encode(expires_at, value):
+    """캐시 값(str 또는 DataFrame)을 압축한 JSON bytes로 바꿉니다. 그 밖의 타입은 TypeError를 발생시킵니다."""
+    if isinstance(value, str):
+        payload = {'expires_at': expires_at, 'type': 'text', 'value': value}
+    elif hasattr(value, 'to_json'):  # pandas DataFrame (인덱스와 컬럼 타입을 함께 저장)
+        payload = {'expires_at': expires_at, 'type': 'frame',
+                   'value': value.to_json(orient='table', date_format='iso')}
+    else:
+        raise TypeError(f"캐시에 저장할 수 없는 값입니다: {type(value).__name__}")
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+
+def _decode(data):
+    """_encode 결과를 (expires_at, 값)으로 되돌립니다. 형식이 맞지 않으면 예외를 발생시킵니다."""
+    payload = json.loads(zlib.decompress(data).decode('utf-8'))
+    if payload['type'] == 'text':
+        return payload['expires_at'], payload['value']
+    if payload['type'] == 'frame':
+        import pandas as pd  # 뉴스 경로에서는 pandas를 불러오지 않도록 필요할 때만 불러옴
+        return payload['expires_at'], pd.read_json(io.StringIO(payload['value']), orient='table')
+    raise ValueError(f"알 수 없는 캐시 값 형식입니다: {payload['type']}")
+
+
+def completed_before(recent_sessions, now=None):
+    """
+    이 날짜('YYYY-MM-DD')보다 앞에서 끝나는 기간만 완료된 것으로 봅니다.
+    미국 기준 오늘(또는 그 이전 가장 가까운 거래일)부터 거슬러 올라간 recent_sessions번째 거래일이며, 한국 기준 오늘을 넘지 않습니다.
+    """
+    now = now or datetime.now(kst_timezone)
+    day = trading_calendar.session_date(now)
+    for index in range(max(1, recent_sessions)):
+        day = trading_calendar.previous_trading_day(day, inclusive=(index == 0))
+    return min(day.strftime('%Y-%m-%d'), now.astimezone(kst_timezone).strftime('%Y-%m-%d'))
+
+
+class NullFetchCache:
+    """캐시를 사용하지 않을 때의 대체 구현 (항상 미적중)"""
+    hits = 0
+    misses = 0
+
+    def get(self, source, subject, start_date, end_date):
+        return None
+
+    def put(self, source, subject, start_date, end_date, value):
+        pass
+
+    def log_stats(self, logger):
+        pass
+
+
+def cached_fetch(cache, source, subject, start_date, end_date, fetch):
+    """캐시에 있으면 캐시 값을, 없으면 fetch()를 호출해 결과를 캐시에 저장한 뒤 반환합니다. (빈 결과는 저장하지 않음)"""
+    value = cache.get(source, subject, start_date, end_date)
+    if value is not None:
+        return value
+    value = fetch()
+    if not _is_empty(value):
+        cache.put(source, subject, start_date, end_date, value)
+    return value
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if hasattr(value, 'empty'):  # pandas DataFrame
+        return value.empty
+    return len(value) == 0
+
+
+_default_cache = None
+
+
+def get_fetch_cache():
+    """설정(FETCH_CACHE_*)에 따라 프로세스 전역에서 공유하는 캐시를 반환합니다."""
+    global _default_cache
+    if _default_cache is None:
+        if settings.FETCH_CACHE_ENABLED:
+            _default_cache = FetchCache(settings.FETCH_CACHE_DIR, settings.FETCH_CACHE_MAX_MB * 1024 * 1024,
+                                        settings.FETCH_CACHE_RECENT_TTL_SECONDS)
+        else:
+            _default_cache = NullFetchCache()
+    return _default_cache
@@ -2,25 +2,99 @@ import os
 import io
 import json
 import logging
-import oci
+import asyncio
 from fdk import response
 
-from stock import stock_price_data
+# oci, pandas, tiingo 는 필요한 경로에서만 불러옴 (콜드 스타트 시간 단축)
+# - oci: queue_manager.send_completion_message, 샤드 작업자 호출(sharding.dispatch_shards) 안에서
+# - pandas(stock_price_data), tiingo: 거래일(주가 수집)에만 (휴장일 확인은 거래일 달력으로, 네트워크 요청 없음)
+from stock import market_day
 from news import news_data
-from supabase import create_client, Client
-from tiingo import TiingoClient
 import exceptions
+import clients
+import metrics
+import changes
 import queue_manager
+import settings
+import sharding
+import watermarks
 from datetime import datetime
 import pytz
 
 kst_timezone = pytz.timezone('Asia/Seoul')
 
+def _check_is_closed_day(logger):
+    """금일(미국 기준 전일)이 휴장일인지 확인합니다. (한국 시간 오전 7시 기준 미국의 전날이 주말/휴장일이면 주가 정보가 없음)"""
+    return market_day.check_is_today_closed_day(logger=logger, now=datetime.now(kst_timezone))
+
+
+def _collect_stock_prices(tiingo_api_key, supabase, all_stocks, logger, is_closed_day=None):
+    """
+    주가 수집 파이프라인 (동기). 휴장일이면 수집하지 않고 True를 반환합니다.
+    is_closed_day가 주어지면(샤드 작업자) 휴장일 확인을 다시 하지 않습니다.
+    """
+    if is_closed_day is None:
+        is_closed_day = _check_is_closed_day(logger)
+    if is_closed_day:
+        logger.info("금일이 휴장일이여서 주가 데이터 수집을 건너뜁니다.")
+        return True
+
+    from stock import stock_price_data
+    stock_price_data.collect_and_save_stock_prices(clients.get_tiingo(tiingo_api_key), supabase, all_stocks, logger)
+    return False
+
+
+def _raise_first_error(logger, **results):
+    """동시에 실행한 파이프라인 결과 중 첫 번째 예외를 다시 발생시킵니다. 나머지 예외는 로그로만 남깁니다."""
+    errors = [(name, result) for name, result in results.items() if isinstance(result, BaseException)]
+    for name, error in errors[1:]:
+        logger.error(f"{name} 파이프라인도 실패했습니다: {error!r}")
+    if errors:
+        raise errors[0][1]
+
+
+def _parse_request(data, logger):
+    """요청 본문(JSON)을 dict로 읽습니다. 본문이 없거나 JSON이 아니면(예약 실행 등) 빈 dict를 반환합니다."""
+    raw = data.getvalue() if data is not None else b''
+    if not raw or not raw.strip():
+        return {}
+    try:
+        request = json.loads(raw)
+    except ValueError:
+        logger.warning("요청 본문이 JSON이 아니어서 무시합니다.")
+        return {}
+    return request if isinstance(request, dict) else {}
+
+
+def _success_response(ctx, logger, message, **extra):
+    return response.Response(
+        ctx, response_data=json.dumps({
+            "created_date" : datetime.now(kst_timezone).strftime("%Y-%m-%d %H:%M:%S"),
+            "status" : "Success",
+            "message" : message,
+            **extra,
+            "metrics" : metrics.finish_run(logger)
+        }),
+        headers={"Content-Type": "application/json"}
+    )
+
+
+def _report_shard_failure(supabase, request, error, logger):
+    """작업자 실패를 샤드 기록에 남깁니다. 기록 자체의 실패는 원래 오류를 가리지 않도록 로그로만 남깁니다."""
+    try:
+        sharding.report_shard(supabase, request['run_id'], request['shard'], sharding.FAILED, logger,
+                              error=str(error)[:1000])
+    except Exception as e:
+        logger.error(f"샤드 실패 기록 중 오류: {e}")
+
+
 async def handler(ctx, data: io.BytesIO=None):
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger()
     
     logger.info("=== 데이터 수집 파이프라인 시작 ===")
+    metrics.start_run()
+    changes.start_run()
 
     try:
         # 1. 환경 변수 및 클라이언트 초기화
@@ -31,10 +105,12 @@ async def handler(ctx, data: io.BytesIO=None):
         if not all([supabase_url, supabase_api_key]):
             raise exceptions.ConfigError("Supabase 환경 변수가 설정되지 않았습니다.")
 
-        supabase: Client = create_client(supabase_url, supabase_api_key)
+        # 클라이언트는 웜 컨테이너의 다음 실행에서 재사용됨
+        supabase = clients.get_supabase(supabase_url, supabase_api_key)
         
         # 2. 공통으로 사용할 주식 정보 가져오기 (이 로직도 별도 모듈로 뺄 수 있습니다)
-        stocks_response = supabase.table('stocks').select('id, stock_code, search_keyword').execute()
+        with metrics.stage('stock_list_load'):
+            stocks_response = supabase.table('stocks').select('id, stock_code, search_keyword').execute()
         if not stocks_response.data and stocks_response.data is not None: # data가 있고 비어있는 경우는 정상이지만, 에러로 data 자체가 없을 수 있음
              pass # 정상 케이스
         elif not hasattr(stocks_response, 'data'):
@@ -43,70 +119,113 @@ async def handler(ctx, data: io.BytesIO=None):
         all_stocks = stocks_response.data
         if not all_stocks:
             logger.warning("DB에 조회할 주식이 없어 함수를 종료합니다.")
-            return response.Response(ctx, response_data=json.dumps({"status": "No stocks to process"}), headers={"Content-Type": "application/json"})
-
-        # 3. 주가 데이터 수집 모듈 실행
-        if tiingo_api_key:
-            tiingo_client = TiingoClient({'session': True, 'api_key': tiingo_api_key})
-            today = datetime.now(kst_timezone)
-            # 일요일=6, 월요일=0인지 먼저 확인(한국 시간 오전 7시 기준으로, 미국의 해당 날짜(토,일)에는 주가 정보가 없음)
-            if today.weekday() == 0 or today.weekday() == 6:
-                logger.info("금일이 휴장일이여서 주가 데이터 수집을 건너뜁니다.")
-                is_closed_day = True
-            else:
-                is_closed_day = stock_price_data.check_is_today_closed_day(tiingo_client, logger)
-                if is_closed_day:
-                    logger.info("금일이 휴장일이여서 주가 데이터 수집을 건너뜁니다.")
-                else:
-                    stock_price_data.collect_and_save_stock_prices(tiingo_client, supabase, all_stocks, logger)
-        else:
+            return response.Response(ctx, response_data=json.dumps({"status": "No stocks to process",
+                                                                    "metrics": metrics.finish_run(logger)}),
+                                     headers={"Content-Type": "application/json"})
+
+        if not tiingo_api_key:
             raise exceptions.ConfigError("TIINGO_API_KEY 환경 변수가 설정되지 않았습니다.")
 
-        # 4. 뉴스 데이터 수집 모듈 실행 (비동기)
-        await news_data.collect_and_save_news_async(supabase, all_stocks, logger)
+        # 샤드 실행: 조정자는 종목을 샤드로 나누어 작업자들을 호출하고 끝나며, 작업자는 자기 샤드의 종목만 처리함
+        request = _parse_request(data, logger)
+        mode = request.get('mode') or ('coordinator' if settings.PIPELINE_MODE == 'shard' else 'single')
+        if mode == 'coordinator':
+            with metrics.stage('shard_dispatch'):
+                run = sharding.start_or_resume_run(supabase, all_stocks, request.get('run_id'),
+                                                   lambda: _check_is_closed_day(logger), logger)
+            return _success_response(ctx, logger, f"샤드 작업자 {len(run['dispatched_shards'])}개를 호출하였습니다.",
+                                     run=run)
+
+        is_closed_day = None
+        if mode == 'worker':
+            if any(request.get(key) is None for key in ('run_id', 'shard', 'shard_count')):
+                raise exceptions.ConfigError("샤드 작업자 요청에 run_id, shard, shard_count가 필요합니다.")
+            run_id, shard, shard_count = request['run_id'], request['shard'], request['shard_count']
+            is_closed_day = request.get('is_closed_day')
+            all_stocks = sharding.select_shard(all_stocks, shard, shard_count)
+            logger.info(f"샤드 작업자 {run_id}/{shard}: 종목 {len(all_stocks)}개 처리")
+
+        # 3, 4. 주가(동기, 스레드에서 실행)와 뉴스(비동기) 수집을 동시에 실행
+        # 한쪽이 실패해도 다른 쪽이 끝날 때까지 기다린 뒤, 주가 -> 뉴스 순서로 첫 오류를 다시 발생시킴
+        loop = asyncio.get_running_loop()
+        price_result, news_result = await asyncio.gather(
+            loop.run_in_executor(None, _collect_stock_prices, tiingo_api_key, supabase, all_stocks, logger,
+                                 is_closed_day),
+            news_data.collect_and_save_news_async(supabase, all_stocks, logger),
+            return_exceptions=True,
+        )
+        try:
+            _raise_first_error(logger, price=price_result, news=news_result)
+        except Exception as e:
+            if mode == 'worker':
+                _report_shard_failure(supabase, request, e, logger)
+            raise
+        is_closed_day = price_result
+
+        # 작업자: 샤드 결과를 기록하고, 모든 샤드가 끝났을 때 마지막 작업자 한 곳만 완료 메시지를 보냄
+        run_summary = metrics.current().summary()
+        run_changes = changes.current().to_dict()
+        send_message = not is_closed_day
+        if mode == 'worker':
+            sharding.report_shard(supabase, run_id, shard, sharding.SUCCEEDED, logger, stock_count=len(all_stocks),
+                                  seconds=run_summary['total_seconds'], run_summary=run_summary,
+                                  run_changes=run_changes)
+            if not sharding.try_complete_run(supabase, run_id, logger):
+                logger.info("다른 샤드가 남아 있어 완료 메시지는 마지막 샤드에서 보냅니다.")
+                send_message = False
+            else:
+                run_summary = sharding.run_summary(supabase, run_id)
+                run_changes = sharding.run_changes(supabase, run_id)
+        # 증분 수집(시간 단위 실행)에서는 새로 저장된 데이터가 있을 때만 예측을 요청함
+        if send_message and watermarks.is_incremental() and not run_changes:
+            logger.info("증분 수집에서 새로 저장된 데이터가 없어 완료 메시지를 보내지 않습니다.")
+            send_message = False
 
         # 5. 작업 완료 및 메시징 큐에 메시지 삽입
         
         # 모든 작업이 성공적으로 끝난 후, 큐 모듈을 호출하여 메시지를 보냅니다. (금일이 휴장일이 아닐경우 예측 수행)
-        if not is_closed_day:
+        if send_message:
             logger.info("모든 데이터 수집 완료. 큐에 완료 메시지를 보냅니다.")
-            # queue_manager 모듈의 함수를 호출
-            queue_manager.send_completion_message(logger)
-        else:
+            # queue_manager 모듈의 함수를 호출 (새 데이터가 저장된 종목 목록과 이 시점까지의 실행 지표를 함께 담음)
+            with metrics.stage('queue_put'):
+                queue_manager.send_completion_message(logger, run_summary=run_summary, run_changes=run_changes,
+                                                      run_id=request.get('run_id'))
+        elif is_closed_day:
             logger.info("휴장일이므로 큐에 메시지를 보내지 않습니다.")
         
         logger.info("=== 모든 데이터 수집 파이프라인 성공적으로 완료 ===")
-        return response.Response(
-            ctx, response_data=json.dumps({
-                "created_date" : datetime.now(kst_timezone).strftime("%Y-%m-%d %H:%M:%S"),
-                "status" : "Success",
-                "message" : "주가/뉴스 데이터 수집을 정상적으로 수행하였습니다."
-            }),
-            headers={"Content-Type": "application/json"}
-        )
+        return _success_response(ctx, logger, "주가/뉴스 데이터 수집을 정상적으로 수행하였습니다.")
 
     except exceptions.ConfigError as e:
         logger.critical(f"설정 오류 발생: {e}", exc_info=True)
         return response.Response(
-            ctx, response_data=json.dumps({"status": "Config Error", "message": str(e)}),
+            ctx, response_data=json.dumps({"status": "Config Error", "message": str(e),
+                                          "metrics": metrics.finish_run(logger)}),
             headers={"Content-Type": "application/json"}, status_code=500
         )
     except exceptions.ApiError as e:
         logger.error(f"외부 API 오류 발생: {e}", exc_info=True)
+        # 연결이 끊어진 클라이언트를 다음 실행에서 재사용하지 않도록 버림
+        clients.discard(clients.TIINGO, clients.HTTP_SESSION)
         return response.Response(
-            ctx, response_data=json.dumps({"status": "API Error", "message": str(e)}),
+            ctx, response_data=json.dumps({"status": "API Error", "message": str(e),
+                                          "metrics": metrics.finish_run(logger)}),
             headers={"Content-Type": "application/json"}, status_code=503 # Service Unavailable
         )
     except exceptions.DbError as e:
         logger.error(f"데이터베이스 오류 발생: {e}", exc_info=True)
+        clients.discard(clients.SUPABASE)
         return response.Response(
-            ctx, response_data=json.dumps({"status": "Database Error", "message": str(e)}),
+            ctx, response_data=json.dumps({"status": "Database Error", "message": str(e),
+                                          "metrics": metrics.finish_run(logger)}),
             headers={"Content-Type": "application/json"}, status_code=503 # Service Unavailable
         )
     except Exception as e:
         # [수정] 이곳은 예측하지 못한 모든 예외를 잡는 최후의 보루입니다.
         logger.critical(f"파이프라인 실행 중 예측하지 못한 심각한 오류 발생: {e}", exc_info=True)
+        clients.discard()
         return response.Response(
-            ctx, response_data=json.dumps({"status": "Internal Server Error", "message": str(e)}),
+            ctx, response_data=json.dumps({"status": "Internal Server Error", "message": str(e),
+                                          "metrics": metrics.finish_run(logger)}),
             headers={"Content-Type": "application/json"}, status_code=500
         )
\ No newline at end of file
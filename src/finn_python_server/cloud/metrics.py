@@ -0,0 +1,175 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+
+import settings
+
+kst_timezone = pytz.timezone('Asia/Seoul')
+
+
+class RunMetrics:
+    """
+    한 번의 실행(invocation) 동안의 측정값을 모읍니다. 여러 스레드/코루틴에서 동시에 기록해도 안전합니다.
+    - stages: 단계별 소요 시간(초). 같은 단계를 여러 번(또는 동시에) 기록하면 합산됩니다.
+    - counters: 요청/재시도/캐시 적중/저장 행 수 등의 횟수
+    - latencies: 종목/요청 단위 지연 시간. 요약 시 p50/p90/p99/max로 집계합니다.
+    - dropped: 재시도 후에도 수집하지 못해 이번 실행에서 빠진 항목(종목 등)과 사유. 종류/사유별 개수는 모두 세고,
+      항목 자체는 종류마다 앞의 METRICS_DROPPED_SAMPLE_SIZE개만 보관합니다. (실패가 많은 실행에서도 요약 크기가 일정함)
+    """
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.started_date = datetime.now(kst_timezone).strftime('%Y-%m-%d %H:%M:%S')
+        self._stages = {}
+        self._counters = {}
+        self._latencies = {}
+        self._dropped = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.monotonic() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._latencies.setdefault(name, []).append(seconds)
+
+    def drop(self, kind, item, reason):
+        """kind(예: 'news') 수집에서 빠진 항목을 기록합니다. item은 JSON으로 직렬화할 수 있는 dict입니다."""
+        with self._lock:
+            dropped = self._dropped.setdefault(kind, {"count": 0, "reasons": {}, "items": []})
+            dropped["count"] += 1
+            dropped["reasons"][reason] = dropped["reasons"].get(reason, 0) + 1
+            if len(dropped["items"]) < settings.METRICS_DROPPED_SAMPLE_SIZE:
+                dropped["items"].append({**item, "reason": reason})
+            self._counters[f'dropped.{kind}'] = self._counters.get(f'dropped.{kind}', 0) + 1
+
+    def summary(self):
+        """JSON으로 직렬화할 수 있는 요약 dict를 반환합니다."""
+        with self._lock:
+            stages = {name: round(seconds, 3) for name, seconds in self._stages.items()}
+            counters = dict(self._counters)
+            latencies = {name: _percentiles(values) for name, values in self._latencies.items()}
+            dropped = {kind: {"count": entry["count"], "reasons": dict(entry["reasons"]), "items": list(entry["items"])}
+                       for kind, entry in self._dropped.items()}
+        return {
+            "started_date": self.started_date,
+            "total_seconds": round(time.monotonic() - self.started_at, 3),
+            "stages_seconds": stages,
+            "counters": counters,
+            "latency_ms": latencies,
+            "dropped": dropped,
+        }
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+
+    def rank(p):
+        # nearest-rank 방식
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000
+
+    return {"count": len(ordered), "p50": round(rank(50), 1), "p90": round(rank(90), 1),
+            "p99": round(rank(99), 1), "max": round(ordered[-1] * 1000, 1)}
+
+
+# --- 현재 실행 ---
+# OCI Functions 컨테이너는 한 번에 하나의 요청만 처리하므로 모듈 전역으로 현재 실행의 측정값을 공유함
+
+_current = RunMetrics()
+
+
+def start_run():
+    """새 실행의 측정을 시작합니다. (handler 시작 시 호출)"""
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+def current():
+    return _current
+
+
+def stage(name):
+    return _current.stage(name)
+
+
+def add_time(name, seconds):
+    _current.add_time(name, seconds)
+
+
+def incr(name, value=1):
+    _current.incr(name, value)
+
+
+def observe(name, seconds):
+    _current.observe(name, seconds)
+
+
+def drop(kind, item, reason):
+    _current.drop(kind, item, reason)
+
+
+# --- 내보내기 (sink) ---
+# sink는 emit(summary: dict) 메서드를 가진 객체입니다. register_sink로 새 종류를 등록하고
+# METRICS_SINKS 설정(쉼표 구분)으로 사용할 sink를 고릅니다.
+
+class LogSink:
+    """요약을 한 줄 JSON 로그로 남깁니다."""
+    def __init__(self, logger):
+        self.logger = logger
+
+    def emit(self, summary):
+        self.logger.info(f"실행 지표: {json.dumps(summary, ensure_ascii=False)}")
+
+
+class JsonLinesSink:
+    """요약을 JSON Lines 파일에 추가합니다."""
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, summary):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+
+_sink_factories = {
+    'log': lambda logger: LogSink(logger),
+    'jsonl': lambda logger: JsonLinesSink(settings.METRICS_JSONL_PATH),
+}
+
+
+def register_sink(name, factory):
+    """factory(logger) -> sink 를 name으로 등록합니다. METRICS_SINKS에 name을 넣으면 사용됩니다."""
+    _sink_factories[name] = factory
+
+
+def finish_run(logger):
+    """현재 실행의 요약을 설정된 모든 sink로 내보내고 반환합니다. sink 오류는 실행 결과에 영향을 주지 않습니다."""
+    summary = _current.summary()
+    for name in filter(None, (name.strip() for name in settings.METRICS_SINKS.split(','))):
+        factory = _sink_factories.get(name)
+        if factory is None:
+            logger.warning(f"알 수 없는 지표 sink '{name}' 는 건너뜁니다.")
+            continue
+        try:
+            factory(logger).emit(summary)
+        except Exception as e:
+            logger.warning(f"지표 sink '{name}' 내보내기 실패: {e}")
+    return summary
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+# 속도 제한/과부하로 간주하는 HTTP 상태 코드
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class _RequestTicket:
+    """limiter를 통과한 요청 하나의 결과(상태 코드)를 기록하는 객체"""
+    def __init__(self):
+        self.status = None
+        self.started_at = time.monotonic()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD(Additive Increase / Multiplicative Decrease) 방식으로 동시 요청 수를 조절하는 limiter 입니다.
+    - 응답이 정상(200)이고 지연 시간이 기준 이하이면 동시 요청 수를 조금씩 늘립니다.
+    - 429/503 응답이나 타임아웃이 발생하면 동시 요청 수를 빠르게(절반으로) 줄입니다.
+
+    사용 예시:
+        async with limiter.request() as ticket:
+            async with session.get(url) as response:
+                ticket.status = response.status
+    """
+    def __init__(self, min_limit=1, max_limit=16, initial_limit=4, latency_threshold=3.0,
+                 decrease_factor=0.5, logger=None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_threshold = latency_threshold
+        self.decrease_factor = decrease_factor
+        self.logger = logger
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        # 한 번의 과부하 신호에 이미 진행 중이던 요청들이 연달아 한도를 깎지 않도록 하는 기준 시각
+        self._last_decrease_at = 0.0
+
+    def request(self):
+        return _LimiterContext(self)
+
+    async def _acquire(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def _release(self, ticket, error):
+        latency = time.monotonic() - ticket.started_at
+        async with self._condition:
+            self.in_flight -= 1
+            if _is_overload(ticket.status, error):
+                self._on_overload(ticket.started_at)
+            elif error is None and ticket.status == 200 and latency <= self.latency_threshold:
+                self._on_success()
+            self._condition.notify_all()
+
+    def _on_success(self):
+        # 한도만큼의 요청이 성공할 때마다 한도를 1 늘리는 효과
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _on_overload(self, started_at):
+        if started_at < self._last_decrease_at:
+            return
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._last_decrease_at = time.monotonic()
+        if self.logger and int(previous) != int(self.limit):
+            self.logger.warning(f"뉴스 RSS 과부하 감지: 동시 요청 수를 {int(previous)} -> {int(self.limit)}로 줄입니다.")
+
+
+class _LimiterContext:
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.ticket = None
+
+    async def __aenter__(self):
+        await self.limiter._acquire()
+        self.ticket = _RequestTicket()
+        return self.ticket
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.limiter._release(self.ticket, exc)
+        return False
+
+
+def _is_overload(status, error):
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    return status in OVERLOAD_STATUS_CODES
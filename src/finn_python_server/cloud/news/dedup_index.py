@@ -0,0 +1,105 @@
+import hashlib
+import math
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# URL 비교 시 무시할 추적용 쿼리 파라미터
+_TRACKING_PARAM_PREFIXES = ('utm_',)
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'oc', 'ocid', 'cmpid', 'ref', 'hl', 'gl', 'ceid'}
+_NON_WORD_PATTERN = re.compile(r'[^\w]+')
+
+
+def canonicalize_url(url):
+    """스킴/호스트 소문자화, fragment 및 추적용 파라미터 제거 등으로 URL을 정규화합니다."""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith(_TRACKING_PARAM_PREFIXES)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def normalize_title(title, source=None):
+    """대소문자/유니코드 형태/구두점/공백 차이를 제거하고, Google News가 붙이는 ' - 언론사' 접미어를 제거합니다."""
+    if not title:
+        return ''
+    title = unicodedata.normalize('NFKC', title)
+    if source and title.endswith(f" - {source}"):
+        title = title[:-len(f" - {source}")]
+    return _NON_WORD_PATTERN.sub(' ', title.lower()).strip()
+
+
+def build_dedup_key(news):
+    """정규화된 URL과 제목으로 뉴스 한 건의 중복 판별 키(sha1 hex)를 만듭니다."""
+    raw = canonicalize_url(news.get('original_url')) + '\n' + normalize_title(news.get('title'), news.get('source'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class BloomFilter:
+    """
+    이미 저장된 뉴스 키를 적은 메모리로 기억하기 위한 블룸 필터입니다.
+    '없음' 판정은 항상 정확하고, '있음' 판정은 false_positive_rate 확률로 틀릴 수 있습니다.
+    """
+    def __init__(self, expected_items, false_positive_rate=0.0001):
+        expected_items = max(1, expected_items)
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # 키가 이미 sha1 hex 이므로 상위/하위 64비트를 이용한 double hashing 으로 위치를 계산
+        digest = bytes.fromhex(key) if len(key) == 40 else hashlib.sha1(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def load_saved_keys(supabase, since, logger, page_size=1000):
+    """
+    since 이후 발행된 뉴스의 (stock_id, dedup_key)를 페이지 단위로 한 번에 읽어 블룸 필터를 만듭니다.
+    기사마다 DB를 조회하지 않도록 실행당 한 번만 호출합니다.
+    """
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('news').select('stock_id, dedup_key') \
+            .gte('published_date', since) \
+            .not_.is_('dedup_key', 'null') \
+            .range(offset, offset + page_size - 1) \
+            .execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+    bloom = BloomFilter(expected_items=len(rows) * 2)
+    for row in rows:
+        bloom.add(_scoped_key(row['stock_id'], row['dedup_key']))
+    logger.info(f"뉴스 중복 인덱스 로드 완료: {len(rows)}개 키 (필터 크기 {len(bloom._bits)} bytes)")
+    return bloom
+
+
+def drop_already_saved(all_news, bloom):
+    """각 뉴스에 dedup_key를 채우고, 블룸 필터에 이미 있는 뉴스는 제외합니다."""
+    fresh = []
+    for news in all_news:
+        news['dedup_key'] = build_dedup_key(news)
+        if _scoped_key(news.get('stock_id'), news['dedup_key']) in bloom:
+            continue
+        fresh.append(news)
+    return fresh
+
+
+def _scoped_key(stock_id, dedup_key):
+    # 같은 기사가 여러 종목에 저장될 수 있으므로 종목 단위로 키를 구분
+    return hashlib.sha1(f"{stock_id}:{dedup_key}".encode('utf-8')).hexdigest()
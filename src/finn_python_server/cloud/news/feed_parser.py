@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+import sys,os
+base_dir = os.path.dirname(__file__)
+parent_path = os.path.join(base_dir, '..')
+sys.path.append(parent_path)
+import settings
+
+# 증분 파서에 한 번에 넣을 문자 수. limit개 항목을 찾으면 나머지는 읽지 않음
+_CHUNK_SIZE = 16 * 1024
+
+
+def parse_feed_entries(feed_text, limit, engine='incremental'):
+    """
+    RSS 피드에서 앞쪽 limit개 항목을 읽어 dict 리스트로 반환합니다.
+    각 항목: {'title', 'link', 'published': (년, 월, 일, 시, 분, 초) UTC 또는 None, 'source': 언론사 이름 또는 None}
+    반환값은 프로세스 풀에서도 전달할 수 있도록 기본 타입으로만 구성됩니다.
+    """
+    if engine == 'incremental':
+        try:
+            return _parse_incremental(feed_text, limit)
+        except ET.ParseError:
+            pass  # 형식이 깨진 피드는 관대한 feedparser로 다시 파싱
+    return _parse_with_feedparser(feed_text, limit)
+
+
+def _parse_incremental(feed_text, limit):
+    parser = ET.XMLPullParser(events=('end',))
+    entries = []
+    for offset in range(0, len(feed_text), _CHUNK_SIZE):
+        parser.feed(feed_text[offset:offset + _CHUNK_SIZE])
+        for _, element in parser.read_events():
+            if element.tag != 'item':
+                continue
+            entries.append(_entry_from_item(element))
+            element.clear()
+            if len(entries) >= limit:
+                return entries
+    parser.close()
+    return entries
+
+
+def _entry_from_item(item):
+    return {
+        'title': item.findtext('title') or '',
+        'link': item.findtext('link'),
+        'published': _parse_pub_date(item.findtext('pubDate')),
+        'source': item.findtext('source'),
+    }
+
+
+def _parse_pub_date(value):
+    if not value:
+        return None
+    try:
+        published = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc)
+    return published.timetuple()[:6]
+
+
+def _parse_with_feedparser(feed_text, limit):
+    import feedparser
+    feed = feedparser.parse(feed_text)
+    entries = []
+    for entry in feed.entries[:limit]:
+        published = entry.get('published_parsed')
+        entries.append({
+            'title': entry.get('title', ''),
+            'link': entry.get('link'),
+            'published': tuple(published[:6]) if published else None,
+            'source': entry.get('source', {}).get('title'),
+        })
+    return entries
+
+
+# --- 작업자 풀 ---
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """설정(NEWS_PARSE_EXECUTOR)에 따른 파싱용 풀을 반환합니다. 'inline'이면 None."""
+    global _executor
+    kind = settings.NEWS_PARSE_EXECUTOR
+    if kind == 'inline':
+        return None
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, settings.NEWS_PARSE_WORKERS)
+            if kind == 'process':
+                try:
+                    _executor = ProcessPoolExecutor(max_workers=workers)
+                except (OSError, NotImplementedError):
+                    # /dev/shm 이 없는 등 프로세스 풀을 만들 수 없는 환경에서는 스레드 풀 사용
+                    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feed-parse')
+            else:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feed-parse')
+        return _executor
+
+
+async def parse_feed_entries_async(feed_text, limit, engine=None):
+    """parse_feed_entries를 작업자 풀에서 실행하여 이벤트 루프가 다른 요청을 계속 처리할 수 있게 합니다."""
+    engine = engine or settings.NEWS_FEED_PARSER
+    executor = _get_executor()
+    if executor is None:
+        return parse_feed_entries(feed_text, limit, engine)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, parse_feed_entries, feed_text, limit, engine)
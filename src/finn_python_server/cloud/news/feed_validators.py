@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import sys,os
+base_dir = os.path.dirname(__file__)
+parent_path = os.path.join(base_dir, '..')
+sys.path.append(parent_path)
+import settings
+
+import pytz
+kst_timezone = pytz.timezone('Asia/Seoul')
+
+# 한 번의 조회에 넣을 url_hash 개수 (요청 URL 길이 제한)
+_LOAD_CHUNK_SIZE = 100
+
+
+def url_hash(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def content_hash(entries):
+    """
+    파싱한 피드 항목(feed_parser 결과)의 정규화된 해시입니다. (link, title, published) 묶음을 정렬하여 계산하므로
+    응답마다 바뀌는 채널 정보(lastBuildDate 등)나 항목 순서와 관계없이, 같은 항목이면 같은 값입니다.
+    """
+    digest = hashlib.sha1()
+    for link, title, published in sorted((entry.get('link') or '', entry.get('title') or '',
+                                          str(tuple(entry['published'] or ())))
+                                         for entry in entries):
+        digest.update(f"{link}\x1f{title}\x1f{published}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FeedValidatorStore:
+    """
+    RSS 검색 URL별로 마지막으로 처리한 응답의 검증자(ETag, Last-Modified)와 항목 해시(content_hash)를 보관합니다.
+    (news_feed_validators 테이블, url_hash 기준)
+    - request_headers: 저장된 검증자로 조건부 요청 헤더(If-None-Match / If-Modified-Since)를 만듭니다.
+    - is_unchanged: 304가 아니어도 파싱한 항목의 해시가 같으면 변경 없음으로 봅니다. (검증자를 주지 않는 서버, 응답 캐시 적중)
+    - remember: 이번 실행에서 처리한 응답을 기록해 두고, 저장이 끝난 뒤 save()로 한 번에 반영합니다.
+      (저장 전에 실패한 실행의 피드를 다음 실행에서 건너뛰지 않도록 함)
+    """
+    def __init__(self, rows=()):
+        self._saved = {row['url_hash']: row for row in rows}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._saved)
+
+    def request_headers(self, url):
+        row = self._saved.get(url_hash(url))
+        if not row:
+            return None
+        headers = {}
+        if row.get('etag'):
+            headers['If-None-Match'] = row['etag']
+        if row.get('last_modified'):
+            headers['If-Modified-Since'] = row['last_modified']
+        return headers or None
+
+    def is_unchanged(self, url, text_hash):
+        row = self._saved.get(url_hash(url))
+        return bool(row) and row.get('content_hash') == text_hash
+
+    def remember(self, url, etag, last_modified, text_hash):
+        with self._lock:
+            self._pending[url_hash(url)] = {'url_hash': url_hash(url), 'etag': etag, 'last_modified': last_modified,
+                                            'content_hash': text_hash}
+
+    def pending_rows(self):
+        with self._lock:
+            return list(self._pending.values())
+
+
+def load(supabase, urls, logger):
+    """urls의 저장된 검증자를 불러옵니다. 실패하면 빈 저장소를 반환합니다. (조건부 요청은 최적화 용도)"""
+    hashes = sorted({url_hash(url) for url in urls})
+    rows = []
+    try:
+        for start in range(0, len(hashes), _LOAD_CHUNK_SIZE):
+            rows.extend(supabase.table('news_feed_validators')
+                        .select('url_hash, etag, last_modified, content_hash')
+                        .in_('url_hash', hashes[start:start + _LOAD_CHUNK_SIZE])
+                        .execute().data or [])
+    except Exception as e:
+        logger.warning(f"뉴스 피드 검증자 로드 실패, 모든 피드를 새로 받습니다: {e}")
+        return FeedValidatorStore()
+    logger.info(f"뉴스 피드 검증자 {len(rows)}/{len(hashes)}개 로드")
+    return FeedValidatorStore(rows)
+
+
+def save(supabase, store, logger):
+    """이번 실행에서 처리한 피드의 검증자를 저장하고, 보관 기간이 지난 항목을 지웁니다. 실패해도 예외를 발생시키지 않습니다."""
+    rows = store.pending_rows()
+    if not rows:
+        return
+    now = datetime.now(kst_timezone)
+    for row in rows:
+        row['updated_at'] = now.isoformat()
+    try:
+        supabase.table('news_feed_validators').upsert(rows, on_conflict='url_hash').execute()
+        cutoff = (now - timedelta(days=settings.NEWS_VALIDATOR_RETENTION_DAYS)).isoformat()
+        supabase.table('news_feed_validators').delete().lt('updated_at', cutoff).execute()
+        logger.info(f"뉴스 피드 검증자 {len(rows)}개 저장")
+    except Exception as e:
+        logger.warning(f"뉴스 피드 검증자 저장 실패, 다음 실행에서 해당 피드를 다시 처리합니다: {e}")
@@ -0,0 +1,251 @@
+import numpy as np
+
+from news.dedup_index import normalize_title
+
+_MIX_CONSTANT = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT_32 = np.uint64(32)
+# 서명 일치율로 후보를 1차로 거를 때 허용하는 오차 (num_perm=128 기준 추정치 표준편차의 약 3배)
+_ESTIMATE_MARGIN = 0.15
+# 한 번에 서명을 계산할 제목 수와, 그 안에서 한 번에 계산할 해시 함수(순열) 수
+# (임시 행렬은 _PERM_BLOCK_SIZE x 샹글 수 크기. 제목 1000개 기준 num_perm 전체를 한 번에 만들면 약 80MB)
+_CHUNK_SIZE = 1000
+_PERM_BLOCK_SIZE = 8
+# NearDuplicateStream이 보관하는 샹글 캐시의 최대 제목 수
+_SHINGLE_CACHE_SIZE = 4096
+# NearDuplicateStream 보관 묶음의 서명 배열 초기 행 수 (종목별로 새로 만들므로 작게 시작해 2배씩 늘림)
+_KEPT_INITIAL_ROWS = 64
+
+
+class NearDuplicateDetector:
+    """
+    문자 n-gram 샹글 기반 MinHash + LSH 밴딩으로 유사 제목 뉴스를 찾아 제거합니다.
+    - 제목 수에 대해 거의 선형 시간으로 동작합니다. (후보 쌍만 비교)
+    - threshold: LSH로 찾은 후보 쌍의 샹글 Jaccard 유사도가 이 값 이상이면 중복으로 판단
+    - scope: 'global'이면 전체 종목을 통틀어, 'stock'이면 같은 stock_id 안에서만 중복을 판단
+    """
+    def __init__(self, threshold=0.6, num_perm=128, shingle_size=3, scope='global', seed=1):
+        if scope not in ('global', 'stock'):
+            raise ValueError(f"지원하지 않는 scope 입니다: {scope}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.scope = scope
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        # 순열 대신 multiply-shift 해시 (a * x + b) >> 32 를 사용 (a는 홀수, uint64 오버플로는 의도된 동작)
+        generator = np.random.default_rng(seed)
+        self._a = (generator.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+        self._b = generator.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)[:, None]
+        # 밴드 하나(rows개 값)를 정수 하나로 요약하기 위한 계수
+        self._band_weights = generator.integers(0, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    def remove_duplicates(self, all_news, key='title'):
+        """입력 순서상 먼저 나온 뉴스를 남기고, 그와 유사한 이후 뉴스는 제외한 리스트를 반환합니다."""
+        if not all_news:
+            return []
+        texts = [normalize_title(news.get(key), news.get('source')) for news in all_news]
+        signatures = self.signatures(texts)
+        band_hashes = self._band_hashes(signatures).tolist()
+
+        buckets = {}
+        shingle_cache = {}
+        keep_rows = []
+        for index, news in enumerate(all_news):
+            scope_key = news.get('stock_id') if self.scope == 'stock' else None
+            band_keys = [(scope_key, band, band_hash) for band, band_hash in enumerate(band_hashes[index])]
+
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(buckets.get(band_key, ()))
+            if candidates and self._has_duplicate(texts, signatures, index, candidates, shingle_cache):
+                continue
+
+            keep_rows.append(news)
+            for band_key in band_keys:
+                buckets.setdefault(band_key, []).append(index)
+        return keep_rows
+
+    def _has_duplicate(self, texts, signatures, index, candidates, shingle_cache):
+        candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        # 1차: 서명 일치율(추정 Jaccard)로 명백히 다른 후보를 한 번에 걸러냄
+        agreement = np.count_nonzero(signatures[candidates] == signatures[index], axis=1) / self.num_perm
+        close = candidates[agreement >= self.threshold - _ESTIMATE_MARGIN]
+        # 2차: MinHash 추정치는 짧은 제목에서 오차가 크므로 남은 후보만 실제 Jaccard 유사도로 확인
+        return any(self._jaccard(texts, index, other, shingle_cache) >= self.threshold for other in close.tolist())
+
+    def _jaccard(self, texts, left, right, shingle_cache):
+        for index in (left, right):
+            if index not in shingle_cache:
+                shingle_cache[index] = _shingles(texts[index].encode('utf-8').ljust(self.shingle_size),
+                                                 self.shingle_size)
+        a, b = shingle_cache[left], shingle_cache[right]
+        return len(a & b) / len(a | b)
+
+    def _band_hashes(self, signatures):
+        banded = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        return (banded * self._band_weights).sum(axis=2, dtype=np.uint64)
+
+    def signatures(self, texts):
+        """각 텍스트의 MinHash 서명을 (len(texts), num_perm) 크기의 uint64 행렬로 계산합니다."""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(texts), _CHUNK_SIZE):
+            chunk = texts[start:start + _CHUNK_SIZE]
+            result[start:start + len(chunk)] = self._signatures_for_chunk(chunk)
+        return result
+
+    def _signatures_for_chunk(self, texts):
+        n = self.shingle_size
+        # n 바이트보다 짧은 제목도 최소 1개의 샹글을 갖도록 공백으로 채움
+        encoded = [text.encode('utf-8').ljust(n) for text in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        counts = lengths - n + 1
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        # 각 제목 내부에서만 n-gram 시작 위치를 만든 뒤, n 바이트를 하나의 정수로 묶음
+        positions = np.arange(counts.sum()) + np.repeat(starts - offsets, counts)
+        grams = np.zeros(len(positions), dtype=np.uint64)
+        for k in range(n):
+            grams |= buffer[positions + k] << np.uint64(8 * k)
+        hashes = (grams * _MIX_CONSTANT) >> _SHIFT_32
+
+        # 해시 함수를 _PERM_BLOCK_SIZE개씩 나누어 같은 임시 행렬을 재사용하며 제목별 최솟값을 구함
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        block = np.empty((_PERM_BLOCK_SIZE, len(hashes)), dtype=np.uint64)
+        for start in range(0, self.num_perm, _PERM_BLOCK_SIZE):
+            stop = min(start + _PERM_BLOCK_SIZE, self.num_perm)
+            permuted = block[:stop - start]
+            np.multiply(self._a[start:stop], hashes[None, :], out=permuted)
+            np.add(permuted, self._b[start:stop], out=permuted)
+            np.right_shift(permuted, _SHIFT_32, out=permuted)
+            result[:, start:stop] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+
+class _KeptRows:
+    """NearDuplicateStream이 비교 대상으로 보관하는 뉴스 묶음 (정규화한 제목, uint32 서명, LSH 버킷, 샹글 캐시)"""
+    def __init__(self, num_perm):
+        self.texts = []
+        self.signatures = np.empty((_KEPT_INITIAL_ROWS, num_perm), dtype=np.uint32)
+        self.buckets = {}
+        self.shingle_cache = {}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def append(self, text, signature, band_keys):
+        index = len(self.texts)
+        if index == len(self.signatures):
+            grown = np.empty((len(self.signatures) * 2, self.signatures.shape[1]), dtype=np.uint32)
+            grown[:index] = self.signatures
+            self.signatures = grown
+        self.signatures[index] = signature
+        self.texts.append(text)
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, []).append(index)
+
+    def has_duplicate(self, detector, text, signature, band_keys, shingles):
+        candidates = set()
+        for band_key in band_keys:
+            candidates.update(self.buckets.get(band_key, ()))
+        if not candidates:
+            return False
+        candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        # NearDuplicateDetector._has_duplicate와 같은 2단계 확인 (서명 일치율 -> 실제 Jaccard)
+        agreement = np.count_nonzero(self.signatures[candidates] == signature, axis=1) / detector.num_perm
+        close = candidates[agreement >= detector.threshold - _ESTIMATE_MARGIN].tolist()
+        if not close:
+            return False
+        current = shingles()
+        # 자주 후보가 되는 제목의 샹글은 재사용하되, 보관하는 뉴스 전체의 샹글을 들고 있지 않도록 크기를 제한
+        if len(self.shingle_cache) > _SHINGLE_CACHE_SIZE:
+            self.shingle_cache = {}
+        for other in close:
+            if other not in self.shingle_cache:
+                self.shingle_cache[other] = _shingles(self.texts[other].encode('utf-8').ljust(detector.shingle_size),
+                                                      detector.shingle_size)
+            other_shingles = self.shingle_cache[other]
+            if len(current & other_shingles) / len(current | other_shingles) >= detector.threshold:
+                return True
+        return False
+
+
+class NearDuplicateStream:
+    """
+    NearDuplicateDetector를 여러 묶음에 차례로 적용합니다. (스트리밍 수집용)
+    각 묶음은 앞선 묶음에서 남긴 뉴스와도 비교하되, 비교 대상으로 보관하는 뉴스를 다음과 같이 제한하여
+    메모리가 저장하는 뉴스 수에 비례해 늘지 않게 합니다.
+    - scope='stock': 뉴스는 종목 순서대로 들어오므로, stock_id가 바뀌면 이전 종목의 보관 내용을 버립니다.
+      (종목별로 묶여 들어오면 NearDuplicateDetector(scope='stock')와 같은 뉴스가 남음)
+    - scope='global': 최근 남긴 뉴스 max_rows~2 x max_rows개와만 비교합니다. (두 세대를 번갈아 교체)
+    서명 값은 32비트 안에 들어가므로 uint32로 저장하여 크기를 절반으로 줄입니다.
+    """
+    def __init__(self, threshold=0.6, scope='stock', max_rows=20000):
+        self.detector = NearDuplicateDetector(threshold=threshold, scope=scope)
+        self.max_rows = max_rows
+        self._scope_key = None
+        self._current = _KeptRows(self.detector.num_perm)
+        self._previous = None
+
+    def filter(self, news_batch, key='title'):
+        """news_batch 중 앞선 뉴스(이전 묶음 포함)와 유사하지 않은 뉴스만 입력 순서대로 반환합니다."""
+        if not news_batch:
+            return []
+        detector = self.detector
+        texts = [normalize_title(news.get(key), news.get('source')) for news in news_batch]
+        signatures = detector.signatures(texts)
+        band_hashes = detector._band_hashes(signatures).tolist()
+        signatures = signatures.astype(np.uint32)
+
+        keep_rows = []
+        for position, news in enumerate(news_batch):
+            if detector.scope == 'stock' and news.get('stock_id') != self._scope_key:
+                self._scope_key = news.get('stock_id')
+                self._current, self._previous = _KeptRows(detector.num_perm), None
+            text, signature = texts[position], signatures[position]
+            band_keys = list(enumerate(band_hashes[position]))
+            shingles = _lazy(lambda: _shingles(text.encode('utf-8').ljust(detector.shingle_size),
+                                               detector.shingle_size))
+            if any(kept.has_duplicate(detector, text, signature, band_keys, shingles)
+                   for kept in (self._current, self._previous) if kept is not None):
+                continue
+
+            if len(self._current) >= self.max_rows:
+                self._previous, self._current = self._current, _KeptRows(detector.num_perm)
+            self._current.append(text, signature, band_keys)
+            keep_rows.append(news)
+        return keep_rows
+
+
+def _lazy(compute):
+    """처음 호출할 때 한 번만 계산하는 함수"""
+    cache = []
+
+    def get():
+        if not cache:
+            cache.append(compute())
+        return cache[0]
+    return get
+
+
+def _shingles(encoded, n):
+    return {encoded[i:i + n] for i in range(len(encoded) - n + 1)}
+
+
+def _optimal_bands(threshold, num_perm):
+    """
+    밴드 수 b와 밴드당 행 수 r을 고릅니다.
+    후보는 이후 실제 Jaccard로 다시 확인하므로 재현율을 우선하여,
+    LSH 임계값 (1/b)^(1/r)이 threshold의 75% 이하가 되는 가장 큰 r을 사용합니다.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) > threshold * 0.75:
+            break
+        best = (bands, rows)
+    return best
+
+
+def remove_near_duplicate_titles(all_news, threshold=0.6, scope='global'):
+    return NearDuplicateDetector(threshold=threshold, scope=scope).remove_duplicates(all_news)
@@ -1,78 +1,250 @@
-import feedparser
 from datetime import datetime, timedelta
-import pandas as pd
-from supabase import create_client, Client
 import asyncio 
-import aiohttp 
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import sys,os
 base_dir = os.path.dirname(__file__)
 parent_path = os.path.join(base_dir, '..')
 sys.path.append(parent_path)
 import exceptions
+import metrics
+import changes
+import settings
+import watermarks
+from stock import trading_calendar
+from bulk_writer import bulk_write
+from news.adaptive_limiter import AdaptiveConcurrencyLimiter
+from news import dedup_index
+from news.near_dup import NearDuplicateStream
+from news import feed_parser
+from news import news_stream
+from news import feed_validators
+from news import window_planner
+from news.news_stream import NewsRow
+from news.resilient_fetch import ResilientFetcher
+from fetch_cache import get_fetch_cache
+import clients
 
 import pytz
 kst_timezone = pytz.timezone('Asia/Seoul')
 
+# 스트리밍 수집에서 중복 제거를 한 번에 처리할 행 수 (작업자 스레드 전환과 서명 계산 호출 횟수를 줄임)
+_DEDUP_BATCH_ROWS = 256
+# RSS 응답 하나에서 읽을 최대 항목 수. 여러 날에 걸친 구간의 결과가 이만큼이면 구간을 나누어 다시 요청함
+_FEED_ITEM_LIMIT = 30
+# 뉴스 published_date 형식 (피드의 발행 시각은 UTC, 시간대 표기 없음)
+_PUBLISHED_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
 async def collect_and_save_news_async(supabase, stocks, logger):
-    """뉴스 데이터 수집부터 저장까지의 전체 과정을 비동기적으로 실행하는 메인 함수"""
+    """
+    뉴스 데이터 수집부터 저장까지의 전체 과정을 비동기적으로 실행하는 메인 함수
+    종목별 수집 결과를 모두 모아 두지 않고, 종목 순서대로 유사 제목 제거 -> 이미 저장된 뉴스 제외 -> 일정 행 수마다 저장합니다.
+    증분 수집 모드(COLLECTION_MODE=incremental)에서는 종목별 워터마크 이후에 발행된 뉴스만 저장합니다.
+    """
     logger.info("--- 뉴스 데이터 수집 작업 시작 ---")
     
     end_day = datetime.now(kst_timezone)
     start_day = end_day - timedelta(days=1)
     
-    all_news = await _get_news_data_async(stocks, start_day, end_day, logger)
-    if all_news:
-        _save_news_in_db(all_news, supabase, logger)
+    with metrics.stage('news_pipeline'):
+        watermark_store = None
+        if watermarks.is_incremental():
+            watermark_store = await asyncio.get_running_loop().run_in_executor(
+                None, watermarks.load, supabase, watermarks.NEWS, [stock.get('id') for stock in stocks], logger)
+        await _stream_news_async(supabase, stocks, start_day, end_day, logger, watermark_store=watermark_store)
         
     logger.info("--- 뉴스 데이터 수집 작업 완료 ---")
 
 
-async def _get_news_data_async(stocks, start_day, end_day, logger):
-    sem = asyncio.Semaphore(1)
-    
-    tasks = []
-    logger.info(f"{len(stocks)}개 주식에 대한 뉴스 동시 수집 시작...")
-
-    # 각 기업(stock)에 대해 독립적인 작업을 생성
-    async with aiohttp.ClientSession() as session:
-        for stock in stocks:
-            query = stock.get('search_keyword')
-            stock_id = stock.get('id')
-            if not query:
-                continue
-
-            # _fetch_news_rss_day_async 코루틴을 직접 실행하는 task를 만듦
-            async def task_coro(q, s_id):
-                async with sem:
-                    return await _fetch_news_rss_day_async(logger, session, q, s_id, start_day, end_day)
-            
-            tasks.append(task_coro(query, stock_id))
-
-        results = await asyncio.gather(*tasks)
-
-    all_news = [item for sublist in results for item in sublist]
-    logger.info(f"총 {len(all_news)}개의 뉴스 기사 수집 완료. 중복 제거 시작...")
-    
-    unique_news = _remove_duplicate_titles_by_prefix(all_news, prefix_length=50)
-    logger.info(f"중복 제거 후 {len(unique_news)}개의 뉴스 기사 남음.")
-    
-    return unique_news
+async def _stream_news_async(supabase, stocks, start_day, end_day, logger, watermark_store=None):
+    loop = asyncio.get_running_loop()
+    targets = [stock for stock in stocks if stock.get('search_keyword')]
+    # 종목별 수집 구간 (증분 수집 모드에서 워터마크가 있는 종목만, 나머지는 [start_day, end_day))
+    windows = _incremental_windows(targets, watermark_store, end_day) if watermark_store is not None else {}
+    earliest_day = min([start_day] + [window[0] for window in windows.values()])
+    # 이미 저장된 뉴스 키는 수집과 동시에 불러오고, 첫 수집 결과를 거를 때 기다림
+    saved_keys = loop.run_in_executor(None, _load_saved_keys, supabase, earliest_day, logger)
+
+    limiter = AdaptiveConcurrencyLimiter(min_limit=settings.NEWS_MIN_CONCURRENCY,
+                                         max_limit=settings.NEWS_MAX_CONCURRENCY,
+                                         initial_limit=settings.NEWS_INITIAL_CONCURRENCY,
+                                         latency_threshold=settings.NEWS_LATENCY_THRESHOLD_SECONDS,
+                                         logger=logger)
+    cache = get_fetch_cache()
+    # 웜 컨테이너에서는 이전 실행의 keep-alive 연결을 재사용함
+    session = clients.get_http_session()
+    # 모든 종목의 요청이 하나의 차단기를 공유하여, 속도 제한이 명확하면 전체 요청을 잠시 멈춤
+    fetcher = ResilientFetcher(session, limiter, logger)
+    near_dup = NearDuplicateStream(threshold=settings.NEWS_NEAR_DUP_THRESHOLD, scope=settings.NEWS_NEAR_DUP_SCOPE,
+                                   max_rows=settings.NEWS_NEAR_DUP_WINDOW_ROWS)
+    writer = _NewsWriter(supabase, logger)
+    counts = {'collected': 0, 'unique': 0, 'below_watermark': 0}
+    window_stats = window_planner.WindowStats()
+
+    def window_of(stock):
+        return windows.get(stock.get('id'), (start_day, end_day, None))
+
+    validators = None
+    if settings.NEWS_CONDITIONAL_GET_ENABLED:
+        urls = [_generate_google_rss_url(stock['search_keyword'], window_of(stock)[0].strftime("%Y-%m-%d"),
+                                         window_of(stock)[1].strftime("%Y-%m-%d")) for stock in targets]
+        validators = await loop.run_in_executor(None, feed_validators.load, supabase, urls, logger)
+    logger.info(f"{len(targets)}개 주식에 대한 뉴스 스트리밍 수집 시작..."
+                + (f" (증분 수집: 워터마크가 있는 종목 {len(windows)}개)" if watermark_store is not None else ""))
+
+    async def fetch(stock):
+        window_start, window_end, _ = window_of(stock)
+
+        def fetch_window(start, end):
+            # 동시 요청 수는 limiter가 응답 상태/지연 시간에 따라 조절함
+            return _fetch_news_rss_day_async(logger, session, stock['search_keyword'], stock.get('id'), start, end,
+                                             limiter, limit=_FEED_ITEM_LIMIT, cache=cache, fetcher=fetcher,
+                                             compact=True, validators=validators)
+
+        if (window_end - window_start).days <= 1:
+            return await fetch_window(window_start, window_end)
+        # 며칠에 걸친 구간(오래 실행되지 않은 종목)은 결과가 상한에 닿은 구간만 나누어 다시 받음
+        return await window_planner.fetch_windows(fetch_window, window_start, window_end, _FEED_ITEM_LIMIT,
+                                                  stats=window_stats)
+
+    def dedup(rows, bloom):
+        started = time.monotonic()
+        rows = near_dup.filter(rows)
+        counts['unique'] += len(rows)
+        rows = dedup_index.drop_already_saved(rows, bloom)
+        metrics.add_time('news_dedup', time.monotonic() - started)
+        return rows
+
+    pending_rows = []
+
+    async def flush_pending():
+        if not pending_rows:
+            return
+        rows = pending_rows[:]
+        pending_rows.clear()
+        bloom = await saved_keys
+        # 중복 제거는 CPU 작업이므로 이벤트 루프를 막지 않도록 작업자 스레드에서 실행 (수집 순서대로 한 묶음씩)
+        await writer.add(await loop.run_in_executor(dedup_executor, dedup, rows, bloom))
+
+    async def consume(stock, rows):
+        if watermark_store is not None:
+            since = window_of(stock)[2]
+            if since:
+                fetched = len(rows)
+                rows = [row for row in rows if row.published_date[:19] > since]
+                counts['below_watermark'] += fetched - len(rows)
+            # 워터마크는 저장이 모두 끝난 뒤에 반영됨 (watermarks.save)
+            watermark_store.advance(stock.get('id'), max((row.published_date[:19] for row in rows), default=None))
+        counts['collected'] += len(rows)
+        pending_rows.extend(rows)
+        if len(pending_rows) >= _DEDUP_BATCH_ROWS:
+            await flush_pending()
+
+    # 중복 제거는 전용 스레드 하나에서만 실행 (순서 보장, 임시 배열 메모리가 여러 스레드의 할당 영역에 남지 않게 함)
+    dedup_executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        with metrics.stage('news_stream'):
+            peak_bytes = await news_stream.for_each_ordered(
+                targets, fetch, consume, max_pending=settings.NEWS_STREAM_MAX_PENDING,
+                high_water_bytes=int(settings.NEWS_STREAM_HIGH_WATER_MB * 1024 ** 2), logger=logger)
+            await flush_pending()
+            await writer.flush()
+    finally:
+        dedup_executor.shutdown(wait=False)
+    if validators is not None:
+        # 모든 뉴스 저장이 끝난 뒤에만 검증자를 갱신 (도중에 실패한 실행의 피드는 다음 실행에서 다시 처리)
+        await loop.run_in_executor(None, feed_validators.save, supabase, validators, logger)
+    if watermark_store is not None:
+        await loop.run_in_executor(None, watermarks.save, supabase, watermark_store, logger)
+        metrics.incr('news_below_watermark', counts['below_watermark'])
+        logger.info(f"워터마크 이전에 발행되어 제외한 뉴스 {counts['below_watermark']}개")
+    if window_stats.splits:
+        metrics.incr('news_window_splits', window_stats.splits)
+    metrics.incr('news_buffer_peak_bytes', peak_bytes)
+    logger.info(f"뉴스 수집 종료 시점 동시 요청 한도: {int(limiter.limit)}, 대기 버퍼 최대 {peak_bytes / 1024:.0f}KB")
+    cache.log_stats(logger)
+    logger.info(f"총 {counts['collected']}개의 뉴스 기사 수집, 유사 제목 제거 후 {counts['unique']}개, "
+                f"이전 실행과 중복 제외 후 {writer.rows}개 저장 요청 (새로 저장 {writer.written}개)")
+
+
+def _incremental_windows(stocks, watermark_store, end_day):
+    """
+    증분 수집 모드에서 워터마크가 있는 종목의 수집 구간 {stock_id: (시작일, 종료일, 기준 발행 시각)}
+    워터마크(마지막으로 수집한 뉴스의 발행 시각, UTC)에서 INCREMENTAL_NEWS_OVERLAP_MINUTES를 뺀 기준 시각이 속한
+    미국 날짜부터 오늘까지 받고(최대 INCREMENTAL_MAX_LOOKBACK_DAYS일), 기준 시각 이후에 발행된 뉴스만 사용합니다.
+    시작일과 조회 한도는 기준 시각과 실행 시각을 모두 trading_calendar.session_date(뉴욕 날짜)로 바꾸어 정합니다.
+    (한국 날짜와 UTC 날짜를 섞어 비교하면 날짜 경계에서 방금 끝난 거래일의 뉴스를 놓치거나 하루를 더 받음)
+    """
+    today = end_day.replace(hour=0, minute=0, second=0, microsecond=0)
+    earliest = trading_calendar.session_date(end_day) - timedelta(days=settings.INCREMENTAL_MAX_LOOKBACK_DAYS)
+    windows = {}
+    for stock in stocks:
+        watermark = watermark_store.get(stock.get('id'))
+        if not watermark:
+            continue
+        since = (datetime.strptime(watermark[:19], _PUBLISHED_FORMAT)
+                 - timedelta(minutes=settings.INCREMENTAL_NEWS_OVERLAP_MINUTES))
+        start = max(trading_calendar.session_date(pytz.utc.localize(since)), earliest)
+        # 종료일은 한국 날짜 다음 날 (뉴욕/UTC 날짜보다 늦지 않으므로 방금 발행된 뉴스까지 포함)
+        windows[stock.get('id')] = (today.replace(year=start.year, month=start.month, day=start.day),
+                                    today + timedelta(days=1), since.strftime(_PUBLISHED_FORMAT))
+    return windows
+
+
+def _load_saved_keys(supabase, start_day, logger):
+    """이전 실행에서 이미 저장한 뉴스 키를 실행당 1회 불러옵니다. (뉴스마다 DB 왕복하지 않음)"""
+    since = (start_day - timedelta(days=settings.NEWS_DEDUP_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    try:
+        return dedup_index.load_saved_keys(supabase, since, logger)
+    except Exception as e:
+        # 필터는 최적화 용도이며 최종 중복 방지는 DB의 unique 키(stock_id, dedup_key)가 담당함
+        logger.warning(f"뉴스 중복 인덱스 로드 실패, DB unique 키로만 중복을 방지합니다: {e}")
+        return dedup_index.BloomFilter(expected_items=1)
+
+
+class _NewsWriter:
+    """중복을 거른 NewsRow를 모아 두었다가 DB_BATCH_SIZE x DB_MAX_PARALLEL_BATCHES 행마다 저장합니다."""
+    def __init__(self, supabase, logger):
+        self.supabase = supabase
+        self.logger = logger
+        self.created_at = datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.flush_rows = settings.DB_BATCH_SIZE * settings.DB_MAX_PARALLEL_BATCHES
+        self.buffer = []
+        self.rows = 0
+        self.written = 0
+
+    async def add(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.flush_rows:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        batch = [row.to_dict(self.created_at) for row in self.buffer]
+        self.buffer = []
+        self.rows += len(batch)
+        # 저장하는 동안에는 다음 결과를 소비하지 않으므로, 수집 결과가 쌓이면 for_each_ordered가 수집을 늦춤
+        loop = asyncio.get_running_loop()
+        self.written += await loop.run_in_executor(None, _save_news_in_db, batch, self.supabase, self.logger)
 
 def _save_news_in_db(all_news, supabase, logger):
-    # (이전과 동일한 로직, 함수 이름 앞에 _를 붙여 내부용임을 표시)
     try:
-        response = supabase.table('news').insert(all_news).execute()
-        if not response.data: 
-            raise exceptions.SupabaseError("Supabase에 뉴스 데이터 저장 실패 (응답 데이터 없음). RLS 정책 등을 확인하세요.")
-        logger.info(f"뉴스 저장 성공: {len(response.data)}개 레코드 처리")
+        result = bulk_write(supabase, 'news', all_news, logger, on_conflict='stock_id, dedup_key', ignore_duplicates=True,
+                            on_written=lambda rows: changes.record_rows('news', rows))
+        logger.info(f"뉴스 저장 성공: {result['rows']}개 레코드 처리")
+        return result['rows']
+    except exceptions.SupabaseError as e:
+        logger.error(f"뉴스 저장 중 심각한 오류: {e}")
+        raise
     except Exception as e:
         logger.error(f"뉴스 저장 중 심각한 오류: {e}")
         raise exceptions.SupabaseError(f"뉴스 저장 중 DB 오류 발생: {e}") from e
 
 # --- 뉴스 수집을 위한 나머지 헬퍼 함수들 ---
 def _generate_google_rss_url(query, start_date, end_date):
-    base_url = "https://news.google.com/rss/search?"
+    base_url = settings.NEWS_RSS_BASE_URL + "?"
     q = f"q={query}+after:{start_date}+before:{end_date}"
     params = "&hl=en-US&gl=US&ceid=US:en"
     return base_url + q
@@ -80,30 +252,75 @@ def _generate_google_rss_url(query, start_date, end_date):
 def _adjust_title_by_length_limit(title):
     return (title[:97] + '...') if len(title) > 100 else title
 
-async def _fetch_news_rss_day_async(logger, session, query, stock_id, start_day: datetime, end_day: datetime, limit: int = 30):
+async def _fetch_news_rss_day_async(logger, session, query, stock_id, start_day: datetime, end_day: datetime,
+                                    limiter: AdaptiveConcurrencyLimiter, limit: int = _FEED_ITEM_LIMIT, cache=None,
+                                    rate_limiter=None, raise_errors=False, fetcher=None, compact=False,
+                                    validators=None, truncate_titles=True):
+    """
+    한 검색어의 기간 내 Google News RSS를 받아 뉴스 dict 리스트로 반환합니다. (compact=True 이면 NewsRow 리스트)
+    기본적으로 실패 시 경고 로그 후 빈 리스트를 반환하며, raise_errors=True 이면 예외를 그대로 발생시킵니다.
+    (백필처럼 실패한 구간을 다시 시도해야 하는 호출자용)
+    fetcher: 여러 요청이 차단기/지연 기록을 공유하도록 호출자가 만든 ResilientFetcher (없으면 이 요청용으로 만듦)
+    validators: feed_validators.FeedValidatorStore. 주어지면 조건부 요청을 보내고, 304이면 파싱 없이, 파싱한 항목이
+    지난 처리 때와 같으면 저장 없이 빈 리스트를 반환합니다. (건너뛴 피드 수는 실행 요약의 news_feeds_skipped)
+    truncate_titles: DB 컬럼 길이에 맞춰 100자가 넘는 제목을 자름 (학습 데이터 수집은 False로 전체 제목 사용)
+    """
     start_date = start_day.strftime("%Y-%m-%d")
     end_date = end_day.strftime("%Y-%m-%d")
     url = _generate_google_rss_url(query, start_date, end_date)
+    cache = cache or get_fetch_cache()
+    fetcher = fetcher or ResilientFetcher(session, limiter, logger, rate_limiter=rate_limiter)
     items = []
     try:
-        async with session.get(url, timeout=10) as response:
-            if response.status != 200:
-                logger.warning(f"뉴스 RSS 피드 요청 실패 (상태 코드: {response.status}, URL: {url})")
+        # 같은 검색어/기간의 피드를 최근에 받았다면 요청을 생략함
+        feed_text = cache.get('google_news', query, start_date, end_date)
+        etag = last_modified = None
+        if feed_text is not None:
+            metrics.incr('rss_cache_hits')
+        else:
+            # 재시도/헤지/차단기와 동시 요청 수 조절은 fetcher가 담당
+            response = await fetcher.get(url, headers=validators.request_headers(url) if validators else None)
+            if response.status == 304:
+                _skip_feed('not_modified')
+                return []
+            feed_text, etag, last_modified = response.text, response.etag, response.last_modified
+            cache.put('google_news', query, start_date, end_date, feed_text)
+        # XML 파싱은 CPU 작업이므로 작업자 풀에서 실행하고, 앞쪽 limit개 항목만 읽음
+        started = time.monotonic()
+        entries = await feed_parser.parse_feed_entries_async(feed_text, limit)
+        metrics.add_time('rss_parse', time.monotonic() - started)
+        if validators is not None:
+            # 본문 전체가 아닌 항목의 해시로 비교 (lastBuildDate 등 채널 정보는 응답마다 바뀜)
+            items_hash = feed_validators.content_hash(entries)
+            if validators.is_unchanged(url, items_hash):
+                _skip_feed('unchanged')
                 return []
-            feed_text = await response.text()
-            feed = feedparser.parse(feed_text)
-            for entry in feed.entries[:limit]:
-                try: pub_date = datetime(*entry.published_parsed[:6]).strftime('%Y-%m-%dT%H:%M:%S%z')
-                except Exception: continue
-                items.append({"published_date": pub_date, "title": _adjust_title_by_length_limit(entry.title), 
-                              "original_url": entry.link, "company_name" : query, "view_count" : 0, 
-                              "like_count" : 0, "source" : entry.get('source', {}).get('title'), "stock_id" : stock_id, 
-                              "created_at" : datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')})
+            validators.remember(url, etag, last_modified, items_hash)
+        for entry in entries:
+            try: pub_date = datetime(*entry['published']).strftime('%Y-%m-%dT%H:%M:%S%z')
+            except Exception: continue
+            title = _adjust_title_by_length_limit(entry['title']) if truncate_titles else entry['title']
+            items.append(NewsRow(stock_id, query, pub_date, title, entry['link'], entry['source']))
     except Exception as e:
+        metrics.incr('rss_errors')
+        if raise_errors:
+            raise
         logger.warning(f"뉴스 피드 파싱/처리 중 개별 오류 발생 (Query: {query}, Period: {start_date}~{end_date}): {e}")
-    return items
+        # 이번 실행에서 뉴스가 빠진 종목은 실행 요약(dropped)에 남김
+        metrics.drop('news', {"stock_id": stock_id, "query": query, "period": f"{start_date}~{end_date}"},
+                     getattr(e, 'reason', type(e).__name__))
+    if compact:
+        return items
+    created_at = datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')
+    return [row.to_dict(created_at) for row in items]
+
+def _skip_feed(reason):
+    """지난 처리 이후 바뀌지 않아 건너뛴 피드 (reason: 'not_modified' = 304, 'unchanged' = 같은 본문 해시)"""
+    metrics.incr('news_feeds_skipped')
+    metrics.incr(f'news_feeds_{reason}')
 
 def _remove_duplicate_titles_by_prefix(all_news, prefix_length=50):
+    """(이전 방식) 제목 앞 prefix_length 글자가 같으면 중복으로 판단합니다. 벤치마크 비교용으로 유지합니다."""
     seen = set()
     keep_rows = []
     for news in all_news:
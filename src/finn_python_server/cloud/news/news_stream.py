@@ -0,0 +1,100 @@
+import asyncio
+import sys
+from collections import deque
+
+# 행 하나의 고정 크기 추정치 (슬롯 객체 + intern되지 않는 문자열 3개(제목, URL, 발행 시각)의 객체 헤더)
+_ROW_FIXED_BYTES = 120 + 3 * sys.getsizeof('')
+
+
+class NewsRow:
+    """
+    수집한 뉴스 한 건의 압축 표현입니다. (dict 대신 __slots__ 객체)
+    - 종목마다 같은 검색어(company_name)와 반복되는 언론사 이름은 intern하여 여러 행이 같은 문자열을 공유합니다.
+    - 실행 전체에서 같은 값(created_at, view_count, like_count)은 행에 두지 않고 저장 직전에 to_dict로 채웁니다.
+    dedup_index/near_dup의 dict 기반 함수도 그대로 쓸 수 있도록 get()과 항목 읽기/대입을 지원합니다.
+    """
+    __slots__ = ('stock_id', 'company_name', 'published_date', 'title', 'original_url', 'source', 'dedup_key')
+
+    def __init__(self, stock_id, company_name, published_date, title, original_url, source):
+        self.stock_id = stock_id
+        self.company_name = sys.intern(company_name) if company_name else company_name
+        self.published_date = published_date
+        self.title = title
+        self.original_url = original_url
+        self.source = sys.intern(source) if source else source
+        self.dedup_key = None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def approx_bytes(self):
+        """버퍼 크기(메모리 상한) 계산용 추정치. intern된 문자열은 공유되므로 세지 않습니다."""
+        return _ROW_FIXED_BYTES + len(self.title or '') + len(self.original_url or '') + len(self.published_date)
+
+    def to_dict(self, created_at):
+        """news 테이블에 저장할 dict"""
+        row = {"published_date": self.published_date, "title": self.title, "original_url": self.original_url,
+               "company_name": self.company_name, "view_count": 0, "like_count": 0, "source": self.source,
+               "stock_id": self.stock_id, "created_at": created_at}
+        if self.dedup_key is not None:
+            row["dedup_key"] = self.dedup_key
+        return row
+
+
+def rows_bytes(rows):
+    return sum(row.approx_bytes() for row in rows)
+
+
+async def for_each_ordered(items, fetch, consume, max_pending, high_water_bytes, size_of=rows_bytes, logger=None):
+    """
+    items마다 fetch(item) 코루틴을 동시에 실행하고, 결과를 items 순서대로 consume(item, result)에 넘깁니다.
+    모든 결과를 모아 두지 않고 앞에서부터 소비하므로, 메모리는 다음 두 조건으로 제한됩니다.
+    - 시작해 둔 작업(실행 중 + 완료되어 소비를 기다리는 작업)은 max_pending개 이하
+    - 완료되어 소비를 기다리는 결과의 크기 합(size_of)이 high_water_bytes 이상이면 새 작업을 시작하지 않음 (backpressure)
+    (소비가 느리면 - 예: DB 저장 중 - 결과가 쌓이고, 상한에 닿으면 fetch가 멈춥니다)
+    결과 순서가 입력 순서와 같으므로, 모두 모은 뒤 처리하는 방식과 같은 결과(중복 제거 시 남는 행 등)를 얻습니다.
+    반환값: 소비를 기다린 결과 크기의 최댓값 (bytes)
+    """
+    iterator = iter(items)
+    pending = deque()
+    buffered = {'bytes': 0, 'peak': 0, 'throttled': 0}
+
+    async def run(item):
+        result = await fetch(item)
+        size = size_of(result)
+        buffered['bytes'] += size
+        buffered['peak'] = max(buffered['peak'], buffered['bytes'])
+        return result, size
+
+    def fill():
+        while len(pending) < max_pending:
+            if buffered['bytes'] >= high_water_bytes:
+                buffered['throttled'] += 1
+                return
+            item = next(iterator, None)
+            if item is None:
+                return
+            pending.append((item, asyncio.ensure_future(run(item))))
+
+    try:
+        fill()
+        while pending:
+            item, task = pending.popleft()
+            result, size = await task
+            try:
+                await consume(item, result)
+            finally:
+                buffered['bytes'] -= size
+            fill()
+    finally:
+        for _, task in pending:
+            task.cancel()
+    if logger and buffered['throttled']:
+        logger.info(f"뉴스 버퍼가 상한({high_water_bytes / 1024 ** 2:.0f}MB)에 닿아 수집을 {buffered['throttled']}회 늦췄습니다.")
+    return buffered['peak']
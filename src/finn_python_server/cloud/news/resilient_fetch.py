@@ -0,0 +1,331 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import sys,os
+base_dir = os.path.dirname(__file__)
+parent_path = os.path.join(base_dir, '..')
+sys.path.append(parent_path)
+import exceptions
+import metrics
+import settings
+from news.adaptive_limiter import OVERLOAD_STATUS_CODES
+
+
+class FetchError(exceptions.ApiError):
+    """재시도/마감 시간 안에 응답을 받지 못한 요청. reason은 실행 요약(dropped)에 남길 짧은 사유입니다."""
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+class CircuitOpenError(FetchError):
+    """차단기가 열려 있어 요청을 보내지 않음"""
+    def __init__(self, message="RSS 요청 차단기가 열려 있습니다."):
+        super().__init__(message, 'circuit_open')
+
+
+class _StatusError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"상태 코드 {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FetchResponse:
+    """성공한 요청의 결과. status는 200 또는 304(조건부 요청에서 변경 없음)이고, 304이면 text는 None입니다."""
+    __slots__ = ('status', 'text', 'etag', 'last_modified')
+
+    def __init__(self, status, text, etag=None, last_modified=None):
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+# --- 지연 시간 기록 (헤지 지연 계산용) ---
+
+class LatencyTracker:
+    """최근 성공 응답의 지연 시간을 보관하고 백분위수를 계산합니다. 웜 컨테이너의 다음 실행에서도 이어서 사용합니다."""
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p, min_samples=1):
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+_latency = LatencyTracker()
+
+
+# --- 차단기 ---
+
+class CircuitBreaker:
+    """
+    최근 window개 요청 중 과부하 응답(429/503/타임아웃) 비율이 failure_ratio 이상이면 차단기를 엽니다.
+    - 열림(open): cooldown_seconds 동안 요청을 보내지 않고 바로 실패시킵니다.
+    - 반열림(half-open): cooldown이 지나면 시험 요청 하나만 허용하고, 성공하면 닫고 과부하이면 다시 엽니다.
+    과부하가 아닌 오류(404, 연결 오류 등)는 속도 제한의 신호가 아니므로 비율 계산에서 성공처럼 취급합니다.
+    allow()가 돌려준 허가(permit)를 결과와 함께 record/abandon에 넘기며, 차단기가 열리거나 닫히기 전에 보낸 요청의
+    늦은 결과는 반영하지 않습니다. (반열림 상태에서는 시험 요청의 결과만 상태를 바꿈)
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, window=20, min_requests=10, failure_ratio=0.5, cooldown_seconds=30.0, logger=None):
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_ratio = failure_ratio
+        self.cooldown_seconds = cooldown_seconds
+        self.logger = logger
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        # 상태가 열림/닫힘으로 바뀔 때마다 증가. 허가에 기록해 이전 상태에서 보낸 요청을 구분함
+        self._generation = 0
+        self._probe = None
+
+    def allow(self):
+        """요청을 보내도 되면 허가(_Permit)를, 아니면 None을 반환합니다."""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return _Permit(self._generation)
+        if self.state == self.HALF_OPEN and self._probe is None:
+            self._probe = _Permit(self._generation)
+            return self._probe
+        return None
+
+    def record(self, permit, overloaded):
+        if self.state == self.HALF_OPEN:
+            if permit is not self._probe:
+                return  # 열리기 전에 보낸 요청의 늦은 결과
+            self._probe = None
+            if overloaded:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self._generation += 1
+                self._outcomes.clear()
+                if self.logger:
+                    self.logger.info("RSS 요청 차단기를 닫습니다. (시험 요청 성공)")
+            return
+        if self.state != self.CLOSED or permit.generation != self._generation:
+            return
+        self._outcomes.append(overloaded)
+        if len(self._outcomes) >= self.min_requests and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def abandon(self, permit):
+        """결과 없이 취소된 요청. 반열림 상태의 시험 요청이었다면 다음 요청이 다시 시험할 수 있게 합니다."""
+        if permit is self._probe:
+            self._probe = None
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._generation += 1
+        metrics.incr('rss_circuit_open')
+        if self.logger:
+            self.logger.warning(f"RSS 과부하 응답이 계속되어 {self.cooldown_seconds:.0f}초 동안 요청을 멈춥니다. (차단기 열림)")
+
+
+class _Permit:
+    """CircuitBreaker.allow()가 요청 하나에 내주는 허가. generation은 허가를 받은 시점의 차단기 상태 세대입니다."""
+    __slots__ = ('generation',)
+
+    def __init__(self, generation):
+        self.generation = generation
+
+
+# --- 요청 ---
+
+class _SendMark:
+    """요청이 limiter를 통과해 실제로 전송된 시각"""
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.sent_at = None
+
+    def mark(self):
+        if self.sent_at is None:
+            self.sent_at = time.monotonic()
+            self.event.set()
+
+
+class ResilientFetcher:
+    """
+    RSS 요청을 시도별/전체 마감 시간, 지터를 넣은 지수 백오프 재시도, 헤지 요청, 차단기로 감쌉니다.
+    - 시도마다 attempt_timeout, 재시도와 대기를 포함한 전체는 deadline 안에 끝납니다.
+    - 재시도 대기는 [0, min(backoff_max, backoff_base * 2^n)] 구간의 무작위 값(full jitter)이며, 429의 Retry-After가 더 길면 따릅니다.
+    - 첫 요청이 최근 p95 지연보다 오래 걸리면 같은 요청을 하나 더 보내 먼저 온 응답을 사용합니다. (차단기가 닫혀 있을 때만)
+    - 동시 요청 수(limiter)와 초당 요청 수(rate_limiter)는 헤지/재시도 요청에도 그대로 적용됩니다.
+    """
+    def __init__(self, session, limiter, logger, rate_limiter=None, breaker=None, latency=None,
+                 attempt_timeout=None, deadline=None, max_retries=None, backoff_base=None, backoff_max=None,
+                 hedge_enabled=None):
+        self.session = session
+        self.limiter = limiter
+        self.logger = logger
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or new_circuit_breaker(logger)
+        self.latency = latency or _latency
+        self.attempt_timeout = attempt_timeout or settings.NEWS_ATTEMPT_TIMEOUT_SECONDS
+        self.deadline = deadline or settings.NEWS_FETCH_DEADLINE_SECONDS
+        self.max_retries = settings.NEWS_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = settings.NEWS_RETRY_BASE_SECONDS if backoff_base is None else backoff_base
+        self.backoff_max = settings.NEWS_RETRY_MAX_SECONDS if backoff_max is None else backoff_max
+        self.hedge_enabled = settings.NEWS_HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+
+    async def get_text(self, url):
+        """url의 응답 본문을 반환합니다. 끝내 받지 못하면 FetchError(reason 포함)를 발생시킵니다."""
+        return (await self.get(url)).text
+
+    async def get(self, url, headers=None):
+        """
+        url을 요청하여 FetchResponse를 반환합니다. 끝내 받지 못하면 FetchError(reason 포함)를 발생시킵니다.
+        headers에 If-None-Match/If-Modified-Since를 넣은 조건부 요청이면 304도 성공으로 반환합니다.
+        전체 마감 시간은 첫 요청이 실제로 전송된 시점부터 잽니다. (동시 요청 한도 대기 시간은 제외)
+        """
+        deadline_at = None
+        reason = 'deadline'
+        for attempt in range(self.max_retries + 1):
+            remaining = self.deadline if deadline_at is None else deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            permit = self.breaker.allow()
+            if permit is None:
+                raise CircuitOpenError()
+            if attempt > 0:
+                metrics.incr('rss_retries')
+            sent = _SendMark()
+            try:
+                return await self._attempt(url, min(self.attempt_timeout, remaining), sent, permit, headers)
+            except _StatusError as e:
+                reason = f'status_{e.status}'
+                if e.status not in OVERLOAD_STATUS_CODES and e.status < 500:
+                    break  # 404 등은 다시 시도해도 같은 결과
+                wait_seconds = max(self._backoff(attempt), e.retry_after or 0)
+            except asyncio.TimeoutError:
+                reason = 'timeout'
+                wait_seconds = self._backoff(attempt)
+            except Exception as e:
+                reason = type(e).__name__
+                wait_seconds = self._backoff(attempt)
+            finally:
+                if deadline_at is None:
+                    deadline_at = (sent.sent_at or time.monotonic()) + self.deadline
+            if attempt == self.max_retries or time.monotonic() + wait_seconds >= deadline_at:
+                break
+            await asyncio.sleep(wait_seconds)
+        raise FetchError(f"RSS 요청 실패 ({reason}, 시도 {attempt + 1}회)", reason)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _attempt(self, url, timeout, sent, permit, headers=None):
+        """요청 하나를 보내고, 헤지 지연이 지나도 응답이 없으면 같은 요청을 하나 더 보냅니다."""
+        primary = asyncio.ensure_future(self._request(url, timeout, sent, permit, headers))
+        if not self.hedge_enabled:
+            return await primary
+        # 헤지 지연은 요청이 실제로 전송된 뒤부터 잼 (동시 요청 한도에서 기다리는 중에는 헤지하지 않음)
+        waiter = asyncio.ensure_future(sent.event.wait())
+        try:
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        # 기다리는 동안 쌓인 최근 지연 시간으로 헤지 지연을 정함
+        hedge_delay = self._hedge_delay()
+        if not primary.done() and hedge_delay is not None and hedge_delay < timeout:
+            await asyncio.wait({primary}, timeout=hedge_delay)
+        if primary.done() or hedge_delay is None or hedge_delay >= timeout \
+                or self.breaker.state != CircuitBreaker.CLOSED:
+            return await primary
+
+        metrics.incr('rss_hedges')
+        hedge = asyncio.ensure_future(self._request(url, timeout - hedge_delay, _SendMark(), self.breaker.allow(),
+                                                    headers))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.incr('rss_hedge_wins')
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_delay(self):
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        p95 = self.latency.percentile(95, min_samples=settings.NEWS_HEDGE_MIN_SAMPLES)
+        if p95 is None:
+            return None
+        return max(settings.NEWS_HEDGE_MIN_DELAY_SECONDS, p95)
+
+    async def _request(self, url, timeout, sent, permit, headers=None):
+        import aiohttp
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+        async with self.limiter.request() as ticket:
+            metrics.incr('rss_requests')
+            sent.mark()
+            started = time.monotonic()
+            try:
+                async with self.session.get(url, headers=headers,
+                                            timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    ticket.status = response.status
+                    if response.status not in (200, 304):
+                        metrics.incr(f'rss_status_{response.status}')
+                        raise _StatusError(response.status, _retry_after(response.headers.get('Retry-After')))
+                    result = FetchResponse(response.status,
+                                           await response.text() if response.status == 200 else None,
+                                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            except _StatusError as e:
+                self.breaker.record(permit, e.status in OVERLOAD_STATUS_CODES)
+                raise
+            except asyncio.TimeoutError:
+                metrics.incr('rss_timeouts')
+                self.breaker.record(permit, True)
+                raise
+            except asyncio.CancelledError:
+                # 헤지 경쟁에서 진 요청 등. 성공/과부하 어느 쪽으로도 기록하지 않음
+                self.breaker.abandon(permit)
+                raise
+            except Exception:
+                self.breaker.record(permit, False)
+                raise
+        elapsed = time.monotonic() - started
+        metrics.observe('rss_request', elapsed)
+        self.latency.add(elapsed)
+        self.breaker.record(permit, False)
+        return result
+
+
+def _retry_after(value):
+    try:
+        return min(float(value), settings.NEWS_RETRY_MAX_SECONDS) if value else None
+    except ValueError:
+        return None  # HTTP 날짜 형식은 사용하지 않음
+
+
+def new_circuit_breaker(logger=None):
+    """설정값으로 차단기를 만듭니다. (실행마다 새로 만들어 이전 실행의 상태를 이어받지 않음)"""
+    return CircuitBreaker(window=settings.NEWS_BREAKER_WINDOW, min_requests=settings.NEWS_BREAKER_MIN_REQUESTS,
+                          failure_ratio=settings.NEWS_BREAKER_FAILURE_RATIO,
+                          cooldown_seconds=settings.NEWS_BREAKER_COOLDOWN_SECONDS, logger=logger)
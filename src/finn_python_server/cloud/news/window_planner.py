@@ -0,0 +1,103 @@
+"""
+뉴스 수집 기간(window) 적응형 분할
+
+Google News RSS는 한 요청에 돌려주는 항목 수에 상한(cap)이 있어, 기간이 넓으면 기사가 잘리고 좁으면 요청이 낭비됩니다.
+- 처음에는 넓은 구간으로 요청합니다. 종목별 하루 평균 기사 수(density)를 알면 예상 기사 수가 cap의 fill_ratio가
+  되도록 구간 폭을 정하고, 모르면 최대 폭(max_days)으로 시작합니다. (기사가 적은 종목은 여러 날을 한 요청으로 합침)
+- 결과 수가 cap에 닿은 구간은 잘렸을 수 있으므로 반으로 나누어 다시 요청합니다. 하루짜리 구간은 더 나눌 수 없으므로
+  그대로 받고 saturated로 기록합니다.
+구간은 [시작일, 종료일) (종료일 미포함, 날짜 단위)이며, 검색어의 after:/before: 와 같은 의미입니다.
+"""
+import asyncio
+import threading
+from datetime import timedelta
+
+# 예상 기사 수가 cap의 이 비율이 되도록 첫 구간 폭을 정함 (추정이 빗나가 나누는 경우를 줄이기 위한 여유)
+DEFAULT_FILL_RATIO = 0.5
+# density를 갱신할 때 새 관측값의 가중치 (지수 이동 평균)
+DENSITY_SMOOTHING = 0.5
+
+
+class WindowStats:
+    """적응형 구간 수집 통계. requests_saved는 같은 기간을 하루씩 요청했을 때와 비교한 절약 요청 수입니다."""
+    def __init__(self):
+        self.days = 0
+        self.requests = 0
+        self.splits = 0
+        self.saturated = 0
+        self._lock = threading.Lock()
+
+    def _add(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def requests_saved(self):
+        return self.days - self.requests
+
+    def summary(self):
+        return {'days': self.days, 'requests': self.requests, 'splits': self.splits, 'saturated': self.saturated,
+                'requests_saved': self.requests_saved}
+
+
+def initial_days(total_days, cap, per_day=None, max_days=None, fill_ratio=DEFAULT_FILL_RATIO):
+    """첫 구간 폭(일). per_day(하루 평균 기사 수)를 모르면 최대 폭으로 시작합니다."""
+    max_days = min(max_days or total_days, total_days)
+    if not per_day:
+        return max(1, max_days)
+    return max(1, min(max_days, int(cap * fill_ratio / per_day)))
+
+
+def plan_windows(start_day, end_day, days):
+    """[start_day, end_day)를 days일 폭의 구간으로 나눕니다. 마지막 구간은 짧을 수 있습니다."""
+    windows = []
+    window_start = start_day
+    while window_start < end_day:
+        window_end = min(window_start + timedelta(days=days), end_day)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+async def fetch_windows(fetch, start_day, end_day, cap, per_day=None, max_days=None, stats=None,
+                        fill_ratio=DEFAULT_FILL_RATIO):
+    """
+    [start_day, end_day) 기간의 항목을 적응형 구간으로 모두 받아 기간 순서대로 반환합니다.
+    fetch(window_start, window_end): 한 구간의 항목 리스트를 반환하는 코루틴 함수 (예외는 그대로 전달)
+    cap: 한 요청이 돌려줄 수 있는 최대 항목 수. 결과 수가 cap 이상이면 구간을 반으로 나눕니다.
+    """
+    stats = stats if stats is not None else WindowStats()
+    total_days = (end_day - start_day).days
+    if total_days <= 0:
+        return []
+    stats._add(days=total_days)
+
+    async def fetch_window(window_start, window_end):
+        items = await fetch(window_start, window_end)
+        stats._add(requests=1)
+        days = (window_end - window_start).days
+        if len(items) < cap:
+            return items
+        if days <= 1:
+            stats._add(saturated=1)
+            return items
+        # 잘렸을 수 있는 구간은 버리고 두 구간으로 다시 받음 (두 결과가 원래 구간 전체를 덮음)
+        stats._add(splits=1)
+        middle = window_start + timedelta(days=days // 2)
+        left, right = await asyncio.gather(fetch_window(window_start, middle), fetch_window(middle, window_end))
+        return left + right
+
+    days = initial_days(total_days, cap, per_day=per_day, max_days=max_days, fill_ratio=fill_ratio)
+    results = await asyncio.gather(*(fetch_window(window_start, window_end)
+                                     for window_start, window_end in plan_windows(start_day, end_day, days)))
+    return [item for items in results for item in items]
+
+
+def update_density(densities, key, item_count, days):
+    """종목별 하루 평균 기사 수(densities[key])를 이번 결과로 갱신합니다. (지수 이동 평균)"""
+    if days <= 0:
+        return
+    observed = item_count / days
+    previous = densities.get(key)
+    densities[key] = observed if previous is None else (1 - DENSITY_SMOOTHING) * previous + DENSITY_SMOOTHING * observed
@@ -1,61 +1,215 @@
 import os
-import oci
 import json
+import time
+import uuid
 from datetime import datetime
 
-def send_completion_message(logger):
+import clients
+from changes import RunChanges
+import metrics
+import settings
+
+def send_completion_message(logger, run_summary=None, run_changes=None, run_id=None):
     """
     작업 완료 메시지를 OCI Queue에 전송합니다.
-    인증을 위한 signer 객체와 로깅을 위한 logger 객체를 인자로 받습니다.
+    run_changes(changes.RunChanges.to_dict() 형식)가 주어지면 새 주가/뉴스가 저장된 종목 목록과 종목별 행 수, 날짜 범위를
+    메시지에 담아 예측 쪽이 바뀐 종목만 처리할 수 있게 합니다. 종목이 많으면 메시지 크기 제한에 맞춰 여러 메시지로 나누고,
+    가능한 적은 put_messages 호출로 보냅니다. (batch.index / batch.count 로 한 실행의 메시지 묶음을 식별)
+    run_summary가 주어지면 실행 지표 요약(metrics)을 첫 번째 메시지에 함께 담습니다.
     """
     try:
         logger.info("큐 메시지 전송을 시작합니다.")
-        
-        logger.info("시그널 정보를 가져옵니다.")
-        signer = oci.auth.signers.get_resource_principals_signer()
-        
+
         # 환경 변수에서 큐 정보 가져오기
         queue_id = os.environ.get("QUEUE_ID")
         queue_endpoint = os.environ.get("QUEUE_ENDPOINT")
-        
-        # OCI Queue 클라이언트 초기화
-        queue_client = oci.queue.QueueClient(config={}, signer=signer, service_endpoint=queue_endpoint)
-        
+
         if not all([queue_id, queue_endpoint]):
             raise ValueError("Queue 관련 환경 변수(QUEUE_ID, QUEUE_ENDPOINT)가 설정되지 않았습니다.")
 
-        # 보낼 메시지 내용 정의
-        message_content = json.dumps({
-            "status": "SUCCESS",
-            "source": "data-collection-function",
-            "created_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        
-        message_entries = [
-            oci.queue.models.PutMessagesDetailsEntry(content=message_content)
-        ]
-        
-        put_messages_details_object = oci.queue.models.PutMessagesDetails(messages=message_entries)
-        
-        # 큐에 메시지 넣기
-        put_messages_response = queue_client.put_messages(
-            queue_id=queue_id,
-            put_messages_details=put_messages_details_object
-        )
-        
-        # 메시지 전송 결과 확인
-        if hasattr(put_messages_response.data, 'failures') and put_messages_response.data.failures:
-            # 실패한 메시지가 있을 경우에만 이 블록이 실행됨
-            failed_message = put_messages_response.data.failures[0]
-            raise Exception(f"메시지 전송 실패: {failed_message.message}")
-        else:
-            # 실패한 메시지가 없으면 성공으로 간주
-            logger.info("모든 메시지가 큐에 성공적으로 전송되었습니다.")
-            logger.info(f"전송 결과: {put_messages_response.data.messages}")
-
-        logger.info("큐에 메시지를 성공적으로 전송했습니다.")
+        # OCI Queue 클라이언트 (signer 포함) 는 웜 컨테이너에서 재사용하며, 토큰 만료 전에 갱신됨
+        queue_client = clients.get_queue_client(queue_endpoint)
+
+        messages = build_messages(run_changes or {}, run_summary=run_summary, run_id=run_id)
+        put_count = _put_messages_with_retry(queue_client, queue_id, messages, logger)
+        metrics.incr('queue_messages', len(messages))
+        metrics.incr('queue_put_calls', put_count)
+        logger.info(f"큐에 메시지 {len(messages)}개를 put_messages {put_count}회로 성공적으로 전송했습니다.")
 
     except Exception as e:
         logger.error(f"큐 메시지 전송 중 오류 발생: {e}", exc_info=True)
+        clients.discard(clients.QUEUE)
         # 에러를 다시 발생시켜 상위 핸들러가 인지하고 처리하도록 함
-        raise
\ No newline at end of file
+        raise
+
+
+# --- 메시지 구성 ---
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _size(value):
+    return len(_dumps(value).encode('utf-8'))
+
+
+def build_messages(run_changes, run_summary=None, run_id=None, max_bytes=None):
+    """
+    변경 내역을 max_bytes(UTF-8) 이하의 JSON 메시지 문자열 목록으로 나눕니다. 변경이 없어도 완료 메시지 하나는 만듭니다.
+    메시지 형식:
+      {"status": "SUCCESS", "source", "created_date", "run_id", "batch": {"index", "count"},
+       "totals": {"prices"|"news": {"rows", "stocks", "start_date", "end_date"}},   (실행 전체 기준)
+       "stocks": [{"stock_id", "prices": {"rows", "start_date", "end_date"}, "news": {...}}, ...],
+       "metrics": {...}}   (첫 번째 메시지에만, 크기 제한을 넘으면 줄여서 "truncated": true 표시)
+    """
+    max_bytes = max_bytes or settings.QUEUE_MAX_MESSAGE_BYTES
+    merged = RunChanges()
+    merged.merge(run_changes)
+    header = {
+        "status": "SUCCESS",
+        "source": "data-collection-function",
+        "created_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # 단일 실행에서도 메시지 묶음을 식별할 수 있도록 run_id를 만들어 둠 (재전송된 메시지의 중복 판단에도 사용)
+        "run_id": run_id or uuid.uuid4().hex,
+        # count는 나눈 뒤에 채우며, 크기 계산은 충분히 큰 자리수로 미리 잡아 둠
+        "batch": {"index": 999999, "count": 999999},
+        "totals": merged.totals(),
+    }
+    entries = [{"stock_id": stock_id, **kinds} for stock_id, kinds in merged.to_dict().items()]
+    metrics_block = _fit_metrics(header, run_summary, max_bytes)
+
+    # 항목을 순서대로 채워 넣다가 크기를 넘으면 새 메시지를 시작 (항목 사이 쉼표 1바이트 포함)
+    # 종목 항목의 크기 제한은 metrics가 없는 메시지 기준으로 확인 (metrics는 첫 메시지에만 실림)
+    base_size = _size({**header, "stocks": []})
+    groups = [[]]
+    used = base_size if metrics_block is None else _size({**header, "stocks": [], "metrics": metrics_block})
+    for entry in entries:
+        entry_size = _size(entry) + 1
+        if base_size + entry_size > max_bytes:
+            raise ValueError(f"종목 {entry['stock_id']}의 변경 내역이 메시지 크기 제한({max_bytes} bytes)을 넘습니다.")
+        if used + entry_size > max_bytes:
+            groups.append([])
+            used = base_size
+        groups[-1].append(entry)
+        used += entry_size
+
+    messages = []
+    for index, group in enumerate(groups):
+        message = {**header, "batch": {"index": index, "count": len(groups)}, "stocks": group}
+        if index == 0 and metrics_block is not None:
+            message["metrics"] = metrics_block
+        messages.append(_dumps(message))
+    return messages
+
+
+def _fit_metrics(header, run_summary, max_bytes):
+    """
+    첫 메시지에 실을 실행 지표를 메시지 크기 제한에 맞춰 반환합니다.
+    넘치면 dropped 항목 목록(종류/사유별 개수는 유지), dropped 전체, 지연 시간, 단계 시간 순으로 빼고
+    "truncated": true 를 표시합니다. 지표 때문에 완료 메시지를 보내지 못하는 일이 없도록 마지막에는 표시만 남깁니다.
+    """
+    if run_summary is None:
+        return None
+
+    def fits(candidate):
+        return _size({**header, "stocks": [], "metrics": candidate}) <= max_bytes
+
+    if fits(run_summary):
+        return run_summary
+    trimmed = {**run_summary, "truncated": True}
+    dropped = run_summary.get("dropped")
+    if isinstance(dropped, dict):
+        trimmed["dropped"] = {kind: {key: value for key, value in entry.items() if key != "items"}
+                              for kind, entry in dropped.items()}
+        if fits(trimmed):
+            return trimmed
+    for key in ("dropped", "latency_ms", "stages_seconds"):
+        trimmed.pop(key, None)
+        if fits(trimmed):
+            return trimmed
+    return {"truncated": True}
+
+
+def _group_for_put(messages, max_messages=None, max_bytes=None):
+    """메시지를 put_messages 요청 제한(요청당 메시지 수, 전체 크기)에 맞게 묶어 (index 목록) 리스트로 반환합니다."""
+    max_messages = max_messages or settings.QUEUE_MAX_MESSAGES_PER_PUT
+    max_bytes = max_bytes or settings.QUEUE_MAX_PUT_BYTES
+    groups, current, current_bytes = [], [], 0
+    for index, message in enumerate(messages):
+        size = len(message.encode('utf-8'))
+        if current and (len(current) >= max_messages or current_bytes + size > max_bytes):
+            groups.append(current)
+            current, current_bytes = [], 0
+        current.append(index)
+        current_bytes += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+# --- 전송 ---
+
+def _put_messages_with_retry(queue_client, queue_id, messages, logger):
+    """
+    메시지를 묶어서 전송하고, 실패한 항목만 모아 지수 백오프로 재시도합니다. put_messages 호출 횟수를 반환합니다.
+    - 응답의 항목별 결과(messages[i])에 오류가 있거나 결과가 빠진 항목만 다시 보냅니다.
+    - 요청 자체가 실패하면(스로틀링 등) 그 요청에 담긴 항목 전체를 다시 보냅니다.
+    재시도 후에도 실패한 항목이 있으면 예외를 발생시킵니다.
+    """
+    import oci
+
+    pending = list(range(len(messages)))
+    put_count = 0
+    last_error = None
+    for attempt in range(settings.QUEUE_MAX_RETRIES + 1):
+        if attempt > 0:
+            wait_seconds = settings.QUEUE_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            logger.warning(f"큐 메시지 {len(pending)}개를 {wait_seconds:.1f}초 후 재시도합니다. "
+                           f"({attempt}/{settings.QUEUE_MAX_RETRIES})")
+            metrics.incr('queue_retries', len(pending))
+            time.sleep(wait_seconds)
+
+        failed = []
+        for group in _group_for_put([messages[index] for index in pending]):
+            indexes = [pending[position] for position in group]
+            details = oci.queue.models.PutMessagesDetails(messages=[
+                oci.queue.models.PutMessagesDetailsEntry(content=messages[index]) for index in indexes
+            ])
+            put_count += 1
+            try:
+                response = queue_client.put_messages(queue_id=queue_id, put_messages_details=details)
+            except Exception as e:
+                last_error = e
+                failed.extend(indexes)
+                continue
+            for position, error in _failed_entries(response.data, len(indexes)):
+                last_error = error
+                failed.append(indexes[position])
+
+        pending = sorted(failed)
+        if not pending:
+            return put_count
+
+    raise Exception(f"메시지 전송 실패: {len(pending)}/{len(messages)}개 (재시도 {settings.QUEUE_MAX_RETRIES}회 후): "
+                    f"{last_error}")
+
+
+def _failed_entries(result, sent_count):
+    """
+    put_messages 응답에서 실패한 항목의 (요청 내 위치, 오류 내용) 목록을 반환합니다.
+    실패가 보고되었지만 어느 항목인지 알 수 없으면 요청의 모든 항목을 실패로 봅니다.
+    """
+    failures = getattr(result, 'failures', None)
+    if not failures:
+        return []
+    entries = getattr(result, 'messages', None) or []
+    failed = []
+    for position in range(sent_count):
+        entry = entries[position] if position < len(entries) else None
+        error = getattr(entry, 'error_message', None) or getattr(entry, 'error_code', None)
+        if entry is None or error or getattr(entry, 'id', None) is None:
+            failed.append((position, error or "응답에 결과가 없음"))
+    if not failed:
+        detail = getattr(failures[0], 'message', failures) if isinstance(failures, list) else failures
+        failed = [(position, detail) for position in range(sent_count)]
+    return failed
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    초당 요청 수를 제한하는 토큰 버킷 방식의 limiter 입니다.
+    여러 스레드에서 동시에 acquire()를 호출해도 안전합니다.
+    """
+    def __init__(self, requests_per_second, burst=1):
+        self.requests_per_second = requests_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.requests_per_second)
+        self._updated_at = now
+
+    def acquire(self):
+        """토큰이 생길 때까지 대기한 뒤 토큰 하나를 소비합니다."""
+        if not self.requests_per_second or self.requests_per_second <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.requests_per_second
+            time.sleep(wait_seconds)
+
+
+class AsyncRateLimiter:
+    """RateLimiter의 asyncio 버전입니다. 하나의 이벤트 루프 안의 코루틴들이 공유합니다."""
+    def __init__(self, requests_per_second, burst=1):
+        self.requests_per_second = requests_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.requests_per_second or self.requests_per_second <= 0:
+            return
+        # 대기 중인 코루틴이 순서대로 토큰을 받도록 lock을 잡은 채로 기다림
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.requests_per_second)
+            self._updated_at = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.requests_per_second)
+                self._tokens = 1
+                self._updated_at = time.monotonic()
+            self._tokens -= 1
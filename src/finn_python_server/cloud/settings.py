@@ -0,0 +1,162 @@
+import os
+
+
+def _get_int(name, default):
+    """환경 변수를 정수로 읽어옵니다. 값이 없거나 잘못된 경우 기본값을 사용합니다."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _get_float(name, default):
+    """환경 변수를 실수로 읽어옵니다. 값이 없거나 잘못된 경우 기본값을 사용합니다."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+# --- Tiingo 주가 수집 설정 ---
+# 동시에 실행할 Tiingo 요청 수 (1이면 기존처럼 순차 실행)
+TIINGO_MAX_WORKERS = _get_int('TIINGO_MAX_WORKERS', 8)
+# 초당 최대 Tiingo 요청 수 (요금제 쿼터에 맞게 조정, 0 이하이면 제한 없음)
+TIINGO_REQUESTS_PER_SECOND = _get_float('TIINGO_REQUESTS_PER_SECOND', 5.0)
+# Tiingo API 주소 (벤치마크의 로컬 가짜 서버 등으로 바꿀 때만 지정)
+TIINGO_BASE_URL = os.environ.get('TIINGO_BASE_URL', '')
+
+# --- Google News RSS 수집 설정 ---
+# 동시 요청 수는 응답 상태에 따라 최소~최대 범위 안에서 자동 조절됨
+NEWS_MIN_CONCURRENCY = _get_int('NEWS_MIN_CONCURRENCY', 1)
+NEWS_MAX_CONCURRENCY = _get_int('NEWS_MAX_CONCURRENCY', 16)
+NEWS_INITIAL_CONCURRENCY = _get_int('NEWS_INITIAL_CONCURRENCY', 4)
+# 이 시간(초)보다 느린 응답은 한도를 늘리는 근거로 사용하지 않음
+NEWS_LATENCY_THRESHOLD_SECONDS = _get_float('NEWS_LATENCY_THRESHOLD_SECONDS', 3.0)
+# Google News RSS 검색 주소
+NEWS_RSS_BASE_URL = os.environ.get('NEWS_RSS_BASE_URL', 'https://news.google.com/rss/search')
+
+# --- Google News RSS 요청 재시도/헤지/차단기 설정 ---
+# 시도 하나의 제한 시간과, 재시도와 대기를 포함한 종목(요청)별 전체 제한 시간(초, 첫 전송 시점부터)
+NEWS_ATTEMPT_TIMEOUT_SECONDS = _get_float('NEWS_ATTEMPT_TIMEOUT_SECONDS', 10.0)
+NEWS_FETCH_DEADLINE_SECONDS = _get_float('NEWS_FETCH_DEADLINE_SECONDS', 30.0)
+# 재시도 횟수와 대기 시간 범위(초). 대기 시간은 0 ~ min(최대, 기본 x 2^n) 사이의 무작위 값
+NEWS_MAX_RETRIES = _get_int('NEWS_MAX_RETRIES', 2)
+NEWS_RETRY_BASE_SECONDS = _get_float('NEWS_RETRY_BASE_SECONDS', 0.5)
+NEWS_RETRY_MAX_SECONDS = _get_float('NEWS_RETRY_MAX_SECONDS', 8.0)
+# 응답이 최근 p95 지연(최소 NEWS_HEDGE_MIN_DELAY_SECONDS)보다 늦으면 같은 요청을 하나 더 보냄
+# p95는 최근 응답이 NEWS_HEDGE_MIN_SAMPLES개 이상 모인 뒤부터 사용
+NEWS_HEDGE_ENABLED = os.environ.get('NEWS_HEDGE_ENABLED', 'true').lower() == 'true'
+NEWS_HEDGE_MIN_DELAY_SECONDS = _get_float('NEWS_HEDGE_MIN_DELAY_SECONDS', 0.5)
+NEWS_HEDGE_MIN_SAMPLES = _get_int('NEWS_HEDGE_MIN_SAMPLES', 20)
+# 최근 NEWS_BREAKER_WINDOW개 요청 중 과부하(429/503/타임아웃) 비율이 기준 이상이면 cooldown 동안 요청을 멈춤
+NEWS_BREAKER_WINDOW = _get_int('NEWS_BREAKER_WINDOW', 20)
+NEWS_BREAKER_MIN_REQUESTS = _get_int('NEWS_BREAKER_MIN_REQUESTS', 10)
+NEWS_BREAKER_FAILURE_RATIO = _get_float('NEWS_BREAKER_FAILURE_RATIO', 0.5)
+NEWS_BREAKER_COOLDOWN_SECONDS = _get_float('NEWS_BREAKER_COOLDOWN_SECONDS', 30.0)
+
+# --- Supabase 대량 저장 설정 ---
+# 한 번의 insert/upsert 요청에 담을 최대 행 수
+DB_BATCH_SIZE = _get_int('DB_BATCH_SIZE', 500)
+# 동시에 전송할 배치 수
+DB_MAX_PARALLEL_BATCHES = _get_int('DB_MAX_PARALLEL_BATCHES', 4)
+# 실패한 배치의 재시도 횟수와 첫 재시도 대기 시간(초, 이후 2배씩 증가)
+DB_MAX_RETRIES = _get_int('DB_MAX_RETRIES', 3)
+DB_RETRY_BACKOFF_SECONDS = _get_float('DB_RETRY_BACKOFF_SECONDS', 1.0)
+
+# --- 뉴스 중복 제거 설정 ---
+# 이미 저장된 뉴스 키를 불러올 기간(일). 수집 기간과 재실행 간격을 모두 덮을 만큼 잡아야 함
+NEWS_DEDUP_LOOKBACK_DAYS = _get_int('NEWS_DEDUP_LOOKBACK_DAYS', 3)
+# 유사 제목 판단 기준 (샹글 Jaccard 유사도)과 범위 ('stock': 종목별, 'global': 전체 종목)
+NEWS_NEAR_DUP_THRESHOLD = _get_float('NEWS_NEAR_DUP_THRESHOLD', 0.6)
+NEWS_NEAR_DUP_SCOPE = os.environ.get('NEWS_NEAR_DUP_SCOPE', 'stock')
+# 'global' 범위에서 비교 대상으로 보관할 최근 뉴스 수 (두 세대를 번갈아 쓰므로 최대 2배까지 보관)
+NEWS_NEAR_DUP_WINDOW_ROWS = _get_int('NEWS_NEAR_DUP_WINDOW_ROWS', 20000)
+
+# --- 뉴스 스트리밍 설정 ---
+# 종목별 수집 결과를 모두 모으지 않고 순서대로 중복 제거/저장함. 시작해 둔 종목 수집 작업의 최대 개수와,
+# 저장을 기다리는 수집 결과가 이 크기(MB, 추정치)에 닿으면 새 종목 수집을 멈추는 상한
+NEWS_STREAM_MAX_PENDING = _get_int('NEWS_STREAM_MAX_PENDING', 64)
+NEWS_STREAM_HIGH_WATER_MB = _get_float('NEWS_STREAM_HIGH_WATER_MB', 64.0)
+
+# --- 뉴스 조건부 요청 설정 ---
+# 검색 URL별 마지막 응답의 ETag/Last-Modified/본문 해시를 저장해 두고, 304 또는 같은 본문이면 파싱/저장을 건너뜀
+NEWS_CONDITIONAL_GET_ENABLED = os.environ.get('NEWS_CONDITIONAL_GET_ENABLED', 'true').lower() == 'true'
+# 검색 URL에 수집 기간이 들어가므로 며칠 지난 검증자는 다시 쓰이지 않음 (저장 시 삭제)
+NEWS_VALIDATOR_RETENTION_DAYS = _get_int('NEWS_VALIDATOR_RETENTION_DAYS', 3)
+
+# --- 증분 수집 설정 ---
+# 'daily': 매 실행마다 최근 하루 구간을 다시 수집, 'incremental': 종목별 워터마크(마지막으로 수집한 뉴스 발행 시각,
+# 마지막으로 저장한 주가 날짜) 이후의 데이터만 수집 (시간 단위 예약 실행용, 새로 저장된 데이터가 없으면 완료 메시지 생략)
+COLLECTION_MODE = os.environ.get('COLLECTION_MODE', 'daily')
+# 오래 실행되지 않은 종목이 워터마크부터 거슬러 올라가 수집할 최대 일수
+INCREMENTAL_MAX_LOOKBACK_DAYS = _get_int('INCREMENTAL_MAX_LOOKBACK_DAYS', 7)
+# 늦게 색인되는 기사를 놓치지 않도록 뉴스 워터마크보다 이만큼(분) 이전 기사부터 다시 확인 (중복은 dedup_key로 제외)
+INCREMENTAL_NEWS_OVERLAP_MINUTES = _get_int('INCREMENTAL_NEWS_OVERLAP_MINUTES', 60)
+
+# --- 전일 종가 캐시 설정 ---
+# 웜 컨테이너에서 직전 실행이 저장한 종가를 재사용할지 여부와 유효 시간(초)
+LAST_CLOSE_CACHE_ENABLED = os.environ.get('LAST_CLOSE_CACHE_ENABLED', 'true').lower() == 'true'
+LAST_CLOSE_CACHE_TTL_SECONDS = _get_int('LAST_CLOSE_CACHE_TTL_SECONDS', 36 * 60 * 60)
+
+# --- 외부 API 응답 캐시 설정 ---
+# 함수 재시도/재실행 시 같은 기간의 Tiingo/Google News 응답을 다시 받지 않도록 디스크에 보관
+FETCH_CACHE_ENABLED = os.environ.get('FETCH_CACHE_ENABLED', 'true').lower() == 'true'
+FETCH_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', '/tmp/finn_fetch_cache')
+FETCH_CACHE_MAX_MB = _get_int('FETCH_CACHE_MAX_MB', 256)
+# 최근 거래일이 포함된(아직 확정되지 않은) 기간의 응답을 재사용할 시간(초)
+FETCH_CACHE_RECENT_TTL_SECONDS = _get_int('FETCH_CACHE_RECENT_TTL_SECONDS', 15 * 60)
+# 최근 이 개수의 미국 거래일 안에서 끝나는 기간은 만료 없이 보관하지 않음 (Tiingo 일봉이 늦게 채워지거나 수정되는 경우 대비)
+FETCH_CACHE_RECENT_SESSIONS = _get_int('FETCH_CACHE_RECENT_SESSIONS', 2)
+
+# --- 클라이언트 재사용 설정 ---
+# 웜 컨테이너에서 Supabase/Tiingo/Queue 클라이언트와 HTTP 세션을 재사용하되, 이 시간(초)이 지나면 새로 만듦
+CLIENT_MAX_AGE_SECONDS = _get_int('CLIENT_MAX_AGE_SECONDS', 60 * 60)
+# 호스트당 유지할 keep-alive 연결 수와 유휴 연결 유지 시간(초)
+HTTP_POOL_SIZE = _get_int('HTTP_POOL_SIZE', 32)
+HTTP_KEEPALIVE_SECONDS = _get_int('HTTP_KEEPALIVE_SECONDS', 60)
+# 리소스 주체 토큰이 만료되기 이 시간(초) 전에 미리 갱신
+SIGNER_REFRESH_MARGIN_SECONDS = _get_int('SIGNER_REFRESH_MARGIN_SECONDS', 5 * 60)
+
+# --- 뉴스 RSS 파싱 설정 ---
+# 'incremental': limit개 항목까지만 읽고 멈추는 증분 XML 파서, 'feedparser': 피드 전체를 feedparser로 파싱
+NEWS_FEED_PARSER = os.environ.get('NEWS_FEED_PARSER', 'incremental')
+# 파싱을 실행할 곳 ('thread', 'process', 'inline': 이벤트 루프에서 직접)과 작업자 수
+NEWS_PARSE_EXECUTOR = os.environ.get('NEWS_PARSE_EXECUTOR', 'thread')
+NEWS_PARSE_WORKERS = _get_int('NEWS_PARSE_WORKERS', 2)
+
+# --- 실행 지표 설정 ---
+# 실행 종료 시 지표 요약을 내보낼 sink 목록 (쉼표 구분: 'log', 'jsonl', metrics.register_sink로 등록한 이름)
+METRICS_SINKS = os.environ.get('METRICS_SINKS', 'log')
+METRICS_JSONL_PATH = os.environ.get('METRICS_JSONL_PATH', '/tmp/finn_metrics.jsonl')
+# 실행에서 빠진 항목(dropped)을 종류별로 요약에 남길 최대 개수 (개수 집계는 전부 유지)
+METRICS_DROPPED_SAMPLE_SIZE = _get_int('METRICS_DROPPED_SAMPLE_SIZE', 50)
+
+# --- 샤드 실행 설정 ---
+# 'single': 한 번의 호출에서 전체 종목 처리, 'shard': 조정자가 종목을 샤드로 나누어 작업자 호출들에 분배
+# (요청 본문의 mode 값이 있으면 그 값이 우선: 'coordinator' / 'worker' / 'single')
+PIPELINE_MODE = os.environ.get('PIPELINE_MODE', 'single')
+# 샤드 하나가 끝나야 하는 시간(초). 함수 timeout(300초)보다 여유 있게 잡음
+SHARD_TIME_BUDGET_SECONDS = _get_float('SHARD_TIME_BUDGET_SECONDS', 200)
+SHARD_MAX_COUNT = _get_int('SHARD_MAX_COUNT', 32)
+SHARD_MAX_STOCKS_PER_SHARD = _get_int('SHARD_MAX_STOCKS_PER_SHARD', 500)
+# 측정 기록이 없을 때 사용할 종목당 소요 시간(초)과, 측정값으로 사용할 최근 성공 샤드 수
+SHARD_DEFAULT_TICKER_SECONDS = _get_float('SHARD_DEFAULT_TICKER_SECONDS', 0.5)
+SHARD_COST_SAMPLE_SIZE = _get_int('SHARD_COST_SAMPLE_SIZE', 50)
+# 작업자로 호출할 함수 OCID (비어 있으면 자기 자신, FN_FN_ID)와 Functions 호출 엔드포인트
+SHARD_FUNCTION_ID = os.environ.get('SHARD_FUNCTION_ID', '')
+SHARD_INVOKE_ENDPOINT = os.environ.get('SHARD_INVOKE_ENDPOINT', '')
+
+# --- 완료 메시지(OCI Queue) 설정 ---
+# 메시지 하나의 최대 크기(bytes)와 put_messages 요청당 최대 메시지 수/전체 크기 (OCI Queue 제한: 128KB, 20개, 512KB)
+QUEUE_MAX_MESSAGE_BYTES = _get_int('QUEUE_MAX_MESSAGE_BYTES', 120 * 1024)
+QUEUE_MAX_MESSAGES_PER_PUT = _get_int('QUEUE_MAX_MESSAGES_PER_PUT', 20)
+QUEUE_MAX_PUT_BYTES = _get_int('QUEUE_MAX_PUT_BYTES', 500 * 1024)
+# 전송에 실패한 메시지만 다시 보낼 횟수와 첫 재시도 대기 시간(초, 이후 2배씩 증가)
+QUEUE_MAX_RETRIES = _get_int('QUEUE_MAX_RETRIES', 3)
+QUEUE_RETRY_BACKOFF_SECONDS = _get_float('QUEUE_RETRY_BACKOFF_SECONDS', 0.5)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import math
+import os
+import uuid
+from datetime import datetime
+
+import pytz
+
+import changes
+import clients
+import exceptions
+import settings
+
+kst_timezone = pytz.timezone('Asia/Seoul')
+
+# 샤드 상태 (pipeline_shards.status)
+PENDING = 'pending'
+DISPATCHED = 'dispatched'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+# --- 샤드 배정 ---
+
+def shard_of(stock_id, shard_count):
+    """
+    stock_id의 해시로 샤드 번호(0 ~ shard_count-1)를 정합니다.
+    종목 목록의 순서나 다른 종목의 추가/삭제와 관계없이 같은 종목은 항상 같은 샤드에 배정됩니다.
+    """
+    digest = hashlib.sha1(str(stock_id).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def select_shard(stocks, shard, shard_count):
+    """전체 종목 목록에서 shard번 샤드에 속한 종목만 골라 반환합니다."""
+    return [stock for stock in stocks if shard_of(stock['id'], shard_count) == shard]
+
+
+# --- 샤드 수 계산 ---
+
+def estimate_shard_count(stock_count, per_ticker_seconds, budget_seconds=None, max_shards=None,
+                         max_stocks_per_shard=None):
+    """
+    샤드 하나가 budget_seconds 안에 끝나도록 샤드 수를 계산합니다.
+    종목 수 x 종목당 소요 시간 / 예산, 그리고 샤드당 최대 종목 수 중 더 많은 쪽을 따르며 1 ~ max_shards로 제한합니다.
+    """
+    budget_seconds = budget_seconds or settings.SHARD_TIME_BUDGET_SECONDS
+    max_shards = max_shards or settings.SHARD_MAX_COUNT
+    max_stocks_per_shard = max_stocks_per_shard or settings.SHARD_MAX_STOCKS_PER_SHARD
+    by_time = math.ceil(stock_count * per_ticker_seconds / budget_seconds)
+    by_size = math.ceil(stock_count / max_stocks_per_shard)
+    return max(1, min(max_shards, max(by_time, by_size)))
+
+
+def measured_per_ticker_seconds(supabase, logger):
+    """
+    최근 성공한 샤드들의 종목당 소요 시간 중 상위 90% 값을 반환합니다. (느린 샤드도 시간 안에 끝나도록 보수적으로 잡음)
+    기록이 없으면 SHARD_DEFAULT_TICKER_SECONDS를 사용합니다.
+    """
+    try:
+        rows = (supabase.table('pipeline_shards').select('per_ticker_seconds')
+                .eq('status', SUCCEEDED).gt('stock_count', 0)
+                .order('finished_at', desc=True).limit(settings.SHARD_COST_SAMPLE_SIZE)
+                .execute().data) or []
+    except Exception as e:
+        logger.warning(f"샤드 소요 시간 기록 조회 실패, 기본값을 사용합니다: {e}")
+        rows = []
+    samples = sorted(row['per_ticker_seconds'] for row in rows if row.get('per_ticker_seconds'))
+    if not samples:
+        return settings.SHARD_DEFAULT_TICKER_SECONDS
+    return samples[max(0, math.ceil(0.9 * len(samples)) - 1)]
+
+
+# --- 실행(run) / 샤드 기록 ---
+
+def create_run(supabase, shard_count, stock_count, is_closed_day, logger):
+    """pipeline_runs와 샤드별 pipeline_shards(pending) 행을 만들고 run_id를 반환합니다."""
+    run_id = uuid.uuid4().hex
+    now = datetime.now(kst_timezone).isoformat()
+    try:
+        supabase.table('pipeline_runs').insert({
+            'run_id': run_id, 'shard_count': shard_count, 'stock_count': stock_count,
+            'is_closed_day': is_closed_day, 'created_at': now,
+        }).execute()
+        supabase.table('pipeline_shards').insert([
+            {'run_id': run_id, 'shard': shard, 'status': PENDING, 'updated_at': now}
+            for shard in range(shard_count)
+        ]).execute()
+    except Exception as e:
+        raise exceptions.SupabaseError(f"샤드 실행 기록 생성 실패: {e}") from e
+    logger.info(f"샤드 실행 {run_id} 생성: 종목 {stock_count}개, 샤드 {shard_count}개")
+    return run_id
+
+
+def load_run(supabase, run_id):
+    """run_id의 실행 정보와 샤드별 상태를 반환합니다. (없으면 ConfigError)"""
+    try:
+        runs = supabase.table('pipeline_runs').select('*').eq('run_id', run_id).execute().data
+        shards = supabase.table('pipeline_shards').select('*').eq('run_id', run_id).execute().data or []
+    except Exception as e:
+        raise exceptions.SupabaseError(f"샤드 실행 {run_id} 조회 실패: {e}") from e
+    if not runs:
+        raise exceptions.ConfigError(f"샤드 실행 {run_id}을(를) 찾을 수 없습니다.")
+    return runs[0], sorted(shards, key=lambda row: row['shard'])
+
+
+def report_shard(supabase, run_id, shard, status, logger, stock_count=None, seconds=None, run_summary=None,
+                 run_changes=None, error=None):
+    """작업자가 샤드 처리 결과를 기록합니다. run_changes: 샤드에서 새로 저장된 종목별 변경 내역 (완료 메시지용)"""
+    row = {'status': status, 'updated_at': datetime.now(kst_timezone).isoformat(), 'error': error}
+    if status in (SUCCEEDED, FAILED):
+        row['finished_at'] = row['updated_at']
+    if stock_count is not None:
+        row['stock_count'] = stock_count
+    if seconds is not None:
+        row['seconds'] = round(seconds, 3)
+        if stock_count:
+            row['per_ticker_seconds'] = round(seconds / stock_count, 4)
+    if run_summary is not None:
+        row['metrics'] = run_summary
+    if run_changes is not None:
+        row['changes'] = run_changes
+    try:
+        supabase.table('pipeline_shards').update(row).eq('run_id', run_id).eq('shard', shard).execute()
+    except Exception as e:
+        raise exceptions.SupabaseError(f"샤드 {run_id}/{shard} 결과 기록 실패: {e}") from e
+    logger.info(f"샤드 {run_id}/{shard} 결과 기록: {status}")
+
+
+def try_complete_run(supabase, run_id, logger):
+    """
+    완료 장벽: 모든 샤드가 성공했으면 실행을 완료 처리하고 True를 반환합니다.
+    completed_at이 비어 있을 때만 갱신하는 조건부 update로, 여러 작업자가 동시에 마지막 샤드를 끝내더라도
+    정확히 한 작업자만 True를 받습니다. (그 작업자가 완료 메시지를 보냄)
+    """
+    run, shards = load_run(supabase, run_id)
+    if run.get('completed_at'):
+        return False
+    remaining = [row['shard'] for row in shards if row['status'] != SUCCEEDED]
+    if remaining or len(shards) < run['shard_count']:
+        logger.info(f"샤드 실행 {run_id}: 남은 샤드 {len(remaining)}/{run['shard_count']}개")
+        return False
+    try:
+        completed = (supabase.table('pipeline_runs')
+                     .update({'completed_at': datetime.now(kst_timezone).isoformat()})
+                     .eq('run_id', run_id).is_('completed_at', 'null')
+                     .execute().data)
+    except Exception as e:
+        raise exceptions.SupabaseError(f"샤드 실행 {run_id} 완료 처리 실패: {e}") from e
+    if completed:
+        logger.info(f"샤드 실행 {run_id}의 모든 샤드({run['shard_count']}개)가 성공했습니다.")
+    return bool(completed)
+
+
+def run_summary(supabase, run_id):
+    """완료 메시지에 담을 실행 전체 요약: 샤드 수, 종목 수, 가장 느린 샤드 시간, 샤드 지표 counters 합계"""
+    run, shards = load_run(supabase, run_id)
+    counters = {}
+    for row in shards:
+        for name, value in ((row.get('metrics') or {}).get('counters') or {}).items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        'run_id': run_id,
+        'shard_count': run['shard_count'],
+        'stock_count': sum(row.get('stock_count') or 0 for row in shards),
+        'slowest_shard_seconds': max((row.get('seconds') or 0 for row in shards), default=0),
+        'counters': counters,
+    }
+
+
+def run_changes(supabase, run_id):
+    """모든 샤드의 변경 내역을 합쳐 changes.RunChanges.to_dict() 형식으로 반환합니다."""
+    _, shards = load_run(supabase, run_id)
+    merged = changes.RunChanges()
+    for row in shards:
+        merged.merge(row.get('changes') or {})
+    return merged.to_dict()
+
+
+# --- 작업자 호출 ---
+
+def dispatch_shards(supabase, run_id, shards, shard_count, is_closed_day, logger):
+    """
+    샤드별 작업자 함수를 비동기(detached)로 호출합니다. 작업자는 요청 본문으로 자기 샤드 정보를 받습니다.
+    호출에 실패한 샤드는 failed로 기록하고, 하나라도 실패하면 ApiError를 발생시킵니다.
+    (같은 run_id로 조정자를 다시 실행하면 성공하지 않은 샤드만 다시 호출됩니다)
+    """
+    function_id = settings.SHARD_FUNCTION_ID or os.environ.get('FN_FN_ID')
+    if not function_id or not settings.SHARD_INVOKE_ENDPOINT:
+        raise exceptions.ConfigError("샤드 호출 설정(SHARD_FUNCTION_ID, SHARD_INVOKE_ENDPOINT)이 없습니다.")
+    invoke_client = clients.get_functions_invoke_client(settings.SHARD_INVOKE_ENDPOINT)
+
+    failures = {}
+    for shard in shards:
+        body = json.dumps({'mode': 'worker', 'run_id': run_id, 'shard': shard, 'shard_count': shard_count,
+                           'is_closed_day': is_closed_day})
+        # 작업자가 먼저 끝나 기록한 결과를 덮어쓰지 않도록 호출 전에 dispatched로 기록
+        report_shard(supabase, run_id, shard, DISPATCHED, logger)
+        try:
+            invoke_client.invoke_function(function_id, invoke_function_body=body, fn_invoke_type='detached')
+        except Exception as e:
+            failures[shard] = e
+
+    for shard, error in failures.items():
+        report_shard(supabase, run_id, shard, FAILED, logger, error=f"호출 실패: {error}")
+    if failures:
+        clients.discard(clients.FUNCTIONS)
+        shard, error = next(iter(failures.items()))
+        raise exceptions.ApiError(f"샤드 작업자 호출 실패 {len(failures)}/{len(shards)}개 (샤드 {shard}: {error})")
+    logger.info(f"샤드 실행 {run_id}: 작업자 {len(shards)}개 호출 완료")
+
+
+def start_or_resume_run(supabase, all_stocks, run_id, get_is_closed_day, logger):
+    """
+    조정자(coordinator) 동작: 새 실행이면 샤드 수를 계산해 실행을 만들고 모든 샤드를 호출합니다.
+    run_id가 주어지면 그 실행에서 성공하지 않은 샤드만 다시 호출합니다.
+    get_is_closed_day: 휴장일 여부를 반환하는 함수 (새 실행에서만 한 번 호출하여 모든 작업자에 전달)
+    """
+    if run_id:
+        run, shards = load_run(supabase, run_id)
+        shard_count, is_closed_day = run['shard_count'], run['is_closed_day']
+        targets = [row['shard'] for row in shards if row['status'] != SUCCEEDED]
+        if run.get('completed_at') or not targets:
+            logger.info(f"샤드 실행 {run_id}은(는) 이미 완료되었습니다.")
+            targets = []
+    else:
+        per_ticker_seconds = measured_per_ticker_seconds(supabase, logger)
+        shard_count = estimate_shard_count(len(all_stocks), per_ticker_seconds)
+        logger.info(f"종목당 {per_ticker_seconds:.3f}초 기준, 종목 {len(all_stocks)}개를 샤드 {shard_count}개로 나눕니다.")
+        is_closed_day = get_is_closed_day()
+        run_id = create_run(supabase, shard_count, len(all_stocks), is_closed_day, logger)
+        targets = list(range(shard_count))
+
+    if targets:
+        dispatch_shards(supabase, run_id, targets, shard_count, is_closed_day, logger)
+    return {'run_id': run_id, 'shard_count': shard_count, 'dispatched_shards': targets,
+            'is_closed_day': is_closed_day}
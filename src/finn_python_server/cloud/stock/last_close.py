@@ -0,0 +1,101 @@
+import threading
+import time
+
+import sys,os
+base_dir = os.path.dirname(__file__)
+parent_path = os.path.join(base_dir, '..')
+sys.path.append(parent_path)
+import exceptions
+import settings
+
+# 종목별로 캐시에 유지할 최근 종가 개수 (같은 날 재실행 시 직전 거래일 종가를 찾기 위함)
+_CACHE_DEPTH = 2
+
+
+class LastCloseCache:
+    """
+    종목별 최근 종가를 기억하는 웜 캐시입니다. 모듈 전역으로 유지되어 웜 컨테이너의 다음 실행에서 재사용됩니다.
+    방금 upsert한 주가로 스스로 갱신되며, ttl_seconds가 지나면 사용하지 않습니다.
+    """
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._closes = {}
+        # 조회해도 종가가 없었던 종목 (신규 상장 등). 이 종목 때문에 매번 캐시를 놓치지 않도록 기억함
+        self._without_close = set()
+        self._updated_at = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return self._updated_at is not None and time.monotonic() - self._updated_at <= self.ttl_seconds
+
+    def lookup(self, stock_ids, before_date):
+        """모든 종목의 before_date 이전 최근 종가가 캐시에 있으면 dict를, 하나라도 없으면 None을 반환합니다."""
+        with self._lock:
+            if not self.is_fresh():
+                return None
+            result = {}
+            for stock_id in stock_ids:
+                close = next((close for price_date, close in self._closes.get(stock_id, ())
+                              if price_date < before_date), None)
+                if close is not None:
+                    result[stock_id] = close
+                elif stock_id not in self._without_close:
+                    return None
+            return result
+
+    def update(self, rows, without_close=()):
+        """rows: (stock_id, price_date 'YYYY-MM-DD', close_price) 반복 가능 객체"""
+        with self._lock:
+            self._without_close.update(without_close)
+            for stock_id, price_date, close in rows:
+                self._without_close.discard(stock_id)
+                entries = [entry for entry in self._closes.get(stock_id, []) if entry[0] != price_date]
+                entries.append((price_date, close))
+                entries.sort(reverse=True)
+                self._closes[stock_id] = entries[:_CACHE_DEPTH]
+            self._updated_at = time.monotonic()
+
+
+_warm_cache = LastCloseCache(ttl_seconds=settings.LAST_CLOSE_CACHE_TTL_SECONDS)
+
+
+def get_last_closes(supabase, stock_ids, before_date, logger, use_cache=None):
+    """
+    각 stock_id의 before_date('YYYY-MM-DD') 이전 가장 최근 종가를 {stock_id: close_price}로 반환합니다.
+    캐시가 신선하면 DB 조회를 생략하고, 아니면 get_last_closes RPC(DISTINCT ON) 한 번으로 조회합니다.
+    """
+    use_cache = settings.LAST_CLOSE_CACHE_ENABLED if use_cache is None else use_cache
+    if not stock_ids:
+        return {}
+    if use_cache:
+        cached = _warm_cache.lookup(stock_ids, before_date)
+        if cached is not None:
+            logger.info(f"전일 종가 캐시 적중: {len(cached)}개 종목 (DB 조회 생략)")
+            return cached
+
+    try:
+        rows = _query_last_closes(supabase, stock_ids, before_date)
+    except Exception as e:
+        logger.error(f"전일 종가 조회 중 오류: {e}")
+        raise exceptions.SupabaseError(f"전일 종가 조회 중 DB 오류 발생: {e}") from e
+
+    without_close = set(stock_ids) - {row['stock_id'] for row in rows}
+    if without_close:
+        logger.warning(f"{len(without_close)}개 종목은 {before_date} 이전 종가가 없어 등락률을 0으로 계산합니다.")
+    if use_cache:
+        _warm_cache.update(((row['stock_id'], row['price_date'], row['close_price']) for row in rows),
+                           without_close=without_close)
+    return {row['stock_id']: row['close_price'] for row in rows}
+
+
+def remember_saved_prices(price_df):
+    """방금 저장한 주가로 캐시를 갱신하여 다음 실행이 DB 조회를 생략할 수 있게 합니다."""
+    if not settings.LAST_CLOSE_CACHE_ENABLED or price_df.empty:
+        return
+    _warm_cache.update(zip(price_df['stock_id'].tolist(), price_df['price_date'].tolist(),
+                           price_df['close_price'].tolist()))
+
+
+def _query_last_closes(supabase, stock_ids, before_date):
+    response = supabase.rpc('get_last_closes', {'stock_ids': list(stock_ids), 'before_date': before_date}).execute()
+    return response.data or []
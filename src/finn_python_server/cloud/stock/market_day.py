@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import sys,os
+base_dir = os.path.dirname(__file__)
+parent_path = os.path.join(base_dir, '..')
+sys.path.append(parent_path)
+from stock import trading_calendar
+
+import pytz
+kst_timezone = pytz.timezone('Asia/Seoul')
+
+# 휴장일 확인은 pandas 없이 동작해야 함 (휴장일에는 주가 가공 모듈을 불러오지 않음)
+
+
+def check_is_today_closed_day(tiingo_client=None, logger=None, now=None):
+    """
+    금일(한국 시간 기준, 미국 기준 전일)이 휴장일인지 거래일 달력으로 확인합니다. (Tiingo 요청 없음)
+    tiingo_client는 기존 호출부 호환을 위해 받기만 하고 사용하지 않습니다.
+    """
+    session = trading_calendar.session_date(now or datetime.now(kst_timezone))
+    name = trading_calendar.holiday_name(session)
+    if name and logger:
+        logger.info(f"미국 기준 {session}은(는) 휴장일입니다. ({name})")
+    return name is not None
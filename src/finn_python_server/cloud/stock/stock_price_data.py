@@ -1,137 +1,205 @@
 import pandas as pd
-from supabase import create_client, Client
 from datetime import datetime, timedelta
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 import sys,os
 base_dir = os.path.dirname(__file__)
 parent_path = os.path.join(base_dir, '..')
 sys.path.append(parent_path)
 import exceptions
+import metrics
+import changes
+import settings
+import watermarks
+from rate_limiter import RateLimiter
+from bulk_writer import bulk_write
+from stock import last_close
+from stock import trading_calendar
+from fetch_cache import get_fetch_cache, cached_fetch
+from stock.market_day import check_is_today_closed_day  # 기존 호출부 호환
 
 import pytz
 kst_timezone = pytz.timezone('Asia/Seoul')
 
+# Tiingo 응답 컬럼 -> stock_prices 테이블 컬럼
+_TIINGO_COLUMNS = {'date': 'price_date', 'adjOpen': 'open_price', 'adjHigh': 'high_price', 'adjLow': 'low_price',
+                   'close': 'close_price', 'adjClose': 'adj_close_price', 'volume': 'volume'}
+_NUMERIC_COLUMNS = ['change_rate', 'open_price', 'high_price', 'low_price', 'close_price', 'adj_close_price']
+_REQUIRED_COLUMNS = ['stock_id', 'price_date', 'open_price', 'high_price', 'low_price', 'close_price',
+                     'adj_close_price', 'change_rate', 'volume', 'created_at']
+
 def collect_and_save_stock_prices(tiingo_client, supabase, stocks, logger):
-    """주가 데이터 수집부터 저장까지의 전체 과정을 실행하는 메인 함수"""
+    """
+    주가 데이터 수집부터 저장까지의 전체 과정을 실행하는 메인 함수
+    증분 수집 모드(COLLECTION_MODE=incremental)에서는 종목별 워터마크 이후의 거래일만 수집합니다.
+    """
     logger.info("--- 주가 데이터 수집 작업 시작 ---")
+    if watermarks.is_incremental():
+        with metrics.stage('price_pipeline'):
+            _collect_incremental(tiingo_client, supabase, stocks, logger)
+        logger.info("--- 주가 데이터 수집 작업 완료 ---")
+        return
     
-    end_date = datetime.now(kst_timezone)
-    start_date = end_date - timedelta(days=1)
+    # 가장 최근 미국 거래일 하루만 요청 (한국 시간 오전 7시 실행이면 미국의 전날 거래일)
+    # 전일 종가는 이 거래일 이전의 DB 최근 종가를 사용하므로 조회 기간을 넓힐 필요가 없음
+    session = trading_calendar.previous_trading_day(trading_calendar.session_date(datetime.now(kst_timezone)),
+                                                    inclusive=True)
+    start_date = end_date = session
     
-    prices_to_insert = _stock_price_data_from_tiingo(tiingo_client, supabase, stocks, start_date, end_date, logger)
-    if prices_to_insert:
-        _save_stock_prices_in_db(prices_to_insert, supabase, logger)
+    with metrics.stage('price_pipeline'):
+        price_df = _stock_price_data_from_tiingo(tiingo_client, supabase, stocks, start_date, end_date, logger)
+        if not price_df.empty:
+            _save_stock_prices_in_db(price_df, supabase, logger)
     
     logger.info("--- 주가 데이터 수집 작업 완료 ---")
 
+def _collect_incremental(tiingo_client, supabase, stocks, logger):
+    """
+    종목별 워터마크(마지막으로 저장한 price_date) 다음 거래일부터 장이 끝난 가장 최근 거래일까지만 수집합니다.
+    이미 최신인 종목은 요청하지 않고, 시작일이 같은 종목끼리 묶어 기존 수집 과정을 한 번씩 실행합니다.
+    워터마크가 없는 종목은 가장 최근 거래일 하루만 받으며, 오래 실행되지 않은 종목도 INCREMENTAL_MAX_LOOKBACK_DAYS일까지만
+    거슬러 올라갑니다.
+    """
+    latest = trading_calendar.last_closed_session(datetime.now(kst_timezone))
+    earliest = latest - timedelta(days=settings.INCREMENTAL_MAX_LOOKBACK_DAYS)
+    targets = [stock for stock in stocks if stock.get('stock_code')]
+    store = watermarks.load(supabase, watermarks.PRICES, [stock['id'] for stock in targets], logger)
+
+    groups = {}
+    for stock in targets:
+        watermark = store.get(stock['id'])
+        start = trading_calendar.next_trading_day(watermark) if watermark else latest
+        if start > latest:
+            continue
+        groups.setdefault(max(start, earliest), []).append(stock)
+    up_to_date = len(targets) - sum(len(group) for group in groups.values())
+    metrics.incr('prices_up_to_date', up_to_date)
+    logger.info(f"주가 증분 수집: 최신 거래일 {latest}, 이미 최신인 종목 {up_to_date}개 건너뜀")
+
+    for start, group in sorted(groups.items()):
+        price_df = _stock_price_data_from_tiingo(tiingo_client, supabase, group, start, latest, logger)
+        if price_df.empty:
+            continue
+        _save_stock_prices_in_db(price_df, supabase, logger)
+        for stock_id, price_date in price_df.groupby('stock_id')['price_date'].max().items():
+            store.advance(stock_id, price_date)
+    watermarks.save(supabase, store, logger)
+
 def _stock_price_data_from_tiingo(tiingo_client, supabase, stocks, start_date, end_date, logger):
-    all_prices_to_insert = []
+    """종목별 Tiingo 원본 프레임을 모은 뒤, 하나의 DataFrame으로 합쳐 한 번에 가공합니다."""
+    raw_frames = []
     start_date_str = start_date.strftime('%Y-%m-%d')
     end_date_str = end_date.strftime('%Y-%m-%d')
     logger.info(f"{len(stocks)}개 주식에 대한 주가 데이터 수집 (기간: {start_date_str} ~ {end_date_str})")
     
-    id_to_last_day_prices = _get_last_day_prices(supabase, logger)
-    for stock in stocks:
-        stock_id = stock['id']
-        stock_code = stock.get('stock_code')
-        if not stock_code: 
-            continue
-        try:
-            price_df = tiingo_client.get_dataframe(stock_code, startDate=start_date_str, endDate=end_date_str, frequency='daily')
-            if price_df.empty: 
-                logger.warning(f"'{stock_code}'에 대한 Tiingo 데이터를 가져올 수 없습니다. 건너뜁니다.")
-                continue # 다음 주식으로 넘어감
-
-            price_df.reset_index(inplace=True)
-            price_df['stock_id'] = stock_id
-            if stock_id in id_to_last_day_prices:
-               price_df['change_rate'] = _calculate_change_rate_for_close(price_df['close'], id_to_last_day_prices[stock_id])
-            else:
-                price_df['change_rate'] = 0.00
-            price_df.rename(columns={'date': 'price_date', 'adjOpen': 'open_price', 
-                                     'adjHigh': 'high_price', 'adjLow': 'low_price', 'close': 'close_price', 
-                                     'adjClose' : 'adj_close_price'}, inplace=True)
-            
-            numeric_columns = ['change_rate', 'open_price', 'high_price', 'low_price', 'close_price', 'adj_close_price']
-            for col in numeric_columns: 
-                price_df[col] = pd.to_numeric(price_df[col], errors='coerce').round(4)
-            price_df['price_date'] = pd.to_datetime(price_df['price_date']).dt.strftime('%Y-%m-%d')
-            price_df['created_at'] = datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')
-            
-            required_columns = ['stock_id', 'price_date', 'open_price', 'high_price', 'low_price', 'close_price', 
-                                'adj_close_price', 'change_rate', 'volume', 'created_at']
-            processed_df = price_df[required_columns].dropna()
-            
-            all_prices_to_insert.extend(processed_df.to_dict(orient='records'))
-        except Exception as e:
-            logger.error(f"'{stock_code}' 주가 처리 중 오류 발생. 건너뜁니다: {e}")
-            traceback.print_exc() # 상세 스택 트레이스 확인을 위해 유지
-            continue # 다음 주식으로 넘어감
-        
-    logger.info(f"총 {len(all_prices_to_insert)}개의 주가 레코드를 처리했습니다.")
-    return all_prices_to_insert
-
-def _save_stock_prices_in_db(all_prices_to_insert, supabase, logger):
+    targets = [stock for stock in stocks if stock.get('stock_code')]
+    # 조회 기간 시작일 이전의 종목별 최근 종가 (같은 날 재실행해도 방금 저장한 값과 비교하지 않음)
+    with metrics.stage('last_close_query'):
+        id_to_last_day_prices = last_close.get_last_closes(supabase, [stock['id'] for stock in targets],
+                                                           start_date_str, logger)
+    rate_limiter = RateLimiter(settings.TIINGO_REQUESTS_PER_SECOND)
+    max_workers = max(1, min(settings.TIINGO_MAX_WORKERS, len(targets) or 1))
+    cache = get_fetch_cache()
+
+    def fetch(stock):
+        return _fetch_stock_prices(tiingo_client, stock, start_date_str, end_date_str, rate_limiter, cache, logger)
+
+    with metrics.stage('tiingo_fetch'):
+        if max_workers == 1:
+            # 순차 모드: 기존과 동일하게 한 종목씩 처리
+            raw_frames = [fetch(stock) for stock in targets]
+        else:
+            logger.info(f"Tiingo 동시 수집 모드 (workers: {max_workers}, 초당 요청 제한: {settings.TIINGO_REQUESTS_PER_SECOND})")
+            # executor.map은 입력 순서대로 결과를 돌려주므로 레코드 순서가 순차 모드와 동일함
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                raw_frames = list(executor.map(fetch, targets))
+
+    cache.log_stats(logger)
+    with metrics.stage('price_transform'):
+        price_df = _transform_price_frames([frame for frame in raw_frames if frame is not None],
+                                           id_to_last_day_prices)
+    logger.info(f"총 {len(price_df)}개의 주가 레코드를 처리했습니다.")
+    return price_df
+
+def _fetch_stock_prices(tiingo_client, stock, start_date_str, end_date_str, rate_limiter, cache, logger):
+    """한 종목의 Tiingo 원본 주가를 (캐시 우선으로) 조회합니다. 실패한 종목은 None을 반환하여 건너뜁니다."""
+    stock_id = stock['id']
+    stock_code = stock.get('stock_code')
+
+    def fetch():
+        rate_limiter.acquire()
+        metrics.incr('tiingo_requests')
+        return tiingo_client.get_dataframe(stock_code, startDate=start_date_str, endDate=end_date_str, frequency='daily')
+
+    started = time.monotonic()
     try:
-        response = supabase.table('stock_prices').upsert(all_prices_to_insert, on_conflict='stock_id, price_date').execute()
-        if not response.data: 
-            raise exceptions.SupabaseError("Supabase에 주가 데이터 저장 실패 (응답 데이터 없음). RLS 정책 등을 확인하세요.")
-        logger.info(f"주가 저장 성공: {len(response.data)}개 레코드 처리")
+        price_df = cached_fetch(cache, 'tiingo', stock_code, start_date_str, end_date_str, fetch)
+        if price_df.empty: 
+            logger.warning(f"'{stock_code}'에 대한 Tiingo 데이터를 가져올 수 없습니다. 건너뜁니다.")
+            metrics.incr('tiingo_empty')
+            return None # 다음 주식으로 넘어감
+
+        # 필요한 컬럼만 남겨 합치기 전 메모리를 줄임 (없는 컬럼은 NaN -> 이후 dropna로 제외)
+        price_df = price_df.reset_index().reindex(columns=list(_TIINGO_COLUMNS))
+        price_df['stock_id'] = stock_id
+        return price_df
     except Exception as e:
-        logger.error(f"주가 저장 중 오류: {e}")
-        logger.error(f"주가 저장 중 심각한 오류: {e}")
-        raise exceptions.SupabaseError(f"주가 저장 중 DB 오류 발생: {e}") from e
+        logger.error(f"'{stock_code}' 주가 처리 중 오류 발생. 건너뜁니다: {e}")
+        traceback.print_exc() # 상세 스택 트레이스 확인을 위해 유지
+        metrics.incr('tiingo_errors')
+        return None # 다음 주식으로 넘어감
+    finally:
+        # 종목별 지연 시간 (rate limiter 대기와 캐시 조회 포함)
+        metrics.observe('tiingo_ticker', time.monotonic() - started)
+
+def _transform_price_frames(raw_frames, id_to_last_day_prices):
+    """
+    종목별 원본 프레임을 한 번에 합쳐 숫자 변환, 등락률 계산, 날짜 포맷, 검증을 벡터 연산으로 처리합니다.
+    한 종목에 여러 거래일이 있으면(증분 수집의 밀린 구간) 둘째 날부터는 같은 프레임의 앞 거래일 종가와 비교합니다.
+    전일 종가가 없는 종목의 등락률은 0.00 입니다.
+    """
+    if not raw_frames:
+        return pd.DataFrame(columns=_REQUIRED_COLUMNS)
+
+    price_df = pd.concat(raw_frames, ignore_index=True).rename(columns=_TIINGO_COLUMNS)
+    for col in _NUMERIC_COLUMNS[1:]:
+        price_df[col] = pd.to_numeric(price_df[col], errors='coerce')
+
+    last_day_close = price_df['stock_id'].map(id_to_last_day_prices)
+    last_day_close = pd.to_numeric(last_day_close, errors='coerce')
+    # 종목별 프레임은 날짜 오름차순이므로 같은 종목의 바로 앞 행이 전 거래일
+    last_day_close = price_df.groupby('stock_id')['close_price'].shift(1).fillna(last_day_close)
+    price_df['change_rate'] = _calculate_change_rate_for_close(price_df['close_price'], last_day_close).fillna(0.00)
+    price_df[_NUMERIC_COLUMNS] = price_df[_NUMERIC_COLUMNS].round(4)
 
-def _get_last_day_prices(supabase, logger):
+    price_df['price_date'] = pd.to_datetime(price_df['price_date']).dt.strftime('%Y-%m-%d')
+    price_df['created_at'] = datetime.now(kst_timezone).strftime('%Y-%m-%dT%H:%M:%S%z')
+    return price_df[_REQUIRED_COLUMNS].dropna().reset_index(drop=True)
+
+def _iter_price_records(price_df, chunk_size):
+    """DataFrame을 저장 직전에 chunk_size 행씩 dict 레코드로 변환합니다. (전체 레코드를 한 번에 만들지 않음)"""
+    for start in range(0, len(price_df), chunk_size):
+        yield price_df.iloc[start:start + chunk_size].to_dict(orient='records')
+
+def _save_stock_prices_in_db(price_df, supabase, logger):
     try:
-        id_to_prices = {}
-        latest_date_response = supabase.table('stock_prices') \
-                .select('price_date') \
-                .order('price_date', desc=True) \
-                .limit(1) \
-                .execute()
-        if not latest_date_response.data:
-            logger.warning("stock_prices 테이블에 데이터가 없어 전일 종가 조회를 건너뜁니다.")
-            return {} # 빈 딕셔너리를 반환하여 뒷부분 로직이 정상적으로 처리되도록 함
-                
-        latest_date = latest_date_response.data[0]['price_date']
-        last_day_price_response = supabase.table('stock_prices').select('close_price, stock_id') \
-            .eq('price_date', latest_date) \
-            .execute()
-        
-        # 여기서도 데이터가 없을 수 있으므로 확인
-        if not last_day_price_response.data:
-            logger.warning(f"{latest_date}에 해당하는 주가 데이터가 없습니다. 전일 종가 조회를 건너뜁니다.")
-            return {}
-            
-        for row in last_day_price_response.data:
-            stock_id = row['stock_id']
-            close_price = row['close_price']
-            id_to_prices[stock_id] = close_price
-        
-        return id_to_prices
+        saved_count = 0
+        chunk_size = settings.DB_BATCH_SIZE * settings.DB_MAX_PARALLEL_BATCHES
+        for records in _iter_price_records(price_df, chunk_size):
+            result = bulk_write(supabase, 'stock_prices', records, logger, on_conflict='stock_id, price_date',
+                                on_written=lambda rows: changes.record_rows('prices', rows))
+            saved_count += result['rows']
+        logger.info(f"주가 저장 성공: {saved_count}개 레코드 처리")
+        last_close.remember_saved_prices(price_df)
+    except exceptions.SupabaseError as e:
+        logger.error(f"주가 저장 중 심각한 오류: {e}")
+        raise
     except Exception as e:
-        logger.error(f"어제 자 주가 조회 중 오류: {e}")
-        raise exceptions.SupabaseError(f"어제 자 주가 조회 중 DB 오류 발생: {e}") from e
+        logger.error(f"주가 저장 중 심각한 오류: {e}")
+        raise exceptions.SupabaseError(f"주가 저장 중 DB 오류 발생: {e}") from e
 
 def _calculate_change_rate_for_close(today_price, last_day_price):
     change_rate = ((today_price - last_day_price) / last_day_price) * 100
     return change_rate.round(2)
-
-
-def check_is_today_closed_day(tiingo_client, logger):
-    
-    try:
-        end_date = datetime.now(kst_timezone)
-        start_date = end_date - timedelta(days=1)
-        price_df = tiingo_client.get_ticker_price('AAPL', fmt='json', startDate=start_date.strftime('%Y-%m-%d'),
-                                            endDate=end_date.strftime('%Y-%m-%d'), frequency='daily')
-        if not price_df:
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"휴장일 확인 중 Tiingo API 오류 발생: {e}")
-        raise exceptions.TiingoApiError(f"휴장일 확인 중 API 오류 발생: {e}") from e
-    
-    
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+미국 증시(NYSE) 거래일 달력
+
+네트워크 없이 규칙으로 휴장일/조기 폐장일을 계산합니다. 연도별로 한 번 계산해 두고(지연 계산) 이후 조회는 O(1)입니다.
+- 정규 휴장일: 신정, 마틴 루터 킹 데이, 대통령의 날, 성금요일, 메모리얼 데이, 준틴스(2022년부터), 독립기념일,
+  노동절, 추수감사절, 성탄절 (주말이면 NYSE 대체 규칙 적용: 토요일 -> 전날 금요일, 일요일 -> 다음 날 월요일,
+  단 신정이 토요일이면 전년도 12/31을 휴장하지 않음)
+- 특별 휴장일: 9.11, 허리케인, 전직 대통령 국장일 등 (_SPECIAL_CLOSURES)
+- 조기 폐장(13:00 ET): 독립기념일 전날(7/3이 월~목), 추수감사절 다음 날, 성탄절 전날(12/24가 월~목)
+
+날짜 인자는 date, datetime, 'YYYY-MM-DD' 문자열을 모두 받습니다.
+"""
+import bisect
+import threading
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+NEW_YORK = pytz.timezone('America/New_York')
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# 규칙을 검증한 범위 (MLK 데이는 1998년부터 휴장)
+MIN_YEAR = 1998
+MAX_YEAR = 2100
+
+_SPECIAL_CLOSURES = {
+    date(2001, 9, 11): "9.11 테러",
+    date(2001, 9, 12): "9.11 테러",
+    date(2001, 9, 13): "9.11 테러",
+    date(2001, 9, 14): "9.11 테러",
+    date(2004, 6, 11): "레이건 전 대통령 국장",
+    date(2007, 1, 2): "포드 전 대통령 국장",
+    date(2012, 10, 29): "허리케인 샌디",
+    date(2012, 10, 30): "허리케인 샌디",
+    date(2018, 12, 5): "부시 전 대통령 국장",
+    date(2025, 1, 9): "카터 전 대통령 국장",
+}
+
+
+# --- 휴장일 규칙 ---
+
+def _nth_weekday(year, month, weekday, n):
+    """month의 n번째 weekday (n=-1이면 마지막)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year, month + 1, 1) if month < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """부활절 (그레고리력, 익명 알고리즘)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _observed(day):
+    """토요일 -> 금요일, 일요일 -> 월요일"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _holidays(year):
+    holidays = {}
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:  # 토요일이면 전년도 12/31에 대체 휴장하지 않음
+        holidays[_observed(new_year)] = "신정"
+    holidays[_nth_weekday(year, 1, 0, 3)] = "마틴 루터 킹 데이"
+    holidays[_nth_weekday(year, 2, 0, 3)] = "대통령의 날"
+    holidays[_easter(year) - timedelta(days=2)] = "성금요일"
+    holidays[_nth_weekday(year, 5, 0, -1)] = "메모리얼 데이"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "준틴스"
+    holidays[_observed(date(year, 7, 4))] = "독립기념일"
+    holidays[_nth_weekday(year, 9, 0, 1)] = "노동절"
+    holidays[_nth_weekday(year, 11, 3, 4)] = "추수감사절"
+    holidays[_observed(date(year, 12, 25))] = "성탄절"
+    for day, name in _SPECIAL_CLOSURES.items():
+        if day.year == year:
+            holidays[day] = name
+    return holidays
+
+
+def _early_closes(year, holidays):
+    candidates = [date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 12, 24)]
+    return {day for day in candidates if day.weekday() < 5 and day not in holidays
+            and (day.month == 11 or day.weekday() < 4)}
+
+
+# --- 연도별 표 (지연 계산) ---
+
+class _YearTable:
+    def __init__(self, year):
+        holidays = _holidays(year)
+        self.holidays = {day.toordinal(): name for day, name in holidays.items() if day.year == year}
+        self.early_closes = {day.toordinal() for day in _early_closes(year, holidays)}
+        start, end = date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+        self.trading = [ordinal for ordinal in range(start, end + 1)
+                        if date.fromordinal(ordinal).weekday() < 5 and ordinal not in self.holidays]
+        self.trading_set = frozenset(self.trading)
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _table(year):
+    table = _tables.get(year)
+    if table is None:
+        if not MIN_YEAR <= year <= MAX_YEAR:
+            raise ValueError(f"거래일 달력은 {MIN_YEAR}~{MAX_YEAR}년만 지원합니다. ({year})")
+        with _tables_lock:
+            table = _tables.setdefault(year, _YearTable(year))
+    return table
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# --- 조회 ---
+
+def is_trading_day(day):
+    day = _to_date(day)
+    return day.toordinal() in _table(day.year).trading_set
+
+
+def holiday_name(day):
+    """휴장일 이름. 주말이면 '주말', 거래일이면 None"""
+    day = _to_date(day)
+    name = _table(day.year).holidays.get(day.toordinal())
+    if name is None and day.weekday() >= 5:
+        return "주말"
+    return name
+
+
+def close_time(day):
+    """거래일의 폐장 시각(ET). 조기 폐장일이면 13:00, 휴장일이면 None"""
+    day = _to_date(day)
+    if not is_trading_day(day):
+        return None
+    return EARLY_CLOSE if day.toordinal() in _table(day.year).early_closes else REGULAR_CLOSE
+
+
+def is_early_close(day):
+    return close_time(day) == EARLY_CLOSE
+
+
+def trading_days(start, end):
+    """[start, end] 구간(양 끝 포함)의 거래일 목록"""
+    start, end = _to_date(start), _to_date(end)
+    days = []
+    for year in range(start.year, end.year + 1):
+        trading = _table(year).trading
+        lo = bisect.bisect_left(trading, start.toordinal())
+        hi = bisect.bisect_right(trading, end.toordinal())
+        days.extend(date.fromordinal(ordinal) for ordinal in trading[lo:hi])
+    return days
+
+
+def previous_trading_day(day, inclusive=False):
+    """day 이전(inclusive=True이면 day 포함) 가장 가까운 거래일"""
+    day = _to_date(day)
+    ordinal = day.toordinal() + (1 if inclusive else 0)
+    year = day.year
+    while year >= MIN_YEAR:
+        trading = _table(year).trading
+        index = bisect.bisect_left(trading, ordinal)
+        if index > 0:
+            return date.fromordinal(trading[index - 1])
+        year -= 1
+    raise ValueError(f"{day} 이전 거래일이 달력 범위 밖입니다.")
+
+
+def next_trading_day(day, inclusive=False):
+    """day 이후(inclusive=True이면 day 포함) 가장 가까운 거래일"""
+    day = _to_date(day)
+    ordinal = day.toordinal() - (1 if inclusive else 0)
+    year = day.year
+    while year <= MAX_YEAR:
+        trading = _table(year).trading
+        index = bisect.bisect_right(trading, ordinal)
+        if index < len(trading):
+            return date.fromordinal(trading[index])
+        year += 1
+    raise ValueError(f"{day} 이후 거래일이 달력 범위 밖입니다.")
+
+
+def session_date(now=None):
+    """
+    현재 시각 기준 뉴욕 날짜. 한국 시간 오전 7시 실행이면 미국의 전날(장이 이미 끝난 날)이 됩니다.
+    now는 시간대가 있는 datetime이어야 합니다. (없으면 현재 시각)
+    """
+    now = now or datetime.now(pytz.utc)
+    return now.astimezone(NEW_YORK).date()
+
+
+def last_closed_session(now=None):
+    """now 시점에 장이 끝난 가장 최근 거래일 (거래일의 폐장 전이면 이전 거래일)"""
+    now = (now or datetime.now(pytz.utc)).astimezone(NEW_YORK)
+    close = close_time(now.date())
+    if close is not None and now.time() >= close:
+        return now.date()
+    return previous_trading_day(now.date())
+
+
+def group_consecutive(days):
+    """
+    거래일 목록을 거래일 기준으로 연속된 구간 [(시작, 끝), ...]으로 묶습니다.
+    (금요일과 다음 월요일처럼 사이에 거래일이 없으면 같은 구간)
+    """
+    ranges = []
+    for day in sorted(set(_to_date(day) for day in days)):
+        if ranges and next_trading_day(ranges[-1][1]) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [(start, end) for start, end in ranges]
@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime
+
+import pytz
+
+import settings
+
+kst_timezone = pytz.timezone('Asia/Seoul')
+
+# 워터마크 종류 (changes.DATE_COLUMNS와 같은 이름)
+NEWS = 'news'
+PRICES = 'prices'
+
+# 한 번의 조회에 넣을 stock_id 개수 (요청 URL 길이 제한)
+_LOAD_CHUNK_SIZE = 200
+
+
+def is_incremental():
+    return settings.COLLECTION_MODE == 'incremental'
+
+
+class WatermarkStore:
+    """
+    증분 수집 모드에서 종목별로 마지막으로 수집한 위치(워터마크)를 보관합니다. (collection_watermarks 테이블)
+    - news: 마지막으로 수집한 뉴스의 published_date, prices: 마지막으로 저장한 price_date (문자열 비교로 순서가 맞는 형식)
+    - advance: 이번 실행에서 수집한 값으로 워터마크를 올려 두고, 저장이 끝난 뒤 save()로 한 번에 반영합니다.
+      (저장 전에 실패한 실행의 구간은 다음 실행에서 다시 수집)
+    """
+    def __init__(self, kind, rows=()):
+        self.kind = kind
+        self._saved = {row['stock_id']: row['watermark'] for row in rows}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._saved)
+
+    def get(self, stock_id):
+        return self._saved.get(stock_id)
+
+    def advance(self, stock_id, value):
+        """value가 현재 워터마크보다 뒤이면 워터마크를 올립니다."""
+        if stock_id is None or not value:
+            return
+        with self._lock:
+            current = self._pending.get(stock_id) or self._saved.get(stock_id)
+            if current is None or value > current:
+                self._pending[stock_id] = value
+
+    def pending_rows(self):
+        with self._lock:
+            return [{'stock_id': stock_id, 'kind': self.kind, 'watermark': value}
+                    for stock_id, value in self._pending.items()]
+
+
+def load(supabase, kind, stock_ids, logger):
+    """stock_ids의 저장된 kind 워터마크를 불러옵니다. 실패하면 빈 저장소(모든 종목이 기본 수집 구간)를 반환합니다."""
+    stock_ids = sorted({stock_id for stock_id in stock_ids if stock_id is not None})
+    rows = []
+    try:
+        for start in range(0, len(stock_ids), _LOAD_CHUNK_SIZE):
+            rows.extend(supabase.table('collection_watermarks')
+                        .select('stock_id, watermark')
+                        .eq('kind', kind)
+                        .in_('stock_id', stock_ids[start:start + _LOAD_CHUNK_SIZE])
+                        .execute().data or [])
+    except Exception as e:
+        logger.warning(f"{kind} 워터마크 로드 실패, 모든 종목을 기본 구간으로 수집합니다: {e}")
+        return WatermarkStore(kind)
+    logger.info(f"{kind} 워터마크 {len(rows)}/{len(stock_ids)}개 로드")
+    return WatermarkStore(kind, rows)
+
+
+def save(supabase, store, logger):
+    """이번 실행에서 올린 워터마크를 저장합니다. 실패해도 예외를 발생시키지 않습니다. (다음 실행이 이전 워터마크부터 다시 수집)"""
+    rows = store.pending_rows()
+    if not rows:
+        return
+    updated_at = datetime.now(kst_timezone).isoformat()
+    for row in rows:
+        row['updated_at'] = updated_at
+    try:
+        supabase.table('collection_watermarks').upsert(rows, on_conflict='stock_id, kind').execute()
+        logger.info(f"{store.kind} 워터마크 {len(rows)}개 저장")
+    except Exception as e:
+        logger.warning(f"{store.kind} 워터마크 저장 실패, 다음 실행에서 이전 워터마크부터 다시 수집합니다: {e}")
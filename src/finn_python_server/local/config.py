@@ -1,3 +1,5 @@
+import os
+
 STOCK_LIST = ['AAPL', 
               'HD',
               'UNH', 
@@ -17,4 +19,17 @@ STOCK_LIST = ['AAPL',
               'COST', 
               'TSLA', 
               'GOOGL', 
-              'JNJ']
\ No newline at end of file
+              'JNJ']
+
+# 학습/테스트 데이터 구간 (split 이름 -> (시작일, 종료일), 양 끝 포함)
+# 주가/뉴스 수집 스크립트가 함께 사용합니다.
+DATA_SPLITS = {
+    'train': ('2024-01-01', '2024-12-31'),
+    'test': ('2025-01-01', '2025-05-31'),
+}
+
+# 수집 결과를 저장할 위치와 형식 (환경 변수 FINN_DATA_DIR, FINN_OUTPUT_FORMAT 로 변경 가능)
+DATA_DIR = os.path.expanduser(os.environ.get('FINN_DATA_DIR', '~/Downloads/finn_data'))
+# 'csv': 종목 x split 별 CSV 파일, 'both': 둘 다 저장
+# 'parquet': 종목/연도로 파티션된 Parquet 데이터셋 (dataset_store.read_dataset 으로 읽음, pyarrow 별도 설치 필요)
+OUTPUT_FORMAT = os.environ.get('FINN_OUTPUT_FORMAT', 'csv')
@@ -0,0 +1,125 @@
+"""
+학습용 데이터셋을 종목/연도로 파티션된 Parquet 파일로 저장하고 읽는 모듈입니다.
+
+디렉터리 구조: {DATA_DIR}/dataset/{price|news}/ticker={종목}/year={연도}/part.parquet
+
+읽을 때는 파일을 메모리 매핑하고, 필요한 컬럼만(projection) 읽으며,
+종목/연도 조건으로 파티션 디렉터리를, 날짜 조건으로 row group을 건너뜁니다(predicate pushdown).
+
+    from dataset_store import read_dataset
+    df = read_dataset('price', columns=['date', 'ticker', 'close'], tickers=['AAPL', 'HD', 'UNH', 'TSLA', 'JNJ'],
+                      start_date='2025-01-01', end_date='2025-03-31')
+"""
+import os
+from datetime import date
+
+import pandas as pd
+
+from config import DATA_DIR, DATA_SPLITS
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # CSV로만 저장할 때는 pyarrow 없이도 동작
+    pa = None
+
+DATASET_DIR = os.path.join(DATA_DIR, 'dataset')
+
+# 데이터셋별 중복 판단 컬럼. 같은 파티션에 다시 저장하면 이 컬럼 기준으로 최신 행만 남김
+KEY_COLUMNS = {
+    'price': ['date'],
+    'news': ['date', 'link'],
+}
+# row group이 작을수록 날짜 조건으로 건너뛸 수 있는 단위가 세밀해짐 (주가는 약 한 분기)
+ROW_GROUP_SIZE = {
+    'price': 64,
+    'news': 4096,
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet 데이터셋을 사용하려면 pyarrow가 필요합니다. (pip install pyarrow)")
+
+
+def check_output_format(output_format):
+    """
+    수집을 시작하기 전에 저장 형식을 확인합니다. (모든 데이터를 받은 뒤에야 저장 단계에서 실패하지 않도록)
+    지원하지 않는 형식이거나, Parquet 저장에 필요한 pyarrow가 없으면 예외를 발생시킵니다.
+    """
+    if output_format not in ('csv', 'parquet', 'both'):
+        raise ValueError(f"지원하지 않는 저장 형식입니다: {output_format} ('csv', 'parquet', 'both' 중 하나)")
+    if output_format in ('parquet', 'both'):
+        _require_pyarrow()
+
+
+def _partitioning():
+    # 종목 코드가 숫자로만 되어 있어도 문자열로 읽도록 스키마를 명시
+    return ds.partitioning(pa.schema([('ticker', pa.string()), ('year', pa.int32())]), flavor='hive')
+
+
+def _partition_path(dataset, ticker, year):
+    return os.path.join(DATASET_DIR, dataset, f'ticker={ticker}', f'year={year}', 'part.parquet')
+
+
+def write_partition(dataset, ticker, df):
+    """
+    한 종목의 데이터(date 컬럼 필수)를 연도별 파티션에 저장합니다.
+    기존 파티션이 있으면 합친 뒤 KEY_COLUMNS 기준으로 중복을 제거하므로, 여러 split을 나누어 저장해도 안전합니다.
+    """
+    _require_pyarrow()
+    if df.empty:
+        return
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], utc=True).dt.date
+    # 파일마다 스키마가 달라지지 않도록 숫자 컬럼은 float64로 통일
+    for column in df.columns:
+        if column != 'date' and pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].astype('float64')
+
+    years = pd.Series([day.year for day in df['date']], index=df.index)
+    for year, year_df in df.groupby(years):
+        path = _partition_path(dataset, ticker, year)
+        if os.path.exists(path):
+            year_df = pd.concat([pq.read_table(path).to_pandas(), year_df], ignore_index=True)
+            year_df = year_df.drop_duplicates(subset=KEY_COLUMNS[dataset], keep='last')
+        year_df = year_df.sort_values('date').reset_index(drop=True)
+
+        # 임시 파일에 쓴 뒤 교체하여, 쓰는 도중 중단되어도 깨진 파티션이 남지 않게 함
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        pq.write_table(pa.Table.from_pandas(year_df, preserve_index=False), temp_path,
+                       row_group_size=ROW_GROUP_SIZE[dataset], compression='zstd')
+        os.replace(temp_path, path)
+
+
+def read_dataset(dataset, columns=None, tickers=None, start_date=None, end_date=None, split=None, as_arrow=False):
+    """
+    데이터셋을 읽어 DataFrame(as_arrow=True 이면 pyarrow.Table)으로 반환합니다.
+    - columns: 읽을 컬럼 목록 (None 이면 전체, 'ticker' 포함 가능)
+    - tickers: 읽을 종목 목록 (None 이면 전체)
+    - start_date, end_date: 'YYYY-MM-DD', 양 끝 포함. split 이름을 주면 DATA_SPLITS의 구간을 사용
+    """
+    _require_pyarrow()
+    if split is not None:
+        start_date, end_date = DATA_SPLITS[split]
+
+    conditions = []
+    if tickers is not None:
+        conditions.append(ds.field('ticker').isin(list(tickers)))
+    if start_date is not None:
+        start_day = date.fromisoformat(start_date)
+        conditions += [ds.field('year') >= start_day.year, ds.field('date') >= start_day]
+    if end_date is not None:
+        end_day = date.fromisoformat(end_date)
+        conditions += [ds.field('year') <= end_day.year, ds.field('date') <= end_day]
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+
+    source = ds.dataset(os.path.join(os.path.abspath(DATASET_DIR), dataset), format='parquet',
+                        partitioning=_partitioning(), filesystem=pafs.LocalFileSystem(use_mmap=True))
+    table = source.to_table(columns=columns, filter=condition)
+    return table if as_arrow else table.to_pandas()
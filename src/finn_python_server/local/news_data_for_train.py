@@ -1,144 +1,196 @@
-import os
-import feedparser
+import os, sys
+import json
+import asyncio
+import logging
 from datetime import datetime, timedelta
+import aiohttp
 import pandas as pd
 from tqdm import tqdm
-import time  # 순차 요청을 위한 time 라이브러리 임포트
-import requests # 비동기 aiohttp 대신 동기 requests 라이브러리 임포트
-from config import STOCK_LIST
-
-# --- 헬퍼 함수 (변경 없음) ---
-def generate_google_rss_url(query, start_date, end_date):
-    base_url = "https://news.google.com/rss/search?"
-    q = f"q={query}+after:{start_date}+before:{end_date}"
-    params = "&hl=en-US&gl=US&ceid=US:en"
-    return base_url + q
-
-def adjust_title_by_length_limit(title):
-    return (title[:97] + '...') if len(title) > 100 else title
-
-def remove_duplicate_titles_by_prefix(all_news, prefix_length=50):
-    seen = set()
-    keep_rows = []
-    for news in all_news:
-        prefix = news["title"][:prefix_length].strip().lower()
-        if prefix not in seen:
-            seen.add(prefix)
-            keep_rows.append(news)
-    return keep_rows
-
-# --- 데이터 수집 함수 (동기 코드로 변경) ---
-
-def fetch_news_rss_day_sync(query, day: datetime, limit: int = 30):
-    """[동기] 지정된 하루치 뉴스 데이터를 순차적으로 가져옵니다."""
-    start_date = day.strftime("%Y-%m-%d")
-    end_date = (day + timedelta(days=1)).strftime("%Y-%m-%d")
-    url = generate_google_rss_url(query, start_date, end_date)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    
-    items = []
-    try:
-        # async with session.get 대신 requests.get 사용
-        response = requests.get(url, timeout=20, headers=headers)
-        
-        # HTTP 상태 코드 확인
-        if response.status_code != 200:
-            print(f"Error fetching {query} on {start_date}: {response.status_code}")
-            return []  # 실패 시 빈 리스트 반환
-
-        feed = feedparser.parse(response.text)
-        
-        for entry in feed.entries[:limit]:
-            try:
-                pub_date = datetime(*entry.published_parsed[:6])
-                items.append({
-                    "date": pub_date.strftime("%Y-%m-%d"),
-                    "title": entry.title,
-                    "link": entry.link,
-                    "source": entry.source.title
-                })
-            except Exception:
-                continue
-    except Exception as e:
-        print(f"Error fetching {query} on {start_date}: {e}")
+from config import STOCK_LIST, DATA_SPLITS, DATA_DIR, OUTPUT_FORMAT
+import dataset_store
+
+base_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(base_dir, '..', 'cloud'))
+from news import news_data, window_planner
+from news.adaptive_limiter import AdaptiveConcurrencyLimiter
+from news.near_dup import remove_near_duplicate_titles
+from news.resilient_fetch import ResilientFetcher
+from rate_limiter import AsyncRateLimiter
+from fetch_cache import FetchCache
+
+# 과거 날짜의 피드는 만료 없이 보관되므로 재실행 시 같은 날짜를 다시 요청하지 않음
+fetch_cache = FetchCache(os.path.join(DATA_DIR, 'cache'), max_bytes=2 * 1024 ** 3, recent_ttl_seconds=15 * 60)
+
+OUTPUT_DIR = os.path.join(DATA_DIR, 'news')
+# 샤드(종목 x 월) 단위로 완료된 결과를 저장하는 위치. 중단 후 재실행 시 완료된 샤드는 건너뜀
+CHECKPOINT_DIR = os.path.join(OUTPUT_DIR, '.checkpoints')
+# 종목별 하루 평균 기사 수. 다음 실행에서 첫 구간 폭을 정하는 데 사용 (없으면 샤드 전체를 한 구간으로 시작)
+DENSITY_PATH = os.path.join(CHECKPOINT_DIR, 'density.json')
+# Google News RSS 한 응답의 최대 항목 수. 결과가 이만큼이면 잘린 것으로 보고 구간을 나눔
+FEED_ITEM_CAP = 100
+
+# 전역 요청 제한: 동시 요청 수는 응답 상태에 따라 1~MAX_CONCURRENCY 사이에서 조절되고, 초당 요청 수는 고정 상한
+MAX_CONCURRENCY = 8
+REQUESTS_PER_SECOND = 4
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+logger = logging.getLogger(__name__)
+
+
+# --- 샤드/체크포인트 ---
+
+def make_shards(stock_code, start_day, end_day):
+    """[start_day, end_day] 기간을 월 단위 샤드로 나눕니다. 각 샤드는 (샤드 이름, 날짜 리스트) 입니다."""
+    shards = {}
+    for i in range((end_day - start_day).days + 1):
+        day = start_day + timedelta(days=i)
+        shards.setdefault(f"{stock_code}_{day.strftime('%Y-%m')}", []).append(day)
+    return list(shards.items())
+
+def checkpoint_path(split_name, shard_name):
+    return os.path.join(CHECKPOINT_DIR, split_name, f"{shard_name}.json")
+
+def save_checkpoint(path, items):
+    # 임시 파일에 쓴 뒤 교체하여, 쓰는 도중 중단되어도 깨진 체크포인트가 남지 않게 함
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def load_checkpoint(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def load_shard_checkpoint(path):
+    """완료된 샤드의 뉴스. 없거나 이전 형식(DB 행 형식, 잘린 제목)이면 None을 반환하여 다시 수집하게 합니다."""
+    if not os.path.exists(path):
+        return None
+    items = load_checkpoint(path)
+    if any('published_date' in item for item in items):
+        return None
+    return items
 
+def load_densities():
+    if not os.path.exists(DENSITY_PATH):
+        return {}
+    return load_checkpoint(DENSITY_PATH)
+
+
+# --- 데이터 수집 함수 (비동기 백필) ---
+
+def to_train_rows(rows):
+    """
+    수집한 NewsRow를 학습 데이터 형식(date, title, link, source)으로 바꿉니다.
+    기존 수집기와 같이 언론사가 없는 항목은 제외합니다.
+    """
+    return [{"date": row.published_date[:10], "title": row.title, "link": row.original_url, "source": row.source}
+            for row in rows if row.source]
+
+async def fetch_shard(session, limiter, rate_limiter, fetcher, split_name, shard_name, stock_code, days,
+                      stats, densities):
+    """
+    한 샤드의 기간을 적응형 구간(window_planner)으로 수집하고, 전부 성공하면 체크포인트를 저장합니다.
+    기사가 적은 종목은 여러 날을 한 요청으로 받고, 결과가 FEED_ITEM_CAP에 닿은 구간만 나누어 다시 요청합니다.
+    """
+    async def fetch(window_start, window_end):
+        return await news_data._fetch_news_rss_day_async(logger, session, stock_code, None, window_start, window_end,
+                                                         limiter, limit=FEED_ITEM_CAP, cache=fetch_cache,
+                                                         rate_limiter=rate_limiter, raise_errors=True, fetcher=fetcher,
+                                                         compact=True, truncate_titles=False)
+
+    # 구간 분할은 피드 항목 수 기준이므로, 언론사가 없는 항목은 모두 받은 뒤에 제외함
+    rows = await window_planner.fetch_windows(fetch, days[0], days[-1] + timedelta(days=1), FEED_ITEM_CAP,
+                                              per_day=densities.get(stock_code), stats=stats)
+    window_planner.update_density(densities, stock_code, len(rows), len(days))
+    items = to_train_rows(rows)
+    save_checkpoint(checkpoint_path(split_name, shard_name), items)
     return items
 
-def get_news_data_sync(stock_code, start_day, end_day):
-    """[동기] 한 종목에 대한 모든 뉴스 데이터를 순차적으로 수집하고 진행 상황을 표시합니다."""
-    all_news = []
-    total_days = (end_day - start_day).days + 1
-
-    # ⭐ 1. for 반복문의 range를 tqdm으로 감싸줍니다.
-    # ⭐ 2. desc 파라미터를 사용하여 어떤 종목의 진행률인지 표시해줍니다.
-    for i in tqdm(range(total_days), desc=f"[{stock_code}] 개별 날짜 진행률"):
-        current_day = start_day + timedelta(days=i)
-        
-        # 하루치 데이터를 순차적으로 호출
-        daily_news = fetch_news_rss_day_sync(stock_code, current_day)
-        if daily_news:
-            all_news.extend(daily_news)
-
-    unique_news = remove_duplicate_titles_by_prefix(all_news, prefix_length=50)
-    return unique_news
-
-def get_stock_price_for_train(stock_code):
-    """[동기] 학습용 데이터를 수집하고 저장합니다."""
-    start_day = datetime(2024, 1, 1)
-    end_day = datetime(2024, 12, 31)
-    
-    # 동기 함수 호출 (await 제거)
-    all_news = get_news_data_sync(stock_code, start_day, end_day)
-    if not all_news:
-        print(f"[{stock_code}] Train 뉴스가 없습니다.")
+async def backfill_split(split_name, start_day, end_day, stock_codes):
+    """한 split의 (종목, 날짜) 전체를 전역 요청 제한 아래에서 동시에 수집합니다. 완료된 샤드는 건너뜁니다."""
+    limiter = AdaptiveConcurrencyLimiter(min_limit=1, max_limit=MAX_CONCURRENCY, initial_limit=MAX_CONCURRENCY // 2,
+                                         logger=logger)
+    rate_limiter = AsyncRateLimiter(REQUESTS_PER_SECOND)
+    news_by_stock = {stock_code: [] for stock_code in stock_codes}
+    failed_stocks = set()
+    stats = window_planner.WindowStats()
+    densities = load_densities()
+
+    pending = []
+    for stock_code in stock_codes:
+        for shard_name, days in make_shards(stock_code, start_day, end_day):
+            items = load_shard_checkpoint(checkpoint_path(split_name, shard_name))
+            if items is not None:
+                news_by_stock[stock_code].extend(items)
+            else:
+                pending.append((stock_code, shard_name, days))
+    print(f"[{split_name}] 남은 샤드 {len(pending)}개 (완료된 샤드는 체크포인트에서 불러옴)")
+
+    async with aiohttp.ClientSession(headers=HEADERS) as session:
+        # 모든 샤드가 하나의 차단기를 공유하여, 속도 제한이 명확하면 남은 요청을 바로 실패(다음 실행에서 재시도)시킴
+        fetcher = ResilientFetcher(session, limiter, logger, rate_limiter=rate_limiter)
+
+        async def run(stock_code, shard_name, days):
+            try:
+                return stock_code, await fetch_shard(session, limiter, rate_limiter, fetcher, split_name, shard_name,
+                                                     stock_code, days, stats, densities)
+            except Exception as e:
+                tqdm.write(f"[{shard_name}] 수집 실패, 다음 실행에서 다시 시도합니다: {e}")
+                failed_stocks.add(stock_code)
+                return stock_code, []
+
+        for future in tqdm(asyncio.as_completed([run(*shard) for shard in pending]), total=len(pending),
+                           desc=f"샤드 진행률 ({split_name})"):
+            stock_code, items = await future
+            news_by_stock[stock_code].extend(items)
+
+    save_checkpoint(DENSITY_PATH, densities)
+    if stats.days:
+        print(f"[{split_name}] 요청 {stats.requests}회 (일별 수집 {stats.days}회 대비 {stats.requests_saved}회 절약, "
+              f"구간 분할 {stats.splits}회, 하루 구간 상한 도달 {stats.saturated}회)")
+
+    for stock_code in stock_codes:
+        if stock_code in failed_stocks:
+            print(f"[{stock_code}] 실패한 샤드가 있어 {split_name} 파일을 만들지 않습니다. 다시 실행하면 이어서 수집합니다.")
+            continue
+        save_news(stock_code, split_name, news_by_stock[stock_code])
+
+def save_news(stock_code, split_name, all_news):
+    """중복을 제거한 뉴스를 OUTPUT_FORMAT에 따라 Parquet 데이터셋 및/또는 CSV로 저장합니다."""
+    unique_news = remove_near_duplicate_titles(all_news, threshold=0.6)
+    if not unique_news:
+        print(f"[{stock_code}] {split_name} 뉴스가 없습니다.")
         return
 
-    news_df = pd.DataFrame(all_news)
-    news_df.sort_values(by="date", inplace=True)
-    news_df = news_df[["date", "title", "link", "source"]]
+    news_df = pd.DataFrame(unique_news, columns=["date", "title", "link", "source"])
     news_df["date"] = pd.to_datetime(news_df["date"])
-
-    output_path = os.path.expanduser(f'~/Downloads/finn_data/news/{stock_code}_news_train.csv')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    news_df.to_csv(output_path, index=False)
-
-def get_stock_price_for_test(stock_code):
-    """[동기] 테스트용 데이터를 수집하고 저장합니다."""
-    start_day = datetime(2025, 1, 1)
-    end_day = datetime(2025, 5, 31)
-
-    # 동기 함수 호출 (await 제거)
-    all_news = get_news_data_sync(stock_code, start_day, end_day)
-    if not all_news:
-        print(f"[{stock_code}] Test 뉴스가 없습니다.")
-        return
-        
-    news_df = pd.DataFrame(all_news)
     news_df.sort_values(by="date", inplace=True)
-    news_df = news_df[["date", "title", "link", "source"]]
-    news_df["date"] = pd.to_datetime(news_df["date"])
-    
-    output_path = os.path.expanduser(f'~/Downloads/finn_data/news/{stock_code}_news_test.csv')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    news_df.to_csv(output_path, index=False)
-
-# --- 메인 실행 함수 (동기 코드로 변경) ---
-
-def main():
-    """메인 실행 함수"""
-    print("학습용 데이터 순차적 다운로드를 시작합니다 (종목별 처리).")
-    for stock_code in tqdm(STOCK_LIST, desc="전체 종목 진행률 (Train)"):
-        # 각 종목 처리가 끝날 때까지 기다림 (await 제거)
-        get_stock_price_for_train(stock_code)
-    print("\n학습용 데이터 다운로드 완료.")
-
-    print("\n테스트용 데이터 순차적 다운로드를 시작합니다 (종목별 처리).")
-    for stock_code in tqdm(STOCK_LIST, desc="전체 종목 진행률 (Test)"):
-        get_stock_price_for_test(stock_code)
+
+    if OUTPUT_FORMAT in ('parquet', 'both'):
+        dataset_store.write_partition('news', stock_code, news_df)
+    if OUTPUT_FORMAT in ('csv', 'both'):
+        output_path = os.path.join(OUTPUT_DIR, f'{stock_code}_news_{split_name}.csv')
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        news_df.to_csv(output_path, index=False)
+
+# --- 메인 실행 함수 ---
+
+async def main():
+    """메인 실행 함수 (Ctrl-C로 중단해도 완료된 샤드는 보존되며, 재실행 시 이어서 수집합니다)"""
+    dataset_store.check_output_format(OUTPUT_FORMAT)
+    for split_name, (start_date, end_date) in DATA_SPLITS.items():
+        start_day = datetime.strptime(start_date, '%Y-%m-%d')
+        end_day = datetime.strptime(end_date, '%Y-%m-%d')
+        print(f"\n{split_name} 데이터 백필을 시작합니다. ({start_day:%Y-%m-%d} ~ {end_day:%Y-%m-%d})")
+        await backfill_split(split_name, start_day, end_day, STOCK_LIST)
+    print(f"응답 캐시 적중 {fetch_cache.hits}회, 미적중 {fetch_cache.misses}회")
     print("\n모든 데이터 다운로드가 완료되었습니다.")
 
 if __name__ == "__main__":
-    # asyncio.run() 대신 main() 직접 호출
-    main()
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n중단되었습니다. 다시 실행하면 완료되지 않은 샤드부터 이어서 수집합니다.")
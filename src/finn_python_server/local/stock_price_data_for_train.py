@@ -1,70 +1,175 @@
-import os
+import os, sys
+import json
+from concurrent.futures import ThreadPoolExecutor
 from tiingo import TiingoClient
 import pandas as pd
-from supabase import create_client, Client
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from tqdm import tqdm
-from config import STOCK_LIST
-    
-
-def get_stock_price_for_train(tiingo_client, stock_code):
-    start_date = '2024-01-01'
-    end_date = '2024-12-31'
-    
-    try:
-        price_df = tiingo_client.get_dataframe(
-            stock_code,
-            startDate=start_date,
-            endDate=end_date,
-            frequency='daily'
-        )
-
-        price_df.to_csv(f'~/Downloads/finn_data/price/{stock_code}_prices_train.csv')
-        
-    except Exception as e:
-            tqdm.write(f"'{stock_code}' 처리 중 오류 발생: {e}")
+from config import STOCK_LIST, DATA_SPLITS, DATA_DIR, OUTPUT_FORMAT
+import dataset_store
+
+base_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(base_dir, '..', 'cloud'))
+from fetch_cache import FetchCache, cached_fetch
+from rate_limiter import RateLimiter
+from stock import trading_calendar
+
+# 과거 구간은 만료 없이 보관되므로 재실행 시 Tiingo를 다시 호출하지 않음
+fetch_cache = FetchCache(os.path.join(DATA_DIR, 'cache'), max_bytes=2 * 1024 ** 3, recent_ttl_seconds=15 * 60)
+
+OUTPUT_DIR = os.path.join(DATA_DIR, 'price')
+# 종목별 전체 기간 원본 주가와, 각 종목이 어느 기간까지 받아졌는지 기록하는 위치
+HISTORY_DIR = os.path.join(OUTPUT_DIR, 'history')
+COVERAGE_PATH = os.path.join(HISTORY_DIR, '_coverage.json')
+
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 5
+
+
+# --- 종목별 전체 기간 원본 (증분 갱신) ---
+
+def load_coverage():
+    if not os.path.exists(COVERAGE_PATH):
+        return {}
+    with open(COVERAGE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_coverage(coverage):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(COVERAGE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(coverage, f, indent=2, sort_keys=True)
+
+def load_history(stock_code):
+    path = os.path.join(HISTORY_DIR, f'{stock_code}.csv')
+    if not os.path.exists(path):
+        return None
+    history_df = pd.read_csv(path, index_col='date')
+    history_df.index = pd.to_datetime(history_df.index, utc=True)
+    return history_df
+
+def save_history(stock_code, history_df):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    history_df.to_csv(os.path.join(HISTORY_DIR, f'{stock_code}.csv'))
+
+def missing_ranges(covered, start_date, end_date):
+    """
+    이미 받은 기간 covered=(시작, 끝)을 제외하고 [start_date, end_date] 중 받아야 할 구간들을 반환합니다.
+    covered와 요청 기간 사이가 떨어져 있으면 그 사이도 함께 받아 covered가 하나의 연속 기간으로 유지됩니다.
+    거래일 달력으로 빠진 거래일만 계산하므로 주말/휴장일만 있는 구간은 요청하지 않고, 구간 양 끝도 거래일입니다.
+    """
+    if covered:
+        start_date, end_date = min(start_date, covered[0]), max(end_date, covered[1])
+    days = [day for day in trading_calendar.trading_days(start_date, end_date)
+            if not covered or not covered[0] <= day.strftime('%Y-%m-%d') <= covered[1]]
+    return [(range_start.strftime('%Y-%m-%d'), range_end.strftime('%Y-%m-%d'))
+            for range_start, range_end in trading_calendar.group_consecutive(days)]
+
+def last_closed_session():
+    """장이 끝나 일봉이 확정된 가장 최근 거래일 (미국 기준 오늘은 제외)"""
+    return trading_calendar.previous_trading_day(trading_calendar.session_date()).strftime('%Y-%m-%d')
 
+def update_history(tiingo_client, rate_limiter, stock_code, covered, start_date, end_date):
+    """
+    종목의 원본 주가를 [start_date, end_date] 전체가 포함되도록 갱신합니다.
+    디스크에 이미 있는 기간은 다시 받지 않고, 빠진 구간만 Tiingo에 요청합니다.
+    반환값: (원본 DataFrame, 갱신된 covered 기간)
+    아직 일봉이 확정되지 않은 날(미국 기준 오늘 이후)은 받지 않고 covered에도 넣지 않습니다.
+    """
+    end_date = min(end_date, last_closed_session())
+    if start_date > end_date:
+        return load_history(stock_code) if covered else None, covered
+    history_df = load_history(stock_code) if covered else None
+    if history_df is None:
+        covered = None  # 기록은 있지만 파일이 없으면 처음부터 다시 받음
+    frames = [history_df] if history_df is not None else []
 
-def get_stock_price_for_test(tiingo_client, stock_code):
-    start_date = '2025-01-01'
-    end_date = '2025-05-31'
-    
-    try:
-        price_df = tiingo_client.get_dataframe(
-            stock_code,
-            startDate=start_date,
-            endDate=end_date,
-            frequency='daily'
-        )
-
-        price_df.to_csv(f'~/Downloads/finn_data/price/{stock_code}_prices_test.csv')
-        
-    except Exception as e:
+    ranges = missing_ranges(covered, start_date, end_date)
+    for range_start, range_end in ranges:
+        def fetch():
+            rate_limiter.acquire()
+            return tiingo_client.get_dataframe(stock_code, startDate=range_start, endDate=range_end, frequency='daily')
+        price_df = cached_fetch(fetch_cache, 'tiingo', stock_code, range_start, range_end, fetch)
+        if not price_df.empty:
+            frames.append(price_df)
+
+    if not frames:
+        return None, covered
+    history_df = pd.concat(frames)
+    history_df = history_df[~history_df.index.duplicated(keep='last')].sort_index()
+    if ranges:
+        save_history(stock_code, history_df)
+    covered = (min(start_date, covered[0]), max(end_date, covered[1])) if covered else (start_date, end_date)
+    return history_df, covered
+
+
+# --- 출력 ---
+
+def write_dataset(stock_code, history_df, splits):
+    """split 구간에 해당하는 주가를 Parquet 데이터셋(종목/연도 파티션)에 저장합니다."""
+    dates = history_df.index.strftime('%Y-%m-%d')
+    in_splits = pd.Series(False, index=history_df.index)
+    for start_date, end_date in splits.values():
+        in_splits |= (dates >= start_date) & (dates <= end_date)
+    dataset_store.write_partition('price', stock_code, history_df[in_splits.values].rename_axis('date').reset_index())
+
+def write_splits(stock_code, history_df, splits):
+    """전체 기간 원본을 메모리에서 split 별로 나누어 CSV로 저장합니다."""
+    dates = history_df.index.strftime('%Y-%m-%d')
+    for split_name, (start_date, end_date) in splits.items():
+        split_df = history_df[(dates >= start_date) & (dates <= end_date)]
+        if split_df.empty:
+            tqdm.write(f"[{stock_code}] {split_name} 구간의 주가가 없습니다.")
+            continue
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        split_df.to_csv(os.path.join(OUTPUT_DIR, f'{stock_code}_prices_{split_name}.csv'))
+
+
+def build_dataset(tiingo_client, stock_codes, splits, max_workers=MAX_WORKERS):
+    """
+    모든 split을 포함하는 전체 기간을 종목당 한 번만 요청(증분)하고, 종목들을 병렬로 처리합니다.
+    """
+    dataset_store.check_output_format(OUTPUT_FORMAT)
+    span_start = min(start_date for start_date, _ in splits.values())
+    span_end = max(end_date for _, end_date in splits.values())
+    coverage = load_coverage()
+    rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+    def build(stock_code):
+        try:
+            history_df, covered = update_history(tiingo_client, rate_limiter, stock_code, coverage.get(stock_code),
+                                                 span_start, span_end)
+            if history_df is None:
+                tqdm.write(f"'{stock_code}'에 대한 Tiingo 데이터를 가져올 수 없습니다. 건너뜁니다.")
+                return stock_code, None
+            if OUTPUT_FORMAT in ('parquet', 'both'):
+                write_dataset(stock_code, history_df, splits)
+            if OUTPUT_FORMAT in ('csv', 'both'):
+                write_splits(stock_code, history_df, splits)
+            return stock_code, covered
+        except Exception as e:
             tqdm.write(f"'{stock_code}' 처리 중 오류 발생: {e}")
+            return stock_code, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for stock_code, covered in tqdm(executor.map(build, stock_codes), total=len(stock_codes),
+                                        desc=f"Fetching Price Data ({span_start} ~ {span_end})"):
+            if covered:
+                coverage[stock_code] = list(covered)
+    save_coverage(coverage)
 
 
 def main():
     load_dotenv()
-    
+
     tiingo_api_key = os.environ.get('TIINGO_API_KEY')
     tiingo_client = TiingoClient({'session': True, 'api_key': tiingo_api_key})
-    
-    # --- 학습용(Train) 데이터 다운로드 ---
-    print("학습용 데이터 다운로드를 시작합니다.")
-    for stock_code in tqdm(STOCK_LIST, desc="Fetching Train Data"):
-        get_stock_price_for_train(tiingo_client, stock_code)
-    
-    print("\n학습용 데이터 다운로드 완료.")
-    
-    # --- 테스트용(Test) 데이터 다운로드 ---
-    print("\n테스트용 데이터 다운로드를 시작합니다.")
-    for stock_code in tqdm(STOCK_LIST, desc="Fetching Test Data"):
-        get_stock_price_for_test(tiingo_client, stock_code)
 
+    print(f"주가 데이터 다운로드를 시작합니다. (split: {', '.join(DATA_SPLITS)}, 형식: {OUTPUT_FORMAT}, 위치: {DATA_DIR})")
+    build_dataset(tiingo_client, STOCK_LIST, DATA_SPLITS)
+
+    print(f"응답 캐시 적중 {fetch_cache.hits}회, 미적중 {fetch_cache.misses}회")
     print("\n모든 데이터 다운로드가 완료되었습니다.")
-    
 
-main()
-    
-    
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+-- 뉴스 교차 실행 중복 제거용 키
+-- dedup_key: 정규화된 URL + 정규화된 제목의 sha1 hex (cloud/news/dedup_index.py 의 build_dedup_key)
+-- 기존 행은 NULL 로 남으며, unique 인덱스는 NULL 끼리 충돌하지 않음
+ALTER TABLE news ADD COLUMN IF NOT EXISTS dedup_key text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS news_stock_id_dedup_key_key
+    ON news (stock_id, dedup_key);
+
+-- 실행마다 최근 며칠치 키를 한 번에 읽어오기 위한 인덱스
+CREATE INDEX IF NOT EXISTS news_published_date_idx
+    ON news (published_date);
@@ -0,0 +1,17 @@
+-- 종목별 기준일 이전 가장 최근 종가를 한 번에 조회하는 RPC
+-- cloud/stock/last_close.py 의 get_last_closes 에서 호출
+CREATE OR REPLACE FUNCTION get_last_closes(stock_ids bigint[], before_date date)
+RETURNS TABLE (stock_id bigint, price_date date, close_price numeric)
+LANGUAGE sql STABLE
+AS $$
+    SELECT DISTINCT ON (sp.stock_id) sp.stock_id, sp.price_date, sp.close_price
+    FROM stock_prices sp
+    WHERE sp.stock_id = ANY(stock_ids)
+      AND sp.price_date < before_date
+    ORDER BY sp.stock_id, sp.price_date DESC;
+$$;
+
+-- DISTINCT ON (stock_id) ... ORDER BY stock_id, price_date DESC 를 인덱스로 처리
+-- (upsert on_conflict 용 unique 키 (stock_id, price_date)가 이미 있다면 생략 가능)
+CREATE INDEX IF NOT EXISTS stock_prices_stock_id_price_date_idx
+    ON stock_prices (stock_id, price_date DESC);
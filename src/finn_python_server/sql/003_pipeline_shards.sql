@@ -0,0 +1,29 @@
+-- 샤드 실행 기록 (PIPELINE_MODE=shard)
+-- cloud/sharding.py 에서 조정자가 실행/샤드 행을 만들고, 작업자가 샤드 결과를 기록함
+-- completed_at: 모든 샤드가 성공한 뒤 한 작업자만 조건부 update(completed_at IS NULL)로 채우고 완료 메시지를 보냄
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id        text PRIMARY KEY,
+    shard_count   integer NOT NULL,
+    stock_count   integer NOT NULL,
+    is_closed_day boolean NOT NULL DEFAULT false,
+    created_at    timestamptz NOT NULL DEFAULT now(),
+    completed_at  timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_shards (
+    run_id             text NOT NULL REFERENCES pipeline_runs (run_id) ON DELETE CASCADE,
+    shard              integer NOT NULL,
+    status             text NOT NULL DEFAULT 'pending',   -- pending / dispatched / succeeded / failed
+    stock_count        integer,
+    seconds            double precision,
+    per_ticker_seconds double precision,                  -- 다음 실행의 샤드 수 계산에 사용
+    error              text,
+    metrics            jsonb,
+    updated_at         timestamptz NOT NULL DEFAULT now(),
+    finished_at        timestamptz,
+    PRIMARY KEY (run_id, shard)
+);
+
+-- 최근 성공한 샤드의 종목당 소요 시간 조회용
+CREATE INDEX IF NOT EXISTS pipeline_shards_status_finished_at_idx
+    ON pipeline_shards (status, finished_at DESC);
@@ -0,0 +1,3 @@
+-- 샤드별로 새로 저장된 종목/행 수/날짜 범위 (cloud/changes.py 의 RunChanges.to_dict())
+-- 마지막 작업자가 모든 샤드의 값을 합쳐 완료 메시지(queue_manager.build_messages)에 담음
+ALTER TABLE pipeline_shards ADD COLUMN IF NOT EXISTS changes jsonb;
@@ -0,0 +1,13 @@
+-- 뉴스 RSS 조건부 요청용 검증자 (cloud/news/feed_validators.py)
+-- url_hash: 검색 URL의 sha1 hex, content_hash: 마지막으로 처리한 응답의 항목 (link, title, 발행 시각)을 정렬한 sha1 hex
+-- 뉴스 저장이 끝난 뒤에만 갱신되며, NEWS_VALIDATOR_RETENTION_DAYS가 지난 행은 저장 시 삭제됨
+CREATE TABLE IF NOT EXISTS news_feed_validators (
+    url_hash text PRIMARY KEY,
+    etag text,
+    last_modified text,
+    content_hash text,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS news_feed_validators_updated_at_idx
+    ON news_feed_validators (updated_at);
@@ -0,0 +1,10 @@
+-- 증분 수집 모드(COLLECTION_MODE=incremental)의 종목별 워터마크 (cloud/watermarks.py)
+-- kind: 'news' = 마지막으로 수집한 뉴스의 published_date, 'prices' = 마지막으로 저장한 price_date
+-- 해당 종류의 저장이 끝난 뒤에만 갱신되며, 다음 실행은 이 값 이후의 데이터만 수집함
+CREATE TABLE IF NOT EXISTS collection_watermarks (
+    stock_id bigint NOT NULL,
+    kind text NOT NULL,
+    watermark text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (stock_id, kind)
+);
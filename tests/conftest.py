@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 함수 코드(cloud)는 패키지가 아니라 디렉터리 기준으로 모듈을 불러오므로 같은 방식으로 경로를 추가함
+CLOUD_DIR = os.path.join(os.path.dirname(__file__), '..', 'src', 'finn_python_server', 'cloud')
+sys.path.insert(0, os.path.abspath(CLOUD_DIR))
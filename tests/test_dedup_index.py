@@ -0,0 +1,72 @@
+import hashlib
+
+from news import dedup_index
+from news.dedup_index import BloomFilter
+
+
+def _keys(prefix, count):
+    return [hashlib.sha1(f"{prefix}{index}".encode('utf-8')).hexdigest() for index in range(count)]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(expected_items=5000)
+    keys = _keys('saved-', 5000)
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate_stays_low():
+    bloom = BloomFilter(expected_items=5000, false_positive_rate=0.001)
+    for key in _keys('saved-', 5000):
+        bloom.add(key)
+    false_positives = sum(key in bloom for key in _keys('other-', 20000))
+    # 기대값 20개 (0.1%), 여유를 두고 0.5% 이하인지 확인
+    assert false_positives <= 100
+
+
+def test_bloom_filter_accepts_non_hex_keys():
+    bloom = BloomFilter(expected_items=10)
+    bloom.add('plain key')
+    assert 'plain key' in bloom
+    assert 'other key' not in bloom
+
+
+def test_canonicalize_url_drops_tracking_and_formatting_differences():
+    assert dedup_index.canonicalize_url(
+        'HTTPS://News.Example.com/markets/apple/?utm_source=google&b=2&a=1&fbclid=x#comments'
+    ) == 'https://news.example.com/markets/apple?a=1&b=2'
+    assert dedup_index.canonicalize_url('https://news.example.com') == 'https://news.example.com/'
+    assert dedup_index.canonicalize_url(None) == ''
+
+
+def test_normalize_title_strips_source_suffix_and_punctuation():
+    assert dedup_index.normalize_title("Apple Beats Estimates! - Reuters", "Reuters") == 'apple beats estimates'
+    assert dedup_index.normalize_title("ＡＰＰＬＥ  beats   estimates") == 'apple beats estimates'
+    # 언론사가 다르면 접미어를 제목의 일부로 취급
+    assert dedup_index.normalize_title("Apple - Reuters", "Bloomberg") == 'apple reuters'
+    assert dedup_index.normalize_title(None) == ''
+
+
+def test_dedup_key_matches_across_url_and_title_variants():
+    first = {'original_url': 'https://news.example.com/a/?utm_medium=rss', 'title': 'Apple rallies - Reuters',
+             'source': 'Reuters'}
+    second = {'original_url': 'https://NEWS.example.com/a', 'title': 'Apple rallies.', 'source': 'Reuters'}
+    third = {'original_url': 'https://news.example.com/b', 'title': 'Apple rallies', 'source': 'Reuters'}
+    assert dedup_index.build_dedup_key(first) == dedup_index.build_dedup_key(second)
+    assert dedup_index.build_dedup_key(first) != dedup_index.build_dedup_key(third)
+
+
+def test_drop_already_saved_is_scoped_per_stock():
+    saved = {'stock_id': 1, 'original_url': 'https://news.example.com/a', 'title': 'Apple rallies', 'source': 'X'}
+    bloom = BloomFilter(expected_items=10)
+    bloom.add(dedup_index._scoped_key(1, dedup_index.build_dedup_key(saved)))
+
+    same_stock = dict(saved, original_url='https://news.example.com/a/?utm_source=rss')
+    other_stock = dict(saved, stock_id=2)
+    new_article = dict(saved, original_url='https://news.example.com/b', title='Apple slips')
+
+    fresh = dedup_index.drop_already_saved([same_stock, other_stock, new_article], bloom)
+
+    assert fresh == [other_stock, new_article]
+    assert all(len(news['dedup_key']) == 40 for news in (same_stock, other_stock, new_article))
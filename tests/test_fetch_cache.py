@@ -0,0 +1,73 @@
+import pickle
+import zlib
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+import fetch_cache
+from fetch_cache import FetchCache
+
+KST = pytz.timezone('Asia/Seoul')
+
+
+def _cache(tmp_path):
+    return FetchCache(str(tmp_path), max_bytes=10 * 1024 * 1024, recent_ttl_seconds=60, recent_sessions=2)
+
+
+def test_text_round_trip(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put('google_news', 'AAPL stock', '2024-01-02', '2024-01-03', '<rss>피드</rss>')
+    assert cache.get('google_news', 'AAPL stock', '2024-01-02', '2024-01-03') == '<rss>피드</rss>'
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_price_frame_round_trip(tmp_path):
+    index = pd.DatetimeIndex(pd.to_datetime(['2024-01-02T00:00:00.000Z', '2024-01-03T00:00:00.000Z']), name='date')
+    frame = pd.DataFrame({'close': [185.64, 184.25], 'volume': [82488674, 58414460],
+                          'adjClose': [184.29, float('nan')]}, index=index)
+    cache = _cache(tmp_path)
+    cache.put('tiingo', 'AAPL', '2024-01-02', '2024-01-03', frame)
+
+    cached = cache.get('tiingo', 'AAPL', '2024-01-02', '2024-01-03')
+
+    pd.testing.assert_frame_equal(cached, frame, check_index_type=False)
+    assert str(cached.index.tz) == 'UTC'
+
+
+def test_files_are_plain_json_not_pickle(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put('google_news', 'AAPL stock', '2024-01-02', '2024-01-03', '<rss/>')
+    [path] = tmp_path.glob('*.cache')
+    assert zlib.decompress(path.read_bytes()).startswith(b'{')
+
+
+def test_unreadable_files_are_misses(tmp_path):
+    cache = _cache(tmp_path)
+    path = cache._path('google_news', 'AAPL stock', '2024-01-02', '2024-01-03')
+    # 이전 형식(pickle)이나 손상된 파일은 불러오지 않고 미적중으로 처리
+    for data in (zlib.compress(pickle.dumps((None, '<rss/>'))), b'not zlib',
+                 zlib.compress(b'{"expires_at": null, "type": "unknown", "value": 1}')):
+        with open(path, 'wb') as f:
+            f.write(data)
+        assert cache.get('google_news', 'AAPL stock', '2024-01-02', '2024-01-03') is None
+    assert cache.misses == 3
+
+
+def test_format_version_is_part_of_key(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    current = cache._path('tiingo', 'AAPL', '2024-01-02', '2024-01-03')
+    monkeypatch.setattr(fetch_cache, '_FORMAT_VERSION', 'json-v0')
+    assert cache._path('tiingo', 'AAPL', '2024-01-02', '2024-01-03') != current
+
+
+def test_recent_ranges_expire(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    now = KST.localize(datetime(2025, 6, 11, 9, 0))  # 미국 6/10(화) 장 마감 후
+    completed_before = fetch_cache.completed_before
+    monkeypatch.setattr(fetch_cache, 'completed_before', lambda sessions: completed_before(sessions, now))
+    cache.put('tiingo', 'AAPL', '2025-06-02', '2025-06-06', '완료된 기간')
+    cache.put('tiingo', 'AAPL', '2025-06-02', '2025-06-09', '최근 기간')
+    monkeypatch.setattr(fetch_cache.time, 'time', lambda: 4102444800.0)  # 2100년
+    assert cache.get('tiingo', 'AAPL', '2025-06-02', '2025-06-06') == '완료된 기간'
+    assert cache.get('tiingo', 'AAPL', '2025-06-02', '2025-06-09') is None
@@ -0,0 +1,41 @@
+import json
+
+import metrics
+import settings
+
+
+def test_dropped_keeps_exact_counts_and_bounded_sample(monkeypatch):
+    monkeypatch.setattr(settings, 'METRICS_DROPPED_SAMPLE_SIZE', 5)
+    run = metrics.RunMetrics()
+    for index in range(1000):
+        run.drop('news', {"stock_id": index}, 'circuit_open' if index % 4 else 'timeout')
+    run.drop('prices', {"stock_id": 1}, 'http_500')
+
+    summary = run.summary()
+
+    assert summary['counters']['dropped.news'] == 1000
+    assert summary['dropped']['news']['count'] == 1000
+    assert summary['dropped']['news']['reasons'] == {'timeout': 250, 'circuit_open': 750}
+    assert summary['dropped']['news']['items'] == [
+        {"stock_id": 0, "reason": 'timeout'},
+        {"stock_id": 1, "reason": 'circuit_open'},
+        {"stock_id": 2, "reason": 'circuit_open'},
+        {"stock_id": 3, "reason": 'circuit_open'},
+        {"stock_id": 4, "reason": 'timeout'},
+    ]
+    assert summary['dropped']['prices'] == {"count": 1, "reasons": {'http_500': 1},
+                                            "items": [{"stock_id": 1, "reason": 'http_500'}]}
+    # 빠진 항목 수와 관계없이 보관하는 항목 수는 일정함
+    for index in range(1000, 100000):
+        run.drop('news', {"stock_id": index}, 'circuit_open')
+    assert len(run.summary()['dropped']['news']['items']) == 5
+    assert len(json.dumps(run.summary()['dropped'])) < 500
+
+
+def test_summary_is_a_snapshot():
+    run = metrics.RunMetrics()
+    run.drop('news', {"stock_id": 1}, 'timeout')
+    summary = run.summary()
+    run.drop('news', {"stock_id": 2}, 'timeout')
+    assert summary['dropped']['news']['count'] == 1
+    assert len(summary['dropped']['news']['items']) == 1
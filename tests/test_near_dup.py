@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from news import near_dup
+from news.near_dup import NearDuplicateDetector, NearDuplicateStream
+
+DISTINCT_TITLES = [
+    "Apple beats quarterly earnings estimates on strong iPhone demand",
+    "Microsoft expands cloud partnership with OpenAI",
+    "Nvidia unveils next generation data center GPU",
+    "Tesla recalls two million vehicles over autopilot concerns",
+    "Amazon to open new logistics hub in Texas",
+    "Alphabet faces antitrust trial over search deals",
+    "Meta launches paid subscription in Europe",
+    "Broadcom completes VMware acquisition",
+    "Fed holds rates steady, signals cuts later this year",
+    "Oil prices slide as OPEC output rises",
+    "Netflix adds record subscribers after password crackdown",
+    "Intel delays Ohio chip factory opening",
+]
+
+
+def _news(stock_id, title, source='Reuters'):
+    return {'stock_id': stock_id, 'title': f"{title} - {source}", 'source': source}
+
+
+def test_rewrites_of_same_headline_are_removed():
+    all_news = [
+        _news(1, "Apple beats quarterly earnings estimates as iPhone sales surge"),
+        _news(1, "Apple beats quarterly earnings estimates as iPhone sales surge!", source='Bloomberg'),
+        _news(1, "Apple beats quarterly earnings estimates, as iPhone sales surge"),
+        _news(1, "Apple names new chief financial officer"),
+    ]
+    kept = near_dup.remove_near_duplicate_titles(all_news)
+    assert kept == [all_news[0], all_news[3]]
+
+
+def test_distinct_titles_are_kept():
+    all_news = [_news(1, title) for title in DISTINCT_TITLES]
+    assert near_dup.remove_near_duplicate_titles(all_news) == all_news
+
+
+def test_stock_scope_keeps_same_headline_for_other_stocks():
+    all_news = [_news(1, "Chipmakers rally after export rules eased"),
+                _news(2, "Chipmakers rally after export rules eased"),
+                _news(2, "Chipmakers rally after export rules are eased")]
+    assert near_dup.remove_near_duplicate_titles(all_news, scope='global') == all_news[:1]
+    assert near_dup.remove_near_duplicate_titles(all_news, scope='stock') == all_news[:2]
+
+
+def test_unknown_scope_raises():
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(scope='sector')
+
+
+def _sample_news(seed=7):
+    """종목 순서로 정렬된, 유사 제목이 섞인 뉴스"""
+    generator = random.Random(seed)
+    all_news = []
+    for stock_id in range(1, 6):
+        for _ in range(40):
+            title = generator.choice(DISTINCT_TITLES)
+            if generator.random() < 0.5:
+                title += generator.choice([" report says", ", sources say", "", " amid market rally"])
+            all_news.append(_news(stock_id, title, source=generator.choice(['Reuters', 'CNBC'])))
+    return all_news
+
+
+@pytest.mark.parametrize('batch_size', [1, 13, 1000])
+def test_stream_matches_batch_detector_in_stock_scope(batch_size):
+    all_news = _sample_news()
+    expected = NearDuplicateDetector(scope='stock').remove_duplicates(all_news)
+
+    stream = NearDuplicateStream(scope='stock')
+    kept = []
+    for start in range(0, len(all_news), batch_size):
+        kept.extend(stream.filter(all_news[start:start + batch_size]))
+
+    assert kept == expected
+    assert len(expected) < len(all_news)
+
+
+def test_stream_matches_batch_detector_in_global_scope_within_window():
+    all_news = _sample_news(seed=11)
+    expected = NearDuplicateDetector(scope='global').remove_duplicates(all_news)
+
+    stream = NearDuplicateStream(scope='global', max_rows=1000)
+    kept = []
+    for start in range(0, len(all_news), 50):
+        kept.extend(stream.filter(all_news[start:start + 50]))
+
+    assert kept == expected
+
+
+def test_stream_global_window_forgets_old_rows():
+    stream = NearDuplicateStream(scope='global', max_rows=2)
+    first = _news(1, "Apple beats quarterly earnings estimates")
+    fillers = [_news(1, title) for title in DISTINCT_TITLES[1:5]]
+    assert stream.filter([first] + fillers) == [first] + fillers
+    # 두 세대(최대 2 x max_rows개)를 지난 뉴스와는 더 이상 비교하지 않음
+    repeated = _news(1, "Apple beats quarterly earnings estimates")
+    assert stream.filter([repeated]) == [repeated]
@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+import pytest
+import pytz
+
+import settings
+import watermarks
+from news import news_data
+
+KST = pytz.timezone('Asia/Seoul')
+
+
+@pytest.fixture(autouse=True)
+def incremental_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'INCREMENTAL_NEWS_OVERLAP_MINUTES', 60)
+    monkeypatch.setattr(settings, 'INCREMENTAL_MAX_LOOKBACK_DAYS', 7)
+
+
+def _windows(rows, now):
+    store = watermarks.WatermarkStore(watermarks.NEWS, rows)
+    stocks = [{'id': stock_id} for stock_id in (1, 2, 3)]
+    return news_data._incremental_windows(stocks, store, now)
+
+
+def test_window_starts_on_new_york_date_of_watermark():
+    # 한국 6/11 09:00 = 뉴욕 6/10 20:00. 워터마크 UTC 6/11 02:30 (기준 01:30) = 뉴욕 6/10 21:30
+    now = KST.localize(datetime(2025, 6, 11, 9, 0))
+    windows = _windows([{'stock_id': 1, 'watermark': '2025-06-11T02:30:00'}], now)
+
+    start, end, since = windows[1]
+    assert start.date() == date(2025, 6, 10)
+    assert end.date() == date(2025, 6, 12)
+    assert since == '2025-06-11T01:30:00'
+    assert start.tzinfo is not None and end.tzinfo is not None
+
+
+def test_window_keeps_session_that_just_closed():
+    # 장 마감 직후(뉴욕 6/10 16:30 = UTC 20:30)까지 수집했다면 다음 실행은 뉴욕 6/10부터 다시 확인
+    now = KST.localize(datetime(2025, 6, 11, 7, 0))
+    start, _, since = _windows([{'stock_id': 2, 'watermark': '2025-06-10T20:30:00'}], now)[2]
+    assert start.date() == date(2025, 6, 10)
+    assert since == '2025-06-10T19:30:00'
+
+
+def test_window_is_capped_by_lookback_and_skips_stocks_without_watermark():
+    now = KST.localize(datetime(2025, 6, 11, 9, 0))
+    windows = _windows([{'stock_id': 1, 'watermark': '2025-04-01T00:00:00'}], now)
+
+    assert set(windows) == {1}
+    assert windows[1][0].date() == date(2025, 6, 3)  # 뉴욕 6/10 - 7일
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import metrics
+import queue_manager
+
+
+def _run_changes(stock_count):
+    return {stock_id: {'prices': {'rows': 1, 'start_date': '2025-06-09', 'end_date': '2025-06-09'},
+                       'news': {'rows': stock_id % 7 + 1, 'start_date': '2025-06-01', 'end_date': '2025-06-09'}}
+            for stock_id in range(1, stock_count + 1)}
+
+
+def test_empty_changes_still_send_one_completion_message():
+    messages = queue_manager.build_messages({}, run_id='run-1')
+    assert len(messages) == 1
+    message = json.loads(messages[0])
+    assert message['status'] == 'SUCCESS'
+    assert message['run_id'] == 'run-1'
+    assert message['batch'] == {'index': 0, 'count': 1}
+    assert message['stocks'] == []
+    assert message['totals'] == {}
+
+
+def test_messages_are_split_under_size_limit():
+    run_summary = {'counters': {'news_saved': 1234}, 'stages_seconds': {'news': 12.5}}
+    max_bytes = 2000
+    messages = queue_manager.build_messages(_run_changes(200), run_summary=run_summary, run_id='run-1',
+                                            max_bytes=max_bytes)
+
+    assert len(messages) > 1
+    assert all(len(message.encode('utf-8')) <= max_bytes for message in messages)
+    decoded = [json.loads(message) for message in messages]
+    assert [message['batch'] for message in decoded] == [{'index': index, 'count': len(messages)}
+                                                         for index in range(len(messages))]
+    assert {message['run_id'] for message in decoded} == {'run-1'}
+    # 모든 종목이 정확히 한 번씩, 순서대로 담김
+    stock_ids = [stock['stock_id'] for message in decoded for stock in message['stocks']]
+    assert stock_ids == list(range(1, 201))
+    # metrics는 첫 메시지에만, totals는 모든 메시지에 실행 전체 기준으로 담김
+    assert decoded[0]['metrics'] == run_summary
+    assert all('metrics' not in message for message in decoded[1:])
+    assert all(message['totals']['prices'] == {'rows': 200, 'stocks': 200, 'start_date': '2025-06-09',
+                                               'end_date': '2025-06-09'} for message in decoded)
+
+
+def test_entry_larger_than_limit_raises():
+    with pytest.raises(ValueError):
+        queue_manager.build_messages(_run_changes(1), max_bytes=300)
+
+
+def test_group_for_put_respects_count_and_size_limits():
+    messages = ['a' * 100] * 7 + ['b' * 450, 'c' * 10]
+    groups = queue_manager._group_for_put(messages, max_messages=3, max_bytes=500)
+
+    assert [index for group in groups for index in group] == list(range(len(messages)))
+    assert all(len(group) <= 3 for group in groups)
+    assert all(sum(len(messages[index]) for index in group) <= 500 for group in groups)
+    assert groups == [[0, 1, 2], [3, 4, 5], [6], [7, 8]]
+
+
+def test_group_for_put_keeps_oversized_message_alone():
+    groups = queue_manager._group_for_put(['a' * 10, 'b' * 600, 'c' * 10], max_messages=20, max_bytes=500)
+    assert groups == [[0], [1], [2]]
+
+
+def test_oversized_metrics_are_trimmed_instead_of_failing():
+    run = metrics.RunMetrics()
+    for index in range(5000):
+        run.drop('news', {"stock_id": index}, 'circuit_open')
+    run_summary = run.summary()
+    # 항목 표본 수를 제한하지 않은 요약처럼 dropped만으로 메시지 크기 제한을 넘게 만듦
+    run_summary['dropped']['news']['items'] = [{"stock_id": index, "reason": 'circuit_open'} for index in range(5000)]
+    max_bytes = 4000
+    assert len(json.dumps(run_summary['dropped'])) > max_bytes
+
+    messages = queue_manager.build_messages(_run_changes(50), run_summary=run_summary, max_bytes=max_bytes)
+
+    assert all(len(message.encode('utf-8')) <= max_bytes for message in messages)
+    decoded = [json.loads(message) for message in messages]
+    first_metrics = decoded[0]['metrics']
+    assert first_metrics['truncated'] is True
+    assert first_metrics['dropped'] == {'news': {'count': 5000, 'reasons': {'circuit_open': 5000}}}
+    assert first_metrics['counters'] == run_summary['counters']
+    stock_ids = [stock['stock_id'] for message in decoded for stock in message['stocks']]
+    assert stock_ids == list(range(1, 51))
+
+
+def test_metrics_that_fit_are_sent_unchanged():
+    run_summary = {'counters': {'news_saved': 10}, 'dropped': {}}
+    message = json.loads(queue_manager.build_messages(_run_changes(3), run_summary=run_summary)[0])
+    assert message['metrics'] == run_summary
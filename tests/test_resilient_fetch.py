@@ -0,0 +1,132 @@
+import pytest
+
+import metrics
+from news import resilient_fetch
+from news.resilient_fetch import CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilient_fetch.time, 'monotonic', clock)
+    metrics.start_run()
+    return clock
+
+
+def _request(breaker, overloaded):
+    permit = breaker.allow()
+    assert permit is not None
+    breaker.record(permit, overloaded)
+
+
+def _open_breaker(breaker):
+    for _ in range(breaker.min_requests):
+        _request(breaker, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_stays_closed_until_min_requests(clock):
+    breaker = CircuitBreaker(window=20, min_requests=10, failure_ratio=0.5)
+    for _ in range(9):
+        _request(breaker, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() is not None
+
+
+def test_opens_at_failure_ratio(clock):
+    breaker = CircuitBreaker(window=10, min_requests=10, failure_ratio=0.5)
+    for overloaded in [False] * 6 + [True] * 4:
+        _request(breaker, overloaded)
+    assert breaker.state == CircuitBreaker.CLOSED
+    # 가장 오래된 성공이 밀려나며 과부하 비율이 5/10이 됨
+    _request(breaker, True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert metrics.current().summary()['counters']['rss_circuit_open'] == 1
+
+
+def test_open_breaker_blocks_until_cooldown(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    _open_breaker(breaker)
+    clock.now += 29.9
+    assert breaker.allow() is None
+    clock.now += 0.1
+    assert breaker.allow() is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_allows_single_probe_and_closes_on_success(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    _open_breaker(breaker)
+    clock.now += 30.0
+    probe = breaker.allow()
+    assert probe is not None
+    assert breaker.allow() is None
+    breaker.record(probe, False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    # 닫힐 때 이전 기록을 지우므로 과부하 한 번으로 다시 열리지 않음
+    _request(breaker, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_reopens_on_overload(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    _open_breaker(breaker)
+    clock.now += 30.0
+    _request(breaker, True)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 29.0
+    assert breaker.allow() is None
+    clock.now += 1.0
+    assert breaker.allow() is not None
+
+
+def test_abandoned_probe_lets_next_request_probe(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    _open_breaker(breaker)
+    clock.now += 30.0
+    probe = breaker.allow()
+    assert breaker.allow() is None
+    breaker.abandon(probe)
+    assert breaker.allow() is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_late_results_from_before_opening_do_not_decide_probe(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    slow_success = breaker.allow()
+    slow_overload = breaker.allow()
+    _open_breaker(breaker)
+    clock.now += 30.0
+    probe = breaker.allow()
+
+    # 열리기 전에 보낸 요청의 늦은 응답은 반열림 상태를 바꾸지 않음
+    breaker.record(slow_success, False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(slow_overload, True)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.abandon(slow_success)
+    assert breaker.allow() is None  # 시험 요청은 여전히 진행 중
+
+    breaker.record(probe, False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_late_overloads_from_before_closing_are_not_counted(clock):
+    breaker = CircuitBreaker(min_requests=4, cooldown_seconds=30.0)
+    stale = [breaker.allow() for _ in range(4)]
+    _open_breaker(breaker)
+    clock.now += 30.0
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    for permit in stale:
+        breaker.record(permit, True)
+    assert breaker.state == CircuitBreaker.CLOSED
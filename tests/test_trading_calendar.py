@@ -0,0 +1,128 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import pytz
+
+from stock import market_day
+from stock import trading_calendar
+
+NEW_YORK = pytz.timezone('America/New_York')
+KST = pytz.timezone('Asia/Seoul')
+
+# NYSE 공식 휴장일 (평일만, 대체 휴장일 포함)
+NYSE_HOLIDAYS = {
+    2024: [date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29), date(2024, 5, 27),
+           date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28), date(2024, 12, 25)],
+    2025: [date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18),
+           date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27),
+           date(2025, 12, 25)],
+    2026: [date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3), date(2026, 5, 25),
+           date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7), date(2026, 11, 26), date(2026, 12, 25)],
+}
+NYSE_EARLY_CLOSES = {
+    2024: [date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)],
+    2025: [date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24)],
+    2026: [date(2026, 11, 27), date(2026, 12, 24)],
+}
+TRADING_DAY_COUNTS = {2024: 252, 2025: 250, 2026: 251}
+
+
+def _days(year):
+    day = date(year, 1, 1)
+    while day.year == year:
+        yield day
+        day += timedelta(days=1)
+
+
+@pytest.mark.parametrize('year', sorted(NYSE_HOLIDAYS))
+def test_weekday_holidays_match_nyse(year):
+    holidays = [day for day in _days(year) if day.weekday() < 5 and not trading_calendar.is_trading_day(day)]
+    assert holidays == NYSE_HOLIDAYS[year]
+
+
+@pytest.mark.parametrize('year', sorted(NYSE_EARLY_CLOSES))
+def test_early_closes_match_nyse(year):
+    early = [day for day in _days(year) if trading_calendar.is_early_close(day)]
+    assert early == NYSE_EARLY_CLOSES[year]
+    assert all(trading_calendar.close_time(day) == time(13, 0) for day in early)
+
+
+@pytest.mark.parametrize('year', sorted(TRADING_DAY_COUNTS))
+def test_trading_day_counts(year):
+    assert len(trading_calendar.trading_days(date(year, 1, 1), date(year, 12, 31))) == TRADING_DAY_COUNTS[year]
+
+
+@pytest.mark.parametrize('day, name', [
+    (date(2024, 3, 29), "성금요일"),
+    (date(2025, 4, 18), "성금요일"),
+    (date(2026, 4, 3), "성금요일"),
+    (date(2025, 6, 19), "준틴스"),
+    (date(2025, 1, 9), "카터 전 대통령 국장"),
+    # 일요일 -> 다음 날 월요일
+    (date(2022, 6, 20), "준틴스"),
+    (date(2023, 1, 2), "신정"),
+    # 토요일 -> 전날 금요일
+    (date(2021, 12, 24), "성탄절"),
+    (date(2026, 7, 3), "독립기념일"),
+    (date(2027, 6, 18), "준틴스"),
+])
+def test_holiday_names_and_observed_rules(day, name):
+    assert trading_calendar.holiday_name(day) == name
+    assert not trading_calendar.is_trading_day(day)
+
+
+@pytest.mark.parametrize('day', [
+    date(2021, 6, 18),   # 준틴스는 2022년부터 휴장
+    date(2021, 12, 31),  # 신정(2022-01-01)이 토요일이면 전년도 12/31은 휴장하지 않음
+    date(2027, 12, 31),
+    date(2026, 7, 2),    # 독립기념일 대체 휴장 전날은 조기 폐장이 아님
+])
+def test_days_that_stay_open(day):
+    assert trading_calendar.is_trading_day(day)
+    assert trading_calendar.close_time(day) == time(16, 0)
+
+
+def test_weekend_and_string_input():
+    assert trading_calendar.holiday_name('2025-06-07') == "주말"
+    assert trading_calendar.holiday_name(datetime(2025, 6, 4, 12)) is None
+    assert trading_calendar.close_time('2025-06-07') is None
+
+
+def test_previous_and_next_trading_day():
+    assert trading_calendar.previous_trading_day(date(2025, 1, 2)) == date(2024, 12, 31)
+    assert trading_calendar.previous_trading_day(date(2025, 1, 2), inclusive=True) == date(2025, 1, 2)
+    assert trading_calendar.previous_trading_day(date(2025, 1, 10)) == date(2025, 1, 8)
+    assert trading_calendar.next_trading_day(date(2025, 1, 8)) == date(2025, 1, 10)
+    assert trading_calendar.next_trading_day(date(2024, 12, 31)) == date(2025, 1, 2)
+    assert trading_calendar.next_trading_day(date(2025, 6, 7), inclusive=True) == date(2025, 6, 9)
+
+
+def test_last_closed_session():
+    assert trading_calendar.last_closed_session(NEW_YORK.localize(datetime(2025, 6, 4, 15, 59))) == date(2025, 6, 3)
+    assert trading_calendar.last_closed_session(NEW_YORK.localize(datetime(2025, 6, 4, 16, 0))) == date(2025, 6, 4)
+    assert trading_calendar.last_closed_session(NEW_YORK.localize(datetime(2025, 7, 3, 13, 30))) == date(2025, 7, 3)
+    assert trading_calendar.last_closed_session(NEW_YORK.localize(datetime(2025, 6, 7, 12, 0))) == date(2025, 6, 6)
+
+
+def test_session_date_and_closed_day_check_use_new_york_date():
+    # 한국 시간 오전 7시 실행은 미국의 전날
+    tuesday_morning = KST.localize(datetime(2025, 6, 10, 7, 0))
+    monday_morning = KST.localize(datetime(2025, 6, 9, 7, 0))
+    assert trading_calendar.session_date(tuesday_morning) == date(2025, 6, 9)
+    assert market_day.check_is_today_closed_day(now=tuesday_morning) is False
+    assert market_day.check_is_today_closed_day(now=monday_morning) is True
+    assert market_day.check_is_today_closed_day(now=KST.localize(datetime(2025, 1, 10, 7, 0))) is True
+
+
+def test_group_consecutive_spans_weekends_and_holidays():
+    days = [date(2025, 6, 6), date(2025, 6, 9), date(2025, 6, 11), date(2025, 1, 8), date(2025, 1, 10)]
+    assert trading_calendar.group_consecutive(days) == [
+        (date(2025, 1, 8), date(2025, 1, 10)),
+        (date(2025, 6, 6), date(2025, 6, 9)),
+        (date(2025, 6, 11), date(2025, 6, 11)),
+    ]
+
+
+def test_out_of_range_year_raises():
+    with pytest.raises(ValueError):
+        trading_calendar.is_trading_day(date(1990, 1, 2))
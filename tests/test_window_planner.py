@@ -0,0 +1,97 @@
+import asyncio
+from datetime import date, timedelta
+
+from news import window_planner
+
+
+def _fake_feed(articles_per_day, cap):
+    """하루 기사 수가 정해진 가상 피드. 요청 구간의 기사를 날짜 순으로 최대 cap개까지 돌려줌"""
+    calls = []
+
+    async def fetch(window_start, window_end):
+        calls.append((window_start, window_end))
+        items = []
+        day = window_start
+        while day < window_end:
+            items.extend((day, index) for index in range(articles_per_day.get(day, 0)))
+            day += timedelta(days=1)
+        return items[:cap]
+
+    return fetch, calls
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_plan_windows_covers_range_without_overlap():
+    windows = window_planner.plan_windows(date(2025, 6, 1), date(2025, 6, 11), 4)
+    assert windows == [
+        (date(2025, 6, 1), date(2025, 6, 5)),
+        (date(2025, 6, 5), date(2025, 6, 9)),
+        (date(2025, 6, 9), date(2025, 6, 11)),
+    ]
+
+
+def test_initial_days_uses_density():
+    assert window_planner.initial_days(30, cap=100) == 30
+    assert window_planner.initial_days(30, cap=100, max_days=7) == 7
+    assert window_planner.initial_days(30, cap=100, per_day=10) == 5
+    assert window_planner.initial_days(30, cap=100, per_day=500) == 1
+    assert window_planner.initial_days(3, cap=100, per_day=0.1) == 3
+
+
+def test_sparse_range_is_fetched_in_one_request():
+    start, end = date(2025, 6, 1), date(2025, 7, 1)
+    per_day = {start + timedelta(days=offset): 1 for offset in range(30)}
+    fetch, calls = _fake_feed(per_day, cap=100)
+    stats = window_planner.WindowStats()
+
+    items = _run(window_planner.fetch_windows(fetch, start, end, cap=100, stats=stats))
+
+    assert len(items) == 30
+    assert calls == [(start, end)]
+    assert stats.summary() == {'days': 30, 'requests': 1, 'splits': 0, 'saturated': 0, 'requests_saved': 29}
+
+
+def test_capped_windows_are_split_until_complete():
+    start, end = date(2025, 6, 1), date(2025, 6, 9)
+    per_day = {start + timedelta(days=offset): 30 for offset in range(8)}
+    fetch, calls = _fake_feed(per_day, cap=100)
+    stats = window_planner.WindowStats()
+
+    items = _run(window_planner.fetch_windows(fetch, start, end, cap=100, stats=stats))
+
+    # 잘린 결과 없이 모든 기사를 기간 순서대로 받음
+    assert items == [(day, index) for day in sorted(per_day) for index in range(30)]
+    assert stats.splits == 3  # 8일 -> 4일 x2 -> 2일 x4 (4일 구간은 120개라 다시 나눔)
+    assert stats.saturated == 0
+    assert stats.requests == len(calls) == 7
+
+
+def test_single_day_at_cap_is_marked_saturated():
+    start, end = date(2025, 6, 1), date(2025, 6, 3)
+    fetch, _ = _fake_feed({start: 150, start + timedelta(days=1): 10}, cap=100)
+    stats = window_planner.WindowStats()
+
+    items = _run(window_planner.fetch_windows(fetch, start, end, cap=100, stats=stats))
+
+    assert len(items) == 110
+    assert stats.saturated == 1
+    assert stats.splits == 1
+
+
+def test_empty_range_makes_no_request():
+    fetch, calls = _fake_feed({}, cap=100)
+    assert _run(window_planner.fetch_windows(fetch, date(2025, 6, 1), date(2025, 6, 1), cap=100)) == []
+    assert calls == []
+
+
+def test_update_density_smooths_observations():
+    densities = {}
+    window_planner.update_density(densities, 'AAPL', 20, 10)
+    assert densities['AAPL'] == 2.0
+    window_planner.update_density(densities, 'AAPL', 60, 10)
+    assert densities['AAPL'] == 4.0
+    window_planner.update_density(densities, 'AAPL', 5, 0)
+    assert densities['AAPL'] == 4.0